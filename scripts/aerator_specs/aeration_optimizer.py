@@ -0,0 +1,135 @@
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import block_diag, csr_matrix
+
+class Aerator:
+    """Class representing an aeration device with cost and performance attributes."""
+    def __init__(self, name, hp, capital_cost, useful_life, repair_cost, operating_cost_per_hour, do_rate):
+        self.name = name
+        self.hp = hp
+        self.capital_cost = capital_cost
+        self.useful_life = useful_life
+        self.repair_cost = repair_cost
+        self.operating_cost_per_hour = operating_cost_per_hour
+        self.do_rate = do_rate  # kg of DO per hour
+        self.depreciation_cost = self.calculate_depreciation()
+
+    def calculate_depreciation(self):
+        """Calculate annual depreciation cost using straight-line method."""
+        return self.capital_cost / self.useful_life
+
+    def total_cost(self, hours):
+        """Calculate total annual cost for given hours of operation."""
+        return self.depreciation_cost + (self.operating_cost_per_hour * hours) + self.repair_cost
+
+    def do_output(self, hours):
+        """Calculate total DO output for given hours."""
+        return self.do_rate * hours
+
+def solve_covering_lp_batch(costs, outputs, demand):
+    """
+    Solve many independent "min c·x s.t. a·x >= b, x >= 0" problems at once, in closed form.
+
+    With a single covering constraint the optimum puts all of the demand on the device with the
+    lowest cost per unit of output (c_i / a_i), so no simplex iterations are needed. Problems with
+    negative costs are not covered by that argument and are passed to HiGHS in one stacked solve.
+
+    Args:
+        costs (array): (P, N) annual cost per unit for P problems over N devices.
+        outputs (array): (P, N) DO output per unit.
+        demand (array): (P,) required DO per problem.
+
+    Returns:
+        tuple: (x, status) with x of shape (P, N) units per device and status of shape (P,)
+               (0 optimal, 2 infeasible, 3 unbounded; scipy.optimize.linprog's codes).
+    """
+    costs = np.atleast_2d(np.asarray(costs, dtype=np.float64))
+    outputs = np.atleast_2d(np.asarray(outputs, dtype=np.float64))
+    demand = np.broadcast_to(np.asarray(demand, dtype=np.float64), costs.shape[:1])
+    n_problems = costs.shape[0]
+    x = np.zeros(costs.shape)
+    status = np.zeros(n_problems, dtype=np.int8)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(outputs > 0, costs / outputs, np.inf)
+    best = np.argmin(ratio, axis=1)
+    rows = np.arange(n_problems)
+    needs_output = demand > 0
+    infeasible = needs_output & ~np.isfinite(ratio[rows, best])
+    status[infeasible] = 2
+    solved = needs_output & ~infeasible
+    x[rows[solved], best[solved]] = demand[solved] / outputs[rows[solved], best[solved]]
+
+    general = np.flatnonzero((costs < 0).any(axis=1))
+    if general.size:
+        x[general], status[general] = _solve_stacked(costs[general], outputs[general], demand[general])
+    return x, status
+
+def _solve_stacked(costs, outputs, demand):
+    """One HiGHS call for a block-diagonal stack of single-constraint problems"""
+    n_problems, n_devices = costs.shape
+    A_ub = block_diag([csr_matrix(-row) for row in outputs], format='csr')
+    result = linprog(costs.ravel(), A_ub=A_ub, b_ub=-demand, bounds=(0, None), method='highs')
+    if result.success:
+        return result.x.reshape(n_problems, n_devices), np.zeros(n_problems, dtype=np.int8)
+    # A stacked problem fails as a whole; re-solve individually to attribute the failure
+    x = np.zeros(costs.shape)
+    status = np.zeros(n_problems, dtype=np.int8)
+    for i in range(n_problems):
+        single = linprog(costs[i], A_ub=[-outputs[i]], b_ub=[-demand[i]], bounds=(0, None), method='highs')
+        status[i] = single.status
+        if single.success:
+            x[i] = single.x
+    return x, status
+
+_STATUS_MESSAGES = {
+    2: "The problem is infeasible.",
+    3: "The problem is unbounded.",
+}
+
+class AerationOptimizer:
+    """Class to optimize aeration device selection using linear programming."""
+    def __init__(self, aerators, min_do_required, hours):
+        self.aerators = aerators
+        self.min_do_required = min_do_required
+        self.hours = hours
+        self._costs = None
+        self._outputs = None
+
+    def setup_optimization(self):
+        """Set up the linear programming problem."""
+        c = [aerator.total_cost(self.hours) for aerator in self.aerators]
+        A = [-aerator.do_output(self.hours) for aerator in self.aerators]  # Negative for >= constraint
+        b = [-self.min_do_required]
+        bounds = [(0, None) for _ in self.aerators]
+        return c, [A], b, bounds
+
+    def _constraint_arrays(self):
+        """Cost vector and DO-output row, built once and reused by every solve on this fleet"""
+        if self._costs is None:
+            self._costs = np.array([aerator.total_cost(self.hours) for aerator in self.aerators], dtype=np.float64)
+            self._outputs = np.array([aerator.do_output(self.hours) for aerator in self.aerators], dtype=np.float64)
+        return self._costs, self._outputs
+
+    def _format_result(self, x, status):
+        if status != 0:
+            return {"status": "Optimization failed", "message": _STATUS_MESSAGES.get(status, "Solver error.")}
+        costs, _ = self._constraint_arrays()
+        return {
+            "optimal_cost": float(costs @ x),
+            "aerator_usage": {self.aerators[i].name: x[i] for i in range(len(self.aerators))},
+            "depreciation_cost": sum(self.aerators[i].depreciation_cost * x[i] for i in range(len(self.aerators)))
+        }
+
+    def optimize(self):
+        """Run optimization to minimize total cost."""
+        return self.optimize_batch([self.min_do_required])[0]
+
+    def optimize_batch(self, min_do_required):
+        """Solve the same fleet against many DO requirements in one vectorized pass."""
+        costs, outputs = self._constraint_arrays()
+        demand = np.asarray(min_do_required, dtype=np.float64)
+        n_problems = demand.shape[0]
+        x, status = solve_covering_lp_batch(np.broadcast_to(costs, (n_problems, costs.size)),
+                                            np.broadcast_to(outputs, (n_problems, outputs.size)), demand)
+        return [self._format_result(x[i], status[i]) for i in range(n_problems)]
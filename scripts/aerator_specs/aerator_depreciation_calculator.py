@@ -1,62 +1,9 @@
 import numpy as np
-from scipy.optimize import linprog
 import ipywidgets as widgets
 from IPython.display import display, clear_output
 import os
 from datetime import datetime
-
-class Aerator:
-    """Class representing an aeration device with cost and performance attributes."""
-    def __init__(self, name, hp, capital_cost, useful_life, repair_cost, operating_cost_per_hour, do_rate):
-        self.name = name
-        self.hp = hp
-        self.capital_cost = capital_cost
-        self.useful_life = useful_life
-        self.repair_cost = repair_cost
-        self.operating_cost_per_hour = operating_cost_per_hour
-        self.do_rate = do_rate  # kg of DO per hour
-        self.depreciation_cost = self.calculate_depreciation()
-
-    def calculate_depreciation(self):
-        """Calculate annual depreciation cost using straight-line method."""
-        return self.capital_cost / self.useful_life
-
-    def total_cost(self, hours):
-        """Calculate total annual cost for given hours of operation."""
-        return self.depreciation_cost + (self.operating_cost_per_hour * hours) + self.repair_cost
-
-    def do_output(self, hours):
-        """Calculate total DO output for given hours."""
-        return self.do_rate * hours
-
-class AerationOptimizer:
-    """Class to optimize aeration device selection using linear programming."""
-    def __init__(self, aerators, min_do_required, hours):
-        self.aerators = aerators
-        self.min_do_required = min_do_required
-        self.hours = hours
-
-    def setup_optimization(self):
-        """Set up the linear programming problem."""
-        c = [aerator.total_cost(self.hours) for aerator in self.aerators]
-        A = [-aerator.do_output(self.hours) for aerator in self.aerators]  # Negative for >= constraint
-        b = [-self.min_do_required]
-        bounds = [(0, None) for _ in self.aerators]
-        return c, [A], b, bounds
-
-    def optimize(self):
-        """Run optimization to minimize total cost."""
-        c, A_ub, b_ub, bounds = self.setup_optimization()
-        result = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=bounds, method='highs')
-        
-        if result.success:
-            return {
-                "optimal_cost": result.fun,
-                "aerator_usage": {self.aerators[i].name: result.x[i] for i in range(len(self.aerators))},
-                "depreciation_cost": sum(self.aerators[i].depreciation_cost * result.x[i] for i in range(len(self.aerators)))
-            }
-        else:
-            return {"status": "Optimization failed", "message": result.message}
+from aeration_optimizer import Aerator, AerationOptimizer
 
 # Initial aerator data (mean values from Tables 1-3)
 initial_aerators = [
@@ -11,6 +11,7 @@ KWH_PRICE = 0.05
 TARGET_RPM = 125
 HP = 3  # Default to 3 HP
 VOLUME = 70  # Default to 70 m³ (ideal for 3 HP)
+AERATOR_ID = "Generic Paddlewheel"
 
 # Initialize calculator
 calculator = ShrimpPondCalculator(
@@ -22,20 +23,17 @@ def truncate_to_2_decimals(value):
     return float(f"{value:.2f}"[:f"{value:.2f}".index('.') + 3])
 
 def calculate_cost(temp, sal):
-    """Calculate US$/kg O₂ for given temperature and salinity"""
-    metrics = calculator.calculate_metrics(temp, sal, HP, VOLUME, T10, T70, KWH_PRICE)
-    return truncate_to_2_decimals(metrics["US$/kg O₂"])
+    """Calculate US$/kg O₂ for given temperature and salinity (scalars or broadcastable arrays)"""
+    metrics = calculator.calculate_metrics_batch(temp, sal, HP, VOLUME, T10, T70, KWH_PRICE, AERATOR_ID)
+    return np.vectorize(truncate_to_2_decimals, otypes=[float])(metrics["US$/kg O₂"])
 
 def plot_4_quadrant_heatmap():
     # Temperature and salinity ranges from metadata
     temp_range = np.arange(0, 41, 1)  # 0 to 40°C, step 1
     sal_range = np.arange(0, 41, 5)   # 0 to 40‰, step 5
     
-    # Create a 2D array for costs
-    costs = np.zeros((len(temp_range), len(sal_range)))
-    for i, temp in enumerate(temp_range):
-        for j, sal in enumerate(sal_range):
-            costs[i, j] = calculate_cost(temp, sal)
+    # Evaluate the whole temperature x salinity grid in one batch call
+    costs = calculate_cost(temp_range[:, None], sal_range[None, :])
     
     # Define quadrant boundaries (median values)
     temp_mid = 20  # Midpoint of 0–40°C
@@ -0,0 +1,348 @@
+import time
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import coo_matrix, csr_matrix, vstack
+
+# Ponds per MILP when no budget links them: branch and bound grows much faster than linearly with
+# the number of ponds, so single-pond problems are the quickest
+POND_BATCH = 1
+# Bisection rounds on the capital price of a binding budget
+PRICE_ROUNDS = 30
+
+class FleetSizingOptimizer:
+    """
+    Mixed-integer aerator fleet sizing across many ponds and hourly oxygen-demand profiles.
+
+    Decision variables (built on the Aerator cost model):
+      n[p, a]    whole units of aerator type a installed in pond p (integer)
+      y[p, a, h] units of type a running in pond p during hour h of the daily profile (0 <= y <= n)
+
+    Minimizes annual cost: (depreciation + repair) per installed unit plus operating cost per
+    running unit-hour over `days` operating days, subject to meeting every pond's hourly DO demand.
+    """
+    def __init__(self, aerators, demand, days=365, allowed=None, max_units=None, budget=None, budget_groups=None,
+                 capital_price=0.0):
+        """
+        Args:
+            aerators (list[Aerator]): Candidate aerator types (do_rate in kg O₂/h per unit).
+            demand (array): (ponds, hours) DO demand in kg O₂/h, e.g. a 24-hour profile per pond.
+            days (int): Operating days per year the daily profile is repeated.
+            allowed (array, optional): (ponds, types) bool placement mask; False forbids a type in a pond.
+            max_units (array, optional): Per-pond cap on total units, scalar, (ponds,) or (ponds, types) per type.
+            budget (float or array, optional): Capital budget(s); one per group when budget_groups is given.
+            budget_groups (array, optional): (ponds,) budget group index of each pond (shared budgets).
+            capital_price (float): Cost added per unit of capital spent (the Lagrangian price of a budget).
+
+        Raises:
+            ValueError: If budget_groups does not give every pond an integer index into budget.
+        """
+        self.aerators = aerators
+        self.demand = np.atleast_2d(np.asarray(demand, dtype=np.float64))
+        self.days = days
+        n_ponds, n_types = self.demand.shape[0], len(aerators)
+        self.allowed = np.ones((n_ponds, n_types), dtype=bool) if allowed is None else np.asarray(allowed, dtype=bool)
+        self.max_units = max_units
+        self.budget = budget
+        self.budget_groups = budget_groups
+        self.capital_price = capital_price
+        if budget_groups is not None:
+            groups = np.asarray(budget_groups)
+            n_budgets = 0 if budget is None else np.size(budget)
+            if (groups.shape != (n_ponds,) or not np.issubdtype(groups.dtype, np.integer)
+                    or np.any((groups < 0) | (groups >= n_budgets))):
+                raise ValueError(f"budget_groups must give each of the {n_ponds} ponds an integer index "
+                                 f"into the {n_budgets} budget(s).")
+
+    def setup_optimization(self):
+        """Build the objective, integrality, bounds and one sparse constraint matrix."""
+        n_ponds, n_hours = self.demand.shape
+        n_types = len(self.aerators)
+        n_install = n_ponds * n_types
+        n_run = n_install * n_hours
+        do_rate = np.array([aerator.do_rate for aerator in self.aerators], dtype=np.float64)
+        fixed_cost = np.array([aerator.depreciation_cost + aerator.repair_cost for aerator in self.aerators])
+        hourly_cost = np.array([aerator.operating_cost_per_hour for aerator in self.aerators], dtype=np.float64)
+        capital_cost = np.array([aerator.capital_cost for aerator in self.aerators], dtype=np.float64)
+
+        # Variable layout: n flattened as (pond, type), then y flattened as (pond, type, hour)
+        install_idx = np.arange(n_install).reshape(n_ponds, n_types)
+        run_idx = n_install + np.arange(n_run).reshape(n_ponds, n_types, n_hours)
+        c = np.concatenate([np.tile(fixed_cost + self.capital_price * capital_cost, n_ponds),
+                            np.tile(np.repeat(hourly_cost * self.days, n_hours), n_ponds)])
+        integrality = np.concatenate([np.ones(n_install), np.zeros(n_run)])
+
+        upper = np.full(n_install + n_run, np.inf)
+        per_type_cap = self.max_units is not None and np.ndim(self.max_units) == 2
+        install_cap = np.where(self.allowed, np.asarray(self.max_units, dtype=np.float64) if per_type_cap else np.inf, 0)
+        run_cap = np.repeat(install_cap[:, :, None], n_hours, axis=2)
+        # With non-negative costs no optimal fleet installs more units of a type than cover the pond's peak
+        # on their own, or runs a type beyond the hour's demand: removing such units never costs more
+        if np.all(do_rate > 0) and min(fixed_cost.min(), hourly_cost.min(), capital_cost.min()) >= 0:
+            demand = np.maximum(self.demand, 0)
+            install_cap = np.minimum(install_cap, np.ceil(demand.max(axis=1)[:, None] / do_rate[None, :]))
+            run_cap = np.minimum(run_cap, demand[:, None, :] / do_rate[None, :, None])
+        upper[:n_install] = install_cap.ravel()
+        upper[n_install:] = run_cap.ravel()
+        bounds = Bounds(np.zeros(n_install + n_run), upper)
+
+        blocks, lower_bounds, upper_bounds = [], [], []
+
+        # Hourly demand: sum_a do_rate[a] * y[p, a, h] >= demand[p, h]
+        demand_rows = np.broadcast_to(np.arange(n_ponds * n_hours).reshape(n_ponds, 1, n_hours), run_idx.shape)
+        blocks.append(coo_matrix((np.broadcast_to(do_rate[None, :, None], run_idx.shape).ravel(),
+                                  (demand_rows.ravel(), run_idx.ravel())),
+                                 shape=(n_ponds * n_hours, n_install + n_run)))
+        lower_bounds.append(self.demand.ravel())
+        upper_bounds.append(np.full(n_ponds * n_hours, np.inf))
+
+        # Running units never exceed installed units: y[p, a, h] - n[p, a] <= 0
+        link_rows = np.arange(n_run)
+        blocks.append(coo_matrix((np.concatenate([np.ones(n_run), -np.ones(n_run)]),
+                                  (np.concatenate([link_rows, link_rows]),
+                                   np.concatenate([run_idx.ravel(), np.repeat(install_idx.ravel(), n_hours)]))),
+                                 shape=(n_run, n_install + n_run)))
+        lower_bounds.append(np.full(n_run, -np.inf))
+        upper_bounds.append(np.zeros(n_run))
+
+        # Per-pond placement capacity: sum_a n[p, a] <= max_units[p]
+        if self.max_units is not None and not per_type_cap:
+            blocks.append(coo_matrix((np.ones(n_install), (np.repeat(np.arange(n_ponds), n_types), install_idx.ravel())),
+                                     shape=(n_ponds, n_install + n_run)))
+            lower_bounds.append(np.full(n_ponds, -np.inf))
+            upper_bounds.append(np.broadcast_to(np.asarray(self.max_units, dtype=np.float64), (n_ponds,)))
+
+        # Shared capital budgets: sum_{p in group, a} capital_cost[a] * n[p, a] <= budget[group]
+        if self.budget is not None:
+            groups = np.zeros(n_ponds, dtype=np.intp) if self.budget_groups is None else np.asarray(self.budget_groups)
+            budgets = np.atleast_1d(np.asarray(self.budget, dtype=np.float64))
+            blocks.append(coo_matrix((np.tile(capital_cost, n_ponds), (np.repeat(groups, n_types), install_idx.ravel())),
+                                     shape=(budgets.size, n_install + n_run)))
+            lower_bounds.append(np.full(budgets.size, -np.inf))
+            upper_bounds.append(budgets)
+
+        A = csr_matrix(vstack(blocks))
+        constraints = LinearConstraint(A, np.concatenate(lower_bounds), np.concatenate(upper_bounds))
+        return c, integrality, bounds, constraints
+
+    def independent_blocks(self, pond_batch=POND_BATCH):
+        """
+        Split the ponds into sets no constraint links, with the capital budget of each set.
+
+        Without a budget every pond is its own problem, so ponds are grouped in batches of
+        pond_batch; with budgets each budget group is one set (all ponds when there are no groups).
+        """
+        n_ponds = self.demand.shape[0]
+        if self.budget is None:
+            n_batches = -(-n_ponds // pond_batch)
+            return [(ponds, None) for ponds in np.array_split(np.arange(n_ponds), n_batches)] if n_batches else []
+        budgets = np.atleast_1d(np.asarray(self.budget, dtype=np.float64))
+        if self.budget_groups is None:
+            return [(np.arange(n_ponds), budgets)]
+        groups = np.asarray(self.budget_groups)
+        return [(np.flatnonzero(groups == group), budgets[group]) for group in range(budgets.size)
+                if np.any(groups == group)]
+
+    def subproblem(self, ponds, budget=None, capital_price=None):
+        """Fleet sizing restricted to some ponds, sharing one budget (or none), at this problem's capital price by default."""
+        max_units = self.max_units
+        if max_units is not None and np.ndim(max_units) > 0:
+            max_units = np.asarray(max_units)[ponds]
+        return FleetSizingOptimizer(self.aerators, self.demand[ponds], self.days, self.allowed[ponds], max_units, budget,
+                                    capital_price=self.capital_price if capital_price is None else capital_price)
+
+    def optimize(self, time_limit=None, mip_rel_gap=1e-4, pond_batch=POND_BATCH):
+        """
+        Solve the fleet sizing and return installed units per pond and type, plus the annual cost breakdown.
+
+        Ponds only interact through shared budgets, so each independent set of ponds (see
+        independent_blocks) is solved on its own (see solve_block); time_limit bounds the total time.
+        """
+        n_ponds, n_hours = self.demand.shape
+        n_types = len(self.aerators)
+        units = np.zeros((n_ponds, n_types))
+        running = np.zeros((n_ponds, n_types, n_hours))
+        optimal_cost = operating_cost = 0.0
+        gaps, statuses, messages = [], set(), []
+        start = time.perf_counter()
+        for ponds, budget in self.independent_blocks(pond_batch):
+            remaining = None if time_limit is None else max(time_limit - (time.perf_counter() - start), 0.0)
+            result = self.solve_block(ponds, budget, remaining, mip_rel_gap, pond_batch)
+            if result["status"] == "Optimization failed":
+                return {"status": "Optimization failed", "message": result["message"], "ponds": ponds}
+            units[ponds] = result["units"]
+            running[ponds] = result["running_units"]
+            statuses.add(result["status"])
+            messages.append(result["message"])
+            optimal_cost += result["optimal_cost"]
+            operating_cost += result["operating_cost"]
+            if result["mip_gap"] is not None:
+                gaps.append(result["mip_gap"])
+        capital = np.array([aerator.capital_cost for aerator in self.aerators], dtype=np.float64)
+        return {
+            "status": "Optimal" if statuses <= {"Optimal"} else "Feasible",
+            "optimal_cost": optimal_cost,
+            "mip_gap": max(gaps) if gaps else None,
+            "message": "; ".join(dict.fromkeys(messages)) if messages else "No ponds to size.",
+            "units": units,
+            "running_units": running,
+            "fleet": {aerator.name: units[:, i].sum() for i, aerator in enumerate(self.aerators)},
+            "capital_cost": float((units * capital).sum()),
+            "depreciation_cost": float(units.sum(axis=0) @ np.array([aerator.depreciation_cost for aerator in self.aerators])),
+            "operating_cost": operating_cost,
+        }
+
+    def solve_block(self, ponds, budget, time_limit=None, mip_rel_gap=1e-4, pond_batch=POND_BATCH):
+        """
+        Solve one independent set of ponds.
+
+        A budgeted set is first solved pond by pond without its budget: if that fleet fits the budget
+        it is also optimal with it. A binding budget is priced (see price_budget); the coupled MILP of
+        the whole set only runs when the priced fleet's gap exceeds mip_rel_gap, and the cheaper of
+        the two fleets is returned.
+        """
+        subproblem = self.subproblem(ponds, budget)
+        if budget is None:
+            return subproblem.solve(time_limit, mip_rel_gap)
+        start = time.perf_counter()
+        unbudgeted = self.subproblem(ponds).optimize(time_limit, mip_rel_gap, pond_batch)
+        if unbudgeted["status"] == "Optimization failed" or unbudgeted["capital_cost"] <= np.min(budget):
+            return unbudgeted
+        remaining = None if time_limit is None else max(time_limit - (time.perf_counter() - start), 0.0)
+        priced = self.price_budget(ponds, np.min(budget), unbudgeted, remaining, mip_rel_gap, pond_batch)
+        if priced is not None and priced["mip_gap"] <= mip_rel_gap:
+            return priced
+        if priced is None:
+            minimum = self.subproblem(ponds).minimum_capital()
+            if minimum > np.min(budget):
+                return {"status": "Optimization failed",
+                        "message": f"Budget {np.min(budget):.2f} is below the {minimum:.2f} of capital needed to meet demand."}
+        remaining = None if time_limit is None else max(time_limit - (time.perf_counter() - start), 0.0)
+        coupled = subproblem.solve(remaining, mip_rel_gap)
+        if priced is None or (coupled["status"] != "Optimization failed" and coupled["optimal_cost"] <= priced["optimal_cost"]):
+            return coupled
+        return priced
+
+    def minimum_capital(self):
+        """Least capital meeting every pond's demand, from per-pond MILPs' dual bounds (inf if a pond cannot be met)."""
+        capital_cost = np.array([aerator.capital_cost for aerator in self.aerators], dtype=np.float64)
+        total = 0.0
+        for pond in range(self.demand.shape[0]):
+            c, integrality, bounds, constraints = self.subproblem(np.array([pond])).setup_optimization()
+            c = np.concatenate([capital_cost, np.zeros(c.size - capital_cost.size)])
+            result = milp(c, integrality=integrality, bounds=bounds, constraints=constraints)
+            if result.x is None:
+                return np.inf
+            total += getattr(result, "mip_dual_bound", None) or result.fun
+        return total
+
+    def pond_costs(self, units, running):
+        """Annual cost and capital of each pond's fleet (units (ponds, types), running (ponds, types, hours))."""
+        fixed_cost = np.array([aerator.depreciation_cost + aerator.repair_cost for aerator in self.aerators])
+        hourly_cost = np.array([aerator.operating_cost_per_hour for aerator in self.aerators], dtype=np.float64)
+        capital_cost = np.array([aerator.capital_cost for aerator in self.aerators], dtype=np.float64)
+        operating = running.sum(axis=2) @ (hourly_cost * self.days)
+        return units @ fixed_cost + operating, units @ capital_cost, operating
+
+    def price_budget(self, ponds, budget, unbudgeted, time_limit=None, mip_rel_gap=1e-4, pond_batch=POND_BATCH,
+                     rounds=PRICE_ROUNDS):
+        """
+        Lagrangian heuristic for a binding budget: price capital and solve the ponds separately.
+
+        The price is bisected between the unbudgeted fleet (price 0, over budget) and a price whose
+        fleet fits the budget. A pond with the same fleet at both ends of the bracket keeps it at any
+        price in between, so each round only re-solves the ponds still changing. Leftover budget then
+        goes back, pond by pond, to the unbudgeted fleets that save the most per unit of capital. The
+        priced optima bound the budgeted cost from below (within mip_rel_gap), which gives the gap.
+
+        Args:
+            ponds (array): Ponds of the block, sharing `budget`.
+            unbudgeted (dict): optimize() result for these ponds without the budget.
+
+        Returns:
+            dict: Result like solve() for the fleet within budget, or None if no price brings the fleet within it.
+        """
+        start = time.perf_counter()
+        block = self.subproblem(ponds)
+
+        def solve_at(price, units, running, changing):
+            remaining = None if time_limit is None else max(time_limit - (time.perf_counter() - start), 0.0)
+            result = self.subproblem(ponds[changing], capital_price=price).optimize(remaining, mip_rel_gap, pond_batch)
+            if result["status"] == "Optimization failed":
+                return None
+            units, running = units.copy(), running.copy()
+            units[changing], running[changing] = result["units"], result["running_units"]
+            return units, running
+
+        def fill(high, low):
+            """Spend the leftover budget on the ponds whose low-price fleet saves the most per unit of capital."""
+            units, running = high[0].copy(), high[1].copy()
+            cost_high, capital_high, _ = block.pond_costs(*high)
+            cost_low, capital_low, _ = block.pond_costs(*low)
+            saving, extra = cost_high - cost_low, capital_low - capital_high
+            slack = budget - capital_high.sum()
+            for pond in np.argsort(-saving / np.where(extra > 0, extra, np.inf), kind="stable"):
+                if saving[pond] > 0 and extra[pond] <= slack:
+                    units[pond], running[pond] = low[0][pond], low[1][pond]
+                    slack -= extra[pond]
+            return units, running
+
+        low = (unbudgeted["units"], unbudgeted["running_units"])
+        low_price, high, price = 0.0, None, 1.0
+        lower_bound = unbudgeted["optimal_cost"]
+        everything = np.ones(len(ponds), dtype=bool)
+        for _ in range(rounds):
+            changing = everything if high is None else np.any(low[0] != high[0], axis=1)
+            if not changing.any():
+                break
+            price = price * 4 if high is None and low_price > 0 else (price if high is None else (low_price + high_price) / 2)
+            fleet = solve_at(price, *(low if high is None else high), changing)
+            if fleet is None:
+                return None
+            cost, capital, _ = block.pond_costs(*fleet)
+            lower_bound = max(lower_bound, cost.sum() + price * (capital.sum() - budget))
+            if capital.sum() <= budget:
+                high, high_price = fleet, price
+            elif high is None and low_price > 0 and np.array_equal(fleet[0], low[0]):
+                return None # A higher price no longer cuts capital: no price fits the budget
+            else:
+                low, low_price = fleet, price
+            if high is not None:
+                units, running = fill(high, low)
+                cost, _, operating = block.pond_costs(units, running)
+                total = float(cost.sum())
+                gap = max(total - lower_bound, 0.0) / max(abs(total), 1e-12)
+                if gap <= mip_rel_gap:
+                    break
+        if high is None:
+            return None
+        return {
+            "status": "Optimal" if gap <= mip_rel_gap else "Feasible",
+            "optimal_cost": total,
+            "mip_gap": gap,
+            "message": f"Capital priced at {high_price:.4g} per unit of budget (Lagrangian bound gap {gap:.2%}).",
+            "units": units,
+            "running_units": running,
+            "operating_cost": float(operating.sum()),
+        }
+
+    def solve(self, time_limit=None, mip_rel_gap=1e-4):
+        """Run this problem as a single MILP (all ponds at once) and return its solution."""
+        c, integrality, bounds, constraints = self.setup_optimization()
+        options = {"mip_rel_gap": mip_rel_gap}
+        if time_limit is not None:
+            options["time_limit"] = time_limit
+        result = milp(c, integrality=integrality, bounds=bounds, constraints=constraints, options=options)
+
+        if result.x is None:
+            return {"status": "Optimization failed", "message": result.message}
+        n_ponds, n_hours = self.demand.shape
+        n_install = n_ponds * len(self.aerators)
+        return {
+            "status": "Optimal" if result.status == 0 else "Feasible",
+            "optimal_cost": result.fun,
+            "mip_gap": getattr(result, "mip_gap", None),
+            "message": result.message,
+            "units": np.rint(result.x[:n_install]).reshape(n_ponds, len(self.aerators)),
+            "running_units": result.x[n_install:].reshape(n_ponds, len(self.aerators), n_hours),
+            "operating_cost": float(c[n_install:] @ result.x[n_install:]),
+        }
@@ -1,65 +1,12 @@
 import numpy as np
-from scipy.optimize import linprog
-import ipywidgets as widgets
-from IPython.display import display, clear_output
-import matplotlib.pyplot as plt
+import copy
 import os
 from datetime import datetime
 from sae_sotr_calculator import ShrimpPondCalculator
+from aeration_optimizer import Aerator, AerationOptimizer, solve_covering_lp_batch
 
-# Classes from aerator_depreciation_calculator.py
-class Aerator:
-    """Class representing an aeration device with cost and performance attributes."""
-    def __init__(self, name, hp, capital_cost, useful_life, repair_cost, operating_cost_per_hour, do_rate):
-        self.name = name
-        self.hp = hp
-        self.capital_cost = capital_cost
-        self.useful_life = useful_life
-        self.repair_cost = repair_cost
-        self.operating_cost_per_hour = operating_cost_per_hour
-        self.do_rate = do_rate  # kg of DO per hour
-        self.depreciation_cost = self.calculate_depreciation()
-
-    def calculate_depreciation(self):
-        """Calculate annual depreciation cost using straight-line method."""
-        return self.capital_cost / self.useful_life
-
-    def total_cost(self, hours):
-        """Calculate total annual cost for given hours of operation."""
-        return self.depreciation_cost + (self.operating_cost_per_hour * hours) + self.repair_cost
-
-    def do_output(self, hours):
-        """Calculate total DO output for given hours."""
-        return self.do_rate * hours
-
-class AerationOptimizer:
-    """Class to optimize aeration device selection using linear programming."""
-    def __init__(self, aerators, min_do_required, hours):
-        self.aerators = aerators
-        self.min_do_required = min_do_required
-        self.hours = hours
-
-    def setup_optimization(self):
-        """Set up the linear programming problem."""
-        c = [aerator.total_cost(self.hours) for aerator in self.aerators]
-        A = [-aerator.do_output(self.hours) for aerator in self.aerators]  # Negative for >= constraint
-        b = [-self.min_do_required]
-        bounds = [(0, None) for _ in self.aerators]
-        return c, [A], b, bounds
-
-    def optimize(self):
-        """Run optimization to minimize total cost."""
-        c, A_ub, b_ub, bounds = self.setup_optimization()
-        result = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=bounds, method='highs')
-        
-        if result.success:
-            return {
-                "optimal_cost": result.fun,
-                "aerator_usage": {self.aerators[i].name: result.x[i] for i in range(len(self.aerators))},
-                "depreciation_cost": sum(self.aerators[i].depreciation_cost * result.x[i] for i in range(len(self.aerators)))
-            }
-        else:
-            return {"status": "Optimization failed", "message": result.message}
+DATA_PATH = "/home/luisvinatea/Dev/Repos/Aquaculture/data/raw/json/o2_temp_sal_100_sat.json"
+SAVE_PATH = "/home/luisvinatea/Dev/Repos/Aquaculture/reports/experiments"
 
 # Initial aerator data (now focusing on paddlewheels with placeholder values)
 initial_aerators = [
@@ -73,11 +20,234 @@ def truncate_to_2_decimals(value):
     """Truncate float to 2 decimal places without rounding"""
     return float(f"{value:.2f}"[:f"{value:.2f}".index('.') + 3])
 
+# Default scenario for the headless pipeline (same values as the interface defaults)
+DEFAULT_PARAMS = {
+    "aerator_tier": "Medium",
+    "temperature": 28,
+    "salinity": 30,
+    "kwh_price": 0.05,
+    "pond_volume": 70,
+    "daily_hours": 8,
+    "aerators": [
+        {**aerator, "do_deficit_factor": 1.0, "water_depth_factor": 1.0, "placement_factor": 1.0}
+        for aerator in initial_aerators
+    ]
+}
+
+def make_params(**overrides):
+    """Return a deep copy of DEFAULT_PARAMS with top-level keys overridden"""
+    params = copy.deepcopy(DEFAULT_PARAMS)
+    params.update(overrides)
+    return params
+
+def _aerator_id(aerator):
+    return f"{aerator['brand']} {aerator['model']} {aerator['version']}"
+
+def run_integrated_analysis(params, calculator=None):
+    """
+    Headless version of the "Run Analysis" button: metrics, LP optimization, sub/over-powered
+    breakeven and the text report for one parameter set.
+
+    Args:
+        params (dict): Scenario in the DEFAULT_PARAMS layout (global settings plus an "aerators" list).
+        calculator (ShrimpPondCalculator, optional): Reused across calls; built from DATA_PATH if omitted.
+
+    Returns:
+        dict: Intermediate metrics, optimization and breakeven results, and the formatted "report".
+    """
+    if calculator is None:
+        calculator = ShrimpPondCalculator(DATA_PATH)
+    TEMPERATURE = params["temperature"]
+    SALINITY = params["salinity"]
+    KWH_PRICE = params["kwh_price"]
+    pond_volume = params["pond_volume"]
+    aerator_params = params["aerators"]
+
+    # Calculate yearly hours
+    yearly_hours = params["daily_hours"] * 365
+
+    # Calculate average horsepower
+    global_hp = sum(aerator["hp"] for aerator in aerator_params) / len(aerator_params)
+
+    # Use the first aerator's parameters for initial SOTR calculation (placeholder)
+    first = aerator_params[0]
+    first_aerator_id = _aerator_id(first)
+    initial_metrics = calculator.calculate_metrics(
+        TEMPERATURE, SALINITY, global_hp, pond_volume, first["t10"], first["t70"], KWH_PRICE, first_aerator_id,
+        first["do_deficit_factor"], first["water_depth_factor"], first["placement_factor"]
+    )
+    initial_sotr = initial_metrics["SOTR (kg O₂/h)"]
+    initial_total_o2_demand = initial_sotr * yearly_hours  # Placeholder demand
+
+    # Calculate ideal HP metrics
+    ideal_hp = calculator.get_ideal_hp(pond_volume)
+    ideal_metrics = calculator.calculate_metrics(
+        TEMPERATURE, SALINITY, ideal_hp, pond_volume, first["t10"], first["t70"], KWH_PRICE, first_aerator_id,
+        first["do_deficit_factor"], first["water_depth_factor"], first["placement_factor"]
+    )
+    ideal_volume = calculator.get_ideal_volume(global_hp)
+
+    initial_metrics = {k: truncate_to_2_decimals(v) if isinstance(v, float) else v 
+                      for k, v in initial_metrics.items()}
+    ideal_metrics = {k: truncate_to_2_decimals(v) if isinstance(v, float) else v 
+                   for k, v in ideal_metrics.items()}
+
+    # Build aerators with dynamically calculated DO rates
+    updated_aerators = []
+    aerator_metrics = {}  # Store metrics for each aerator for output
+    for aerator in aerator_params:
+        aerator_id = _aerator_id(aerator)
+        metrics = calculator.calculate_metrics(
+            TEMPERATURE, SALINITY, aerator["hp"], pond_volume, aerator["t10"], aerator["t70"], KWH_PRICE, aerator_id,
+            aerator["do_deficit_factor"], aerator["water_depth_factor"], aerator["placement_factor"]
+        )
+        metrics = {k: truncate_to_2_decimals(v) if isinstance(v, float) else v 
+                  for k, v in metrics.items()}
+        aerator_metrics[aerator_id] = metrics  # Store metrics for output
+
+        updated_aerators.append(Aerator(
+            name=aerator_id,
+            hp=aerator["hp"],
+            capital_cost=aerator["capital_cost"],
+            useful_life=aerator["useful_life"],
+            repair_cost=aerator["repair_cost"],
+            operating_cost_per_hour=aerator["operating_cost_per_hour"],
+            do_rate=metrics["SOTR (kg O₂/h)"]
+        ))
+
+    # Run optimization to meet initial oxygen demand
+    optimizer = AerationOptimizer(updated_aerators, initial_total_o2_demand, yearly_hours)
+    result = optimizer.optimize()
+
+    # Recalculate total oxygen demand based on selected aerator(s)
+    total_o2_demand = 0
+    if "aerator_usage" in result:
+        for aerator, usage in zip(updated_aerators, result["aerator_usage"].values()):
+            if usage > 0:
+                total_o2_demand += aerator.do_rate * yearly_hours * usage
+    else:
+        total_o2_demand = initial_total_o2_demand  # Fallback if optimization fails
+
+    # Breakeven analysis: Subpowered vs Overpowered for each aerator
+    # Subpowered: half the aerator's HP (or minimum HP), Overpowered: double (or max HP)
+    subpowered_hp = [max(0.5, aerator.hp / 2) for aerator in updated_aerators]
+    overpowered_hp = [min(20, aerator.hp * 2) for aerator in updated_aerators]
+    settings = aerator_params + aerator_params
+    breakeven_metrics = calculator.calculate_metrics_batch(
+        TEMPERATURE, SALINITY, subpowered_hp + overpowered_hp, pond_volume,
+        [a["t10"] for a in settings], [a["t70"] for a in settings], KWH_PRICE,
+        [aerator.name for aerator in updated_aerators] * 2,
+        [a["do_deficit_factor"] for a in settings], [a["water_depth_factor"] for a in settings],
+        [a["placement_factor"] for a in settings]
+    )
+    breakeven_o2_demand = breakeven_metrics["SOTR (kg O₂/h)"] * yearly_hours
+    # Each breakeven case is a single-aerator LP; solve all 2N of them in one closed-form pass
+    breakeven_aerators = updated_aerators + updated_aerators
+    unit_costs = np.array([[aerator.total_cost(yearly_hours)] for aerator in breakeven_aerators])
+    unit_outputs = np.array([[aerator.do_output(yearly_hours)] for aerator in breakeven_aerators])
+    units, status = solve_covering_lp_batch(unit_costs, unit_outputs, breakeven_o2_demand)
+    breakeven_costs = np.where(status == 0, (unit_costs * units)[:, 0], np.inf).tolist()
+    subpowered_costs = breakeven_costs[:len(updated_aerators)]
+    overpowered_costs = breakeven_costs[len(updated_aerators):]
+
+    results = {
+        "params": params,
+        "global_hp": global_hp,
+        "ideal_hp": ideal_hp,
+        "ideal_volume": ideal_volume,
+        "yearly_hours": yearly_hours,
+        "total_o2_demand": total_o2_demand,
+        "initial_metrics": initial_metrics,
+        "ideal_metrics": ideal_metrics,
+        "aerators": updated_aerators,
+        "aerator_metrics": aerator_metrics,
+        "optimization": result,
+        "aerator_ids": [aerator.name for aerator in updated_aerators],
+        "subpowered_costs": subpowered_costs,
+        "overpowered_costs": overpowered_costs
+    }
+    results["report"] = format_integrated_report(results)
+    return results
+
+def format_integrated_report(results):
+    """Render the plain-text report saved for each integrated analysis"""
+    params = results["params"]
+    global_hp = results["global_hp"]
+    initial_metrics = results["initial_metrics"]
+    ideal_metrics = results["ideal_metrics"]
+    result = results["optimization"]
+    updated_aerators = results["aerators"]
+
+    output_str = f"Integrated Analysis\n\n"
+    output_str += f"Aerator Tier: {params['aerator_tier']}\n"
+    output_str += f"Temperature: {params['temperature']} °C\n"
+    output_str += f"Salinity: {params['salinity']} ‰\n"
+    output_str += f"Average Horse Power: {global_hp:.2f} HP\n"
+    output_str += f"Ideal Horse Power for {params['pond_volume']} m³: {results['ideal_hp']} HP\n"
+    output_str += f"Selected Pond Volume: {params['pond_volume']} m³\n"
+    output_str += f"Ideal Pond Volume for {global_hp:.2f} HP: {results['ideal_volume']} m³\n"
+    output_str += f"Daily Hours: {params['daily_hours']}\n"
+    output_str += f"Yearly Hours: {results['yearly_hours']}\n"
+    output_str += f"Total Oxygen Demand: {results['total_o2_demand']:.2f} kg O₂/year\n"
+    output_str += f"kWh Price: ${params['kwh_price']}\n\n"
+
+    output_str += "Aerator-Specific Parameters:\n"
+    for aerator, settings in zip(updated_aerators, params["aerators"]):
+        metrics = results["aerator_metrics"][aerator.name]
+        output_str += f"{aerator.name}:\n"
+        output_str += f"  Horse Power: {aerator.hp:.2f} HP\n"
+        output_str += f"  t₁₀: {settings['t10']} min\n"
+        output_str += f"  t₇₀: {settings['t70']} min\n"
+        output_str += f"  DO Deficit Factor: {settings['do_deficit_factor']:.2f}\n"
+        output_str += f"  Water Depth Factor: {settings['water_depth_factor']:.2f}\n"
+        output_str += f"  Placement Factor: {settings['placement_factor']:.2f}\n"
+        output_str += f"  Calculated DO Rate: {aerator.do_rate:.2f} kg O₂/h\n"
+        output_str += f"  SAE: {metrics['SAE (kg O₂/kWh)']:.2f} kg O₂/kWh\n"
+        output_str += f"  KlaT: {metrics['KlaT (h⁻¹)']:.2f} h⁻¹\n"
+        output_str += f"  Power: {metrics['Power (kW)']:.2f} kW\n\n"
+
+    output_str += "Metrics Comparison (Average HP vs Ideal HP):\n"
+    for key in initial_metrics:
+        log_var = np.log10(abs(initial_metrics[key] - ideal_metrics[key]) + 1) * (1 if (initial_metrics[key] - ideal_metrics[key]) >= 0 else -1)
+        log_var = truncate_to_2_decimals(log_var) if isinstance(initial_metrics[key], float) else 'N/A'
+        output_str += f"{key}: {initial_metrics[key]} vs {ideal_metrics[key]} (Log % Variation: {log_var})\n"
+
+    output_str += "\nOptimization Results:\n"
+    if "optimal_cost" in result:
+        output_str += f"Optimal Total Cost: ${result['optimal_cost']:.2f}\n"
+        output_str += f"Depreciation Cost: ${result['depreciation_cost']:.2f}\n"
+        output_str += "Aerator Usage:\n"
+        for name, usage in result["aerator_usage"].items():
+            if usage > 0:
+                output_str += f"  {name}: {usage:.2f} units\n"
+    else:
+        output_str += f"Status: {result['status']}\n"
+        output_str += f"Message: {result['message']}\n"
+
+    output_str += "\nBreakeven Analysis (Subpowered vs Overpowered):\n"
+    for i, aerator_id in enumerate(results["aerator_ids"]):
+        output_str += f"{aerator_id}:\n"
+        output_str += f"  Subpowered Cost (HP={max(0.5, updated_aerators[i].hp / 2):.2f}): ${results['subpowered_costs'][i]:.2f}\n"
+        output_str += f"  Overpowered Cost (HP={min(20, updated_aerators[i].hp * 2):.2f}): ${results['overpowered_costs'][i]:.2f}\n"
+    return output_str
+
+def save_integrated_report(results, save_path=SAVE_PATH):
+    """Write the report to save_path with the integrated_do_<demand>_hours_<hours>_<timestamp>.txt naming"""
+    os.makedirs(save_path, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"integrated_do_{int(results['total_o2_demand'])}_hours_{results['yearly_hours']}_{timestamp}.txt"
+    filepath = os.path.join(save_path, filename)
+    with open(filepath, 'w') as f:
+        f.write(results["report"])
+    return filepath
+
 # Integrated financial model
 def create_integrated_interface():
-    calculator = ShrimpPondCalculator(
-        "/home/luisvinatea/Dev/Repos/Aquaculture/data/raw/json/o2_temp_sal_100_sat.json"
-    )
+    import ipywidgets as widgets
+    from IPython.display import display, clear_output
+    import matplotlib.pyplot as plt
+
+    calculator = ShrimpPondCalculator(DATA_PATH)
     
     # Global widgets
     temperature_widget = widgets.FloatSlider(value=28, min=20, max=35, step=0.1, description="Temperature (°C):", style={'description_width': 'initial'})
@@ -175,10 +345,6 @@ def create_integrated_interface():
         return widgets_dict
 
     aerator_widgets = create_aerator_widgets(initial_aerators)
-    
-    # Save path
-    SAVE_PATH = "/home/luisvinatea/Dev/Repos/Aquaculture/reports/experiments"
-    os.makedirs(SAVE_PATH, exist_ok=True)
 
     def plot_cost_comparison(calculated_cost, ideal_cost, subpowered_costs, overpowered_costs, aerator_ids):
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
@@ -206,216 +372,48 @@ def create_integrated_interface():
         plt.tight_layout()
         plt.show()
 
+    def params_from_widgets():
+        """Collect the current widget values into a run_integrated_analysis parameter set"""
+        aerators = []
+        for aerator_widget in aerator_widgets.values():
+            aerators.append({
+                "brand": aerator_widget["brand"].value,
+                "model": aerator_widget["model"].value,
+                "version": aerator_widget["version"].value,
+                "hp": aerator_widget["horsepower"].value,
+                "t10": aerator_widget["t10"].value,
+                "t70": aerator_widget["t70"].value,
+                "capital_cost": aerator_widget["capital_cost"].value,
+                "useful_life": aerator_widget["useful_life"].value,
+                "repair_cost": aerator_widget["repair_cost"].value,
+                "operating_cost_per_hour": aerator_widget["operating_cost"].value,
+                "do_deficit_factor": aerator_widget["do_deficit_factor"].value,
+                "water_depth_factor": aerator_widget["water_depth_factor"].value,
+                "placement_factor": aerator_widget["placement_factor"].value
+            })
+        return {
+            "aerator_tier": aerator_tier.value,
+            "temperature": temperature_widget.value,
+            "salinity": salinity_widget.value,
+            "kwh_price": kwh_price_widget.value,
+            "pond_volume": pond_volume.value,
+            "daily_hours": daily_hours.value,
+            "aerators": aerators
+        }
+
     def run_analysis(button):
         with output:
             clear_output(wait=True)
-            
-            # Get global parameters from widgets
-            TEMPERATURE = temperature_widget.value
-            SALINITY = salinity_widget.value
-            KWH_PRICE = kwh_price_widget.value
-            
-            # Calculate yearly hours
-            yearly_hours = daily_hours.value * 365
-            
-            # Calculate average horsepower
-            global_hp = sum(widget["horsepower"].value for widget in aerator_widgets.values()) / len(aerator_widgets)
-            
-            # Use the first aerator's parameters for initial SOTR calculation (placeholder)
-            first_aerator_id = list(aerator_widgets.keys())[0]
-            initial_metrics = calculator.calculate_metrics(
-                TEMPERATURE, SALINITY, global_hp, pond_volume.value, 
-                aerator_widgets[first_aerator_id]["t10"].value, 
-                aerator_widgets[first_aerator_id]["t70"].value, 
-                KWH_PRICE, first_aerator_id,
-                aerator_widgets[first_aerator_id]["do_deficit_factor"].value,
-                aerator_widgets[first_aerator_id]["water_depth_factor"].value,
-                aerator_widgets[first_aerator_id]["placement_factor"].value
-            )
-            initial_sotr = initial_metrics["SOTR (kg O₂/h)"]
-            initial_total_o2_demand = initial_sotr * yearly_hours  # Placeholder demand
-            
-            # Calculate ideal HP metrics
-            ideal_hp = calculator.get_ideal_hp(pond_volume.value)
-            ideal_metrics = calculator.calculate_metrics(
-                TEMPERATURE, SALINITY, ideal_hp, pond_volume.value, 
-                aerator_widgets[first_aerator_id]["t10"].value, 
-                aerator_widgets[first_aerator_id]["t70"].value, 
-                KWH_PRICE, first_aerator_id,
-                aerator_widgets[first_aerator_id]["do_deficit_factor"].value,
-                aerator_widgets[first_aerator_id]["water_depth_factor"].value,
-                aerator_widgets[first_aerator_id]["placement_factor"].value
-            )
-            ideal_volume = calculator.get_ideal_volume(global_hp)
-            
-            initial_metrics = {k: truncate_to_2_decimals(v) if isinstance(v, float) else v 
-                              for k, v in initial_metrics.items()}
-            ideal_metrics = {k: truncate_to_2_decimals(v) if isinstance(v, float) else v 
-                           for k, v in ideal_metrics.items()}
-            
-            # Update aerators with widget values and dynamically calculated DO rates
-            updated_aerators = []
-            aerator_metrics = {}  # Store metrics for each aerator for output
-            aerator_id_mapping = {}  # Map original aerator_id to updated aerator_id
-            for original_aerator_id, widgets in aerator_widgets.items():
-                # Update aerator_id based on widget inputs
-                updated_aerator_id = f"{widgets['brand'].value} {widgets['model'].value} {widgets['version'].value}"
-                aerator_id_mapping[updated_aerator_id] = original_aerator_id  # Map updated to original
-                hp = widgets["horsepower"].value
-                t10 = widgets["t10"].value
-                t70 = widgets["t70"].value
-                do_deficit_factor = widgets["do_deficit_factor"].value
-                water_depth_factor = widgets["water_depth_factor"].value
-                placement_factor = widgets["placement_factor"].value
-                
-                # Calculate DO rate dynamically using ShrimpPondCalculator
-                metrics = calculator.calculate_metrics(
-                    TEMPERATURE, SALINITY, hp, pond_volume.value, t10, t70, KWH_PRICE, updated_aerator_id,
-                    do_deficit_factor, water_depth_factor, placement_factor
-                )
-                metrics = {k: truncate_to_2_decimals(v) if isinstance(v, float) else v 
-                          for k, v in metrics.items()}
-                do_rate = metrics["SOTR (kg O₂/h)"]
-                aerator_metrics[updated_aerator_id] = metrics  # Store metrics for output
-                
-                updated_aerators.append(Aerator(
-                    name=updated_aerator_id,
-                    hp=hp,
-                    capital_cost=widgets["capital_cost"].value,
-                    useful_life=widgets["useful_life"].value,
-                    repair_cost=widgets["repair_cost"].value,
-                    operating_cost_per_hour=widgets["operating_cost"].value,
-                    do_rate=do_rate
-                ))
-            
-            # Run optimization to meet initial oxygen demand
-            optimizer = AerationOptimizer(updated_aerators, initial_total_o2_demand, yearly_hours)
-            result = optimizer.optimize()
-            
-            # Recalculate total oxygen demand based on selected aerator(s)
-            total_o2_demand = 0
-            if "aerator_usage" in result:
-                for aerator, usage in zip(updated_aerators, result["aerator_usage"].values()):
-                    if usage > 0:
-                        total_o2_demand += aerator.do_rate * yearly_hours * usage
-            else:
-                total_o2_demand = initial_total_o2_demand  # Fallback if optimization fails
-            
-            # Breakeven analysis: Subpowered vs Overpowered for each aerator
-            subpowered_costs = []
-            overpowered_costs = []
-            aerator_ids = [aerator.name for aerator in updated_aerators]
-            
-            for aerator in updated_aerators:
-                updated_aerator_id = aerator.name
-                # Use the mapping to get the original aerator_id
-                original_aerator_id = aerator_id_mapping[updated_aerator_id]
-                widgets = aerator_widgets[original_aerator_id]
-                # Subpowered: Use half the aerator's HP (or minimum HP)
-                subpowered_hp = max(0.5, aerator.hp / 2)
-                subpowered_metrics = calculator.calculate_metrics(
-                    TEMPERATURE, SALINITY, subpowered_hp, pond_volume.value,
-                    widgets["t10"].value,
-                    widgets["t70"].value,
-                    KWH_PRICE, updated_aerator_id,
-                    widgets["do_deficit_factor"].value,
-                    widgets["water_depth_factor"].value,
-                    widgets["placement_factor"].value
-                )
-                subpowered_o2_per_hour = subpowered_metrics["SOTR (kg O₂/h)"]
-                subpowered_o2_demand = subpowered_o2_per_hour * yearly_hours
-                sub_optimizer = AerationOptimizer([aerator], subpowered_o2_demand, yearly_hours)
-                sub_result = sub_optimizer.optimize()
-                subpowered_costs.append(sub_result['optimal_cost'] if 'optimal_cost' in sub_result else float('inf'))
-                
-                # Overpowered: Use double the aerator's HP (or max HP)
-                overpowered_hp = min(20, aerator.hp * 2)
-                overpowered_metrics = calculator.calculate_metrics(
-                    TEMPERATURE, SALINITY, overpowered_hp, pond_volume.value,
-                    widgets["t10"].value,
-                    widgets["t70"].value,
-                    KWH_PRICE, updated_aerator_id,
-                    widgets["do_deficit_factor"].value,
-                    widgets["water_depth_factor"].value,
-                    widgets["placement_factor"].value
-                )
-                overpowered_o2_per_hour = overpowered_metrics["SOTR (kg O₂/h)"]
-                overpowered_o2_demand = overpowered_o2_per_hour * yearly_hours
-                over_optimizer = AerationOptimizer([aerator], overpowered_o2_demand, yearly_hours)
-                over_result = over_optimizer.optimize()
-                overpowered_costs.append(over_result['optimal_cost'] if 'optimal_cost' in over_result else float('inf'))
-            
-            # Generate filename with specs
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"integrated_do_{int(total_o2_demand)}_hours_{yearly_hours}_{timestamp}.txt"
-            filepath = os.path.join(SAVE_PATH, filename)
-            
-            # Prepare output string
-            output_str = f"Integrated Analysis\n\n"
-            output_str += f"Aerator Tier: {aerator_tier.value}\n"
-            output_str += f"Temperature: {TEMPERATURE} °C\n"
-            output_str += f"Salinity: {SALINITY} ‰\n"
-            output_str += f"Average Horse Power: {global_hp:.2f} HP\n"
-            output_str += f"Ideal Horse Power for {pond_volume.value} m³: {ideal_hp} HP\n"
-            output_str += f"Selected Pond Volume: {pond_volume.value} m³\n"
-            output_str += f"Ideal Pond Volume for {global_hp:.2f} HP: {ideal_volume} m³\n"
-            output_str += f"Daily Hours: {daily_hours.value}\n"
-            output_str += f"Yearly Hours: {yearly_hours}\n"
-            output_str += f"Total Oxygen Demand: {total_o2_demand:.2f} kg O₂/year\n"
-            output_str += f"kWh Price: ${KWH_PRICE}\n\n"
-            
-            output_str += "Aerator-Specific Parameters:\n"
-            for aerator in updated_aerators:
-                updated_aerator_id = aerator.name
-                original_aerator_id = aerator_id_mapping[updated_aerator_id]
-                widgets = aerator_widgets[original_aerator_id]
-                metrics = aerator_metrics[updated_aerator_id]
-                output_str += f"{updated_aerator_id}:\n"
-                output_str += f"  Horse Power: {aerator.hp:.2f} HP\n"
-                output_str += f"  t₁₀: {widgets['t10'].value} min\n"
-                output_str += f"  t₇₀: {widgets['t70'].value} min\n"
-                output_str += f"  DO Deficit Factor: {widgets['do_deficit_factor'].value:.2f}\n"
-                output_str += f"  Water Depth Factor: {widgets['water_depth_factor'].value:.2f}\n"
-                output_str += f"  Placement Factor: {widgets['placement_factor'].value:.2f}\n"
-                output_str += f"  Calculated DO Rate: {aerator.do_rate:.2f} kg O₂/h\n"
-                output_str += f"  SAE: {metrics['SAE (kg O₂/kWh)']:.2f} kg O₂/kWh\n"
-                output_str += f"  KlaT: {metrics['KlaT (h⁻¹)']:.2f} h⁻¹\n"
-                output_str += f"  Power: {metrics['Power (kW)']:.2f} kW\n\n"
-            
-            output_str += "Metrics Comparison (Average HP vs Ideal HP):\n"
-            for key in initial_metrics:
-                log_var = np.log10(abs(initial_metrics[key] - ideal_metrics[key]) + 1) * (1 if (initial_metrics[key] - ideal_metrics[key]) >= 0 else -1)
-                log_var = truncate_to_2_decimals(log_var) if isinstance(initial_metrics[key], float) else 'N/A'
-                output_str += f"{key}: {initial_metrics[key]} vs {ideal_metrics[key]} (Log % Variation: {log_var})\n"
-            
-            output_str += "\nOptimization Results:\n"
-            if "optimal_cost" in result:
-                output_str += f"Optimal Total Cost: ${result['optimal_cost']:.2f}\n"
-                output_str += f"Depreciation Cost: ${result['depreciation_cost']:.2f}\n"
-                output_str += "Aerator Usage:\n"
-                for name, usage in result["aerator_usage"].items():
-                    if usage > 0:
-                        output_str += f"  {name}: {usage:.2f} units\n"
-            else:
-                output_str += f"Status: {result['status']}\n"
-                output_str += f"Message: {result['message']}\n"
-            
-            output_str += "\nBreakeven Analysis (Subpowered vs Overpowered):\n"
-            for i, aerator_id in enumerate(aerator_ids):
-                output_str += f"{aerator_id}:\n"
-                output_str += f"  Subpowered Cost (HP={max(0.5, updated_aerators[i].hp / 2):.2f}): ${subpowered_costs[i]:.2f}\n"
-                output_str += f"  Overpowered Cost (HP={min(20, updated_aerators[i].hp * 2):.2f}): ${overpowered_costs[i]:.2f}\n"
-            
-            # Save to file
-            with open(filepath, 'w') as f:
-                f.write(output_str)
+            results = run_integrated_analysis(params_from_widgets(), calculator)
+            filepath = save_integrated_report(results)
             
             # Print to output
-            print(output_str)
+            print(results["report"])
             print(f"Results saved to: {filepath}")
             
             # Plot comparisons
-            plot_cost_comparison(initial_metrics['US$/kg O₂'], ideal_metrics['US$/kg O₂'], subpowered_costs, overpowered_costs, aerator_ids)
+            plot_cost_comparison(results["initial_metrics"]['US$/kg O₂'], results["ideal_metrics"]['US$/kg O₂'],
+                                 results["subpowered_costs"], results["overpowered_costs"], results["aerator_ids"])
 
     # Connect button to function
     run_button.on_click(run_analysis)
@@ -0,0 +1,224 @@
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from sae_sotr_calculator import ShrimpPondCalculator
+from integrated_aeration_model import DATA_PATH, make_params, run_integrated_analysis
+
+# Calculator shared by every scenario a worker process runs
+_worker_calculator = None
+
+def _init_worker(data_path, use_sidecar):
+    global _worker_calculator
+    _worker_calculator = ShrimpPondCalculator(data_path, use_sidecar=use_sidecar)
+
+def _set_param(params, path, value):
+    """Set a dotted parameter path, e.g. "temperature" or "aerators.0.hp" ("aerators.*.hp" sets every aerator)"""
+    keys = path.split(".")
+    targets = [params]
+    for key in keys[:-1]:
+        if key == "*":
+            targets = [item for target in targets for item in target]
+        else:
+            targets = [target[int(key)] if isinstance(target, list) else target[key] for target in targets]
+    for target in targets:
+        if isinstance(target, list):
+            target[int(keys[-1])] = value
+        else:
+            target[keys[-1]] = value
+
+def expand_grid(grid, base_params=None):
+    """
+    Cartesian product of parameter values applied on top of base_params (DEFAULT_PARAMS if omitted).
+
+    Args:
+        grid (dict): Dotted parameter path -> list of values, e.g. {"temperature": [26, 28], "aerators.*.hp": [2, 3]}.
+        base_params (dict, optional): Scenario every grid point starts from.
+
+    Returns:
+        list: One parameter set per grid point.
+    """
+    base_params = make_params() if base_params is None else base_params
+    paths = list(grid)
+    scenarios = []
+    for values in itertools.product(*(grid[path] for path in paths)):
+        params = copy.deepcopy(base_params)
+        for path, value in zip(paths, values):
+            _set_param(params, path, value)
+        scenarios.append(params)
+    return scenarios
+
+def scenario_id(params):
+    """Content hash of a parameter set, so resumed sweeps recognise finished scenarios regardless of order"""
+    canonical = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+# Output schema: scenario-level columns, then one block per aerator position
+FLAT_COLUMNS = ["temperature", "salinity", "kwh_price", "pond_volume", "daily_hours", "global_hp", "ideal_hp",
+                "ideal_volume", "total_o2_demand", "cost_per_kg_o2", "ideal_cost_per_kg_o2", "optimal_cost",
+                "depreciation_cost", "optimization_status"]
+AERATOR_FIELDS = ["id", "hp", "do_rate", "usage", "subpowered_cost", "overpowered_cost"]
+
+def result_columns(scenarios):
+    """
+    Full column list of a sweep's output, fixed before the first write.
+
+    Aerator columns go up to the largest aerator count among the scenarios, so chunks of failed
+    scenarios or smaller fleets get NaN there instead of narrowing the schema.
+    """
+    max_aerators = max((len(params.get("aerators", [])) for params in scenarios), default=0)
+    aerator_columns = [f"aerator_{i}_{field}" for i in range(max_aerators) for field in AERATOR_FIELDS]
+    return ["scenario_id"] + FLAT_COLUMNS + aerator_columns + ["error"]
+
+def flatten_result(params, results):
+    """One flat output row per scenario (aerator columns are positional so every chunk shares a schema)"""
+    optimization = results["optimization"]
+    row = {
+        "temperature": params["temperature"],
+        "salinity": params["salinity"],
+        "kwh_price": params["kwh_price"],
+        "pond_volume": params["pond_volume"],
+        "daily_hours": params["daily_hours"],
+        "global_hp": results["global_hp"],
+        "ideal_hp": results["ideal_hp"],
+        "ideal_volume": results["ideal_volume"],
+        "total_o2_demand": results["total_o2_demand"],
+        "cost_per_kg_o2": results["initial_metrics"]["US$/kg O₂"],
+        "ideal_cost_per_kg_o2": results["ideal_metrics"]["US$/kg O₂"],
+        "optimal_cost": optimization.get("optimal_cost", float("nan")),
+        "depreciation_cost": optimization.get("depreciation_cost", float("nan")),
+        "optimization_status": optimization.get("status", "Optimal"),
+    }
+    usage = optimization.get("aerator_usage", {})
+    for i, aerator in enumerate(results["aerators"]):
+        row[f"aerator_{i}_id"] = aerator.name
+        row[f"aerator_{i}_hp"] = aerator.hp
+        row[f"aerator_{i}_do_rate"] = aerator.do_rate
+        row[f"aerator_{i}_usage"] = usage.get(aerator.name, float("nan"))
+        row[f"aerator_{i}_subpowered_cost"] = results["subpowered_costs"][i]
+        row[f"aerator_{i}_overpowered_cost"] = results["overpowered_costs"][i]
+    return row
+
+def _run_chunk(chunk):
+    """Worker entry point: run a list of (scenario_id, params) and return flat rows"""
+    rows = []
+    for sid, params in chunk:
+        try:
+            row = flatten_result(params, run_integrated_analysis(params, _worker_calculator))
+            row["error"] = ""
+        except Exception as e:
+            row = {"error": f"{type(e).__name__}: {e}"}
+        rows.append({"scenario_id": sid, **row})
+    return rows
+
+def _is_parquet(output_path):
+    return output_path.endswith(".parquet")
+
+def completed_scenarios(output_path):
+    """Scenario IDs already present in a sweep's output (a CSV file or a directory of Parquet parts)"""
+    if _is_parquet(output_path):
+        parts = sorted(glob.glob(os.path.join(output_path, "part-*.parquet")))
+        frames = [pd.read_parquet(part, columns=["scenario_id"]) for part in parts]
+    elif os.path.exists(output_path):
+        frames = [pd.read_csv(output_path, usecols=["scenario_id"], dtype=str)]
+    else:
+        frames = []
+    if not frames:
+        return set()
+    return set(pd.concat(frames)["scenario_id"])
+
+def _write_rows(rows, output_path, part_number, columns=None):
+    """
+    Append one finished chunk: a new part file for Parquet, appended lines for CSV.
+
+    Rows are laid out on `columns` (plus any column a row brings that is not in it). When a CSV
+    chunk has columns the file's header lacks, the file is rewritten with the union of both, so
+    no result column is ever dropped.
+    """
+    df = pd.DataFrame(rows)
+    columns = list(columns or [])
+    df = df.reindex(columns=columns + [column for column in df.columns if column not in columns])
+    if _is_parquet(output_path):
+        os.makedirs(output_path, exist_ok=True)
+        part_path = os.path.join(output_path, f"part-{part_number:06d}.parquet")
+        df.to_parquet(part_path + ".tmp", index=False)
+        os.replace(part_path + ".tmp", part_path)  # A crash never leaves a half-written part behind
+    else:
+        write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        if not write_header:
+            header = list(pd.read_csv(output_path, nrows=0).columns)
+            new_columns = [column for column in df.columns if column not in header]
+            if new_columns:
+                # Widen the file: rewrite it with the union of columns via a temp file
+                existing = pd.read_csv(output_path, dtype=str, keep_default_na=False)
+                combined = pd.concat([existing, df.astype(object)], ignore_index=True)
+                combined = combined.reindex(columns=header + new_columns)
+                combined.to_csv(output_path + ".tmp", index=False)
+                os.replace(output_path + ".tmp", output_path)
+                return
+            df = df.reindex(columns=header)
+        with open(output_path, 'a') as f:
+            f.write(df.to_csv(index=False, header=write_header))
+
+def run_sweep(scenarios, output_path, workers=None, chunk_size=256, resume=True, data_path=DATA_PATH, use_sidecar=True):
+    """
+    Run run_integrated_analysis over many parameter sets on a process pool, streaming results to disk.
+
+    Args:
+        scenarios (iterable): Parameter sets (e.g. from expand_grid).
+        output_path (str): "*.csv" appends to one file; "*.parquet" writes a directory of part files.
+        workers (int, optional): Process count (defaults to os.cpu_count()).
+        chunk_size (int): Scenarios per task; larger chunks amortise inter-process overhead.
+        resume (bool): Skip scenarios whose ID is already in output_path (checkpoint/resume).
+        data_path (str): Saturation table used by every worker.
+        use_sidecar (bool): Let workers memory-map the table's .npy sidecar instead of parsing JSON.
+
+    Returns:
+        int: Number of scenarios run in this call.
+    """
+    if not resume and os.path.exists(output_path):
+        raise FileExistsError(f"{output_path} already exists; pass resume=True to continue it")
+    done = completed_scenarios(output_path) if resume else set()
+    pending = [(sid, params) for sid, params in ((scenario_id(p), p) for p in scenarios) if sid not in done]
+    if not pending:
+        print(f"All scenarios already in {output_path}")
+        return 0
+
+    # Write the sidecar once up front so workers attach to it instead of racing to create it
+    ShrimpPondCalculator(data_path, use_sidecar=use_sidecar)
+    columns = result_columns([params for _, params in pending])
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    part_number = len(glob.glob(os.path.join(output_path, "part-*.parquet"))) if _is_parquet(output_path) else 0
+    finished = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_path, use_sidecar)) as pool:
+        futures = [pool.submit(_run_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            rows = future.result()
+            _write_rows(rows, output_path, part_number, columns)
+            part_number += 1
+            finished += len(rows)
+            print(f"{finished}/{len(pending)} scenarios written to {output_path}")
+    return finished
+
+def load_sweep_results(output_path):
+    """Read a finished (or partial) sweep back into one DataFrame"""
+    if _is_parquet(output_path):
+        return pd.concat([pd.read_parquet(part) for part in sorted(glob.glob(os.path.join(output_path, "part-*.parquet")))],
+                         ignore_index=True)
+    return pd.read_csv(output_path)
+
+if __name__ == "__main__":
+    OUTPUT_PATH = "/home/luisvinatea/Dev/Repos/Aquaculture/reports/experiments/integrated_sweep.parquet"
+    grid = {
+        "temperature": [26, 28, 30, 32],
+        "salinity": [10, 20, 30],
+        "kwh_price": [0.05, 0.08, 0.12],
+        "pond_volume": [40, 70, 100, 150],
+        "daily_hours": [6, 8, 12],
+        "aerators.*.hp": [2, 3, 4],
+    }
+    run_sweep(expand_grid(grid), OUTPUT_PATH)
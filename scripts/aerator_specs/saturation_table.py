@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+# Process-wide registry: realpath -> ((mtime_ns, size), SaturationTable)
+_TABLE_CACHE = {}
+_TABLE_CACHE_LOCK = threading.Lock()
+# Binary sidecars live in the user cache, never next to the source JSON in the data tree
+SIDECAR_DIRECTORY = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                                 "aquaculture", "saturation_tables")
+
+class SaturationTable:
+    """Array-backed O₂ saturation grid (rows: temperature, columns: salinity) with vectorized lookups"""
+    METHODS = ("nearest", "bilinear", "bicubic")
+
+    def __init__(self, values, metadata):
+        """Wrap a 2D table of saturation values described by the JSON metadata block"""
+        if isinstance(values, np.ndarray):
+            values = np.asarray(values)  # Plain ndarray view, e.g. over a np.memmap sidecar
+        if not (isinstance(values, np.ndarray) and values.dtype == np.float64
+                and values.flags.c_contiguous and not values.flags.writeable):
+            values = np.array(values, dtype=np.float64, order='C')  # Private contiguous copy
+            values.setflags(write=False)  # Shared between calculators, so never mutable
+        self.values = values
+        self.metadata = metadata
+        self.unit = metadata["unit"]
+        self.temp_min = metadata["temperature_range"]["min"]
+        self.temp_step = metadata["temperature_range"]["step"]
+        self.sal_min = metadata["salinity_range"]["min"]
+        self.sal_step = metadata["salinity_range"]["step"]
+        self.temperatures = self.temp_min + self.temp_step * np.arange(values.shape[0])
+        self.salinities = self.sal_min + self.sal_step * np.arange(values.shape[1])
+        self._spline = None
+        self._rows = None
+
+    @classmethod
+    def from_json(cls, data_path):
+        """Load a table from the o2_temp_sal_*.json layout ({"metadata": ..., "data": [[...], ...]})"""
+        with open(data_path, 'r') as f:
+            data = json.load(f)
+        return cls(data["data"], data["metadata"])
+
+    @property
+    def rows(self):
+        """Immutable nested-sequence view (rows[temp_idx][sal_idx]) for scalar Python indexing"""
+        if self._rows is None:
+            self._rows = tuple(tuple(row) for row in self.values.tolist())
+        return self._rows
+
+    def _check_bounds(self, temperature, salinity, clip):
+        """Clamp to the grid when clip=True, otherwise reject points outside it"""
+        t_max, s_max = self.temperatures[-1], self.salinities[-1]
+        if clip:
+            return np.clip(temperature, self.temp_min, t_max), np.clip(salinity, self.sal_min, s_max)
+        if (temperature.size and (temperature.min() < self.temp_min or temperature.max() > t_max)) or \
+                (salinity.size and (salinity.min() < self.sal_min or salinity.max() > s_max)):
+            raise ValueError(f"Temperature must be between {self.temp_min} and {t_max} and "
+                             f"salinity between {self.sal_min} and {s_max}")
+        return temperature, salinity
+
+    def lookup(self, temperature, salinity, clip=False):
+        """Grid cell lookup, truncating to the lower grid point (same as SaturationCalculator.get_o2_saturation)"""
+        temperature, salinity = self._check_bounds(np.asarray(temperature, dtype=np.float64),
+                                                   np.asarray(salinity, dtype=np.float64), clip)
+        temp_idx = ((temperature - self.temp_min) / self.temp_step).astype(np.intp)
+        sal_idx = ((salinity - self.sal_min) / self.sal_step).astype(np.intp)
+        return np.take(self.values, temp_idx * self.values.shape[1] + sal_idx)
+
+    def interpolate(self, temperature, salinity, method="bilinear", clip=False):
+        """
+        Saturation between grid points for scalar or broadcastable array inputs.
+
+        method: "bilinear" (exact at grid points), "bicubic" (interpolating cubic spline, needs scipy)
+                or "nearest" (the truncating lookup).
+        clip: clamp out-of-range inputs to the table edges instead of raising ValueError.
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown interpolation method '{method}', expected one of {self.METHODS}")
+        if method == "nearest":
+            return self.lookup(temperature, salinity, clip)
+        temperature, salinity = self._check_bounds(np.asarray(temperature, dtype=np.float64),
+                                                   np.asarray(salinity, dtype=np.float64), clip)
+        if method == "bicubic":
+            return self._bicubic(temperature, salinity)
+
+        # Fractional grid coordinates; the last cell is reused for points on the upper edge
+        t_pos = (temperature - self.temp_min) / self.temp_step
+        s_pos = (salinity - self.sal_min) / self.sal_step
+        t_idx = np.minimum(t_pos.astype(np.intp), self.values.shape[0] - 2)
+        s_idx = np.minimum(s_pos.astype(np.intp), self.values.shape[1] - 2)
+        t_frac = t_pos - t_idx
+        s_frac = s_pos - s_idx
+
+        n_sal = self.values.shape[1]
+        flat = self.values.ravel()
+        base = t_idx * n_sal + s_idx
+        v00 = flat[base]
+        v01 = flat[base + 1]
+        v10 = flat[base + n_sal]
+        v11 = flat[base + n_sal + 1]
+        return (v00 * (1 - t_frac) * (1 - s_frac) + v01 * (1 - t_frac) * s_frac
+                + v10 * t_frac * (1 - s_frac) + v11 * t_frac * s_frac)
+
+    def _bicubic(self, temperature, salinity):
+        if self._spline is None:
+            from scipy.interpolate import RectBivariateSpline
+            # s=0 makes the spline pass through every table value
+            self._spline = RectBivariateSpline(self.temperatures, self.salinities, self.values, kx=3, ky=3, s=0)
+        temperature, salinity = np.broadcast_arrays(temperature, salinity)
+        return self._spline.ev(temperature, salinity)
+
+def _sidecar_paths(data_path):
+    """<name>-<path digest>.npy / .meta.json in SIDECAR_DIRECTORY, so tables with the same name do not collide"""
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    digest = hashlib.sha1(data_path.encode("utf-8")).hexdigest()[:12]
+    stem = os.path.join(SIDECAR_DIRECTORY, f"{name}-{digest}")
+    return stem + ".npy", stem + ".meta.json"
+
+def _load_sidecar(data_path, source_key):
+    """Memory-map the binary sidecar if it was written from this exact version of the JSON"""
+    npy_path, meta_path = _sidecar_paths(data_path)
+    try:
+        with open(meta_path, 'r') as f:
+            sidecar = json.load(f)
+        if (sidecar["source_mtime_ns"], sidecar["source_size"]) != source_key:
+            return None
+        return SaturationTable(np.load(npy_path, mmap_mode='r'), sidecar["metadata"])
+    except (OSError, ValueError, KeyError):
+        return None  # Missing, stale or unreadable sidecar: fall back to the JSON
+
+def _write_sidecar(data_path, table, source_key):
+    """Write <stem>.npy and <stem>.meta.json via temp file + rename so readers never see partial files"""
+    npy_path, meta_path = _sidecar_paths(data_path)
+    try:
+        os.makedirs(SIDECAR_DIRECTORY, exist_ok=True)
+        with open(npy_path + ".tmp", 'wb') as f:
+            np.save(f, np.ascontiguousarray(table.values))
+        os.replace(npy_path + ".tmp", npy_path)
+        with open(meta_path + ".tmp", 'w') as f:
+            json.dump({"source_mtime_ns": source_key[0], "source_size": source_key[1],
+                       "metadata": table.metadata}, f, indent=4)
+        os.replace(meta_path + ".tmp", meta_path)
+    except OSError as e:
+        print(f"Could not write saturation table sidecar for {data_path}: {e}")
+
+def load_saturation_table(data_path, use_sidecar=False):
+    """
+    Return the shared SaturationTable for data_path, parsing the JSON at most once per file version.
+
+    Entries are keyed by real path and invalidated when the file's mtime or size changes. With
+    use_sidecar=True the table is also persisted as a memory-mappable .npy in SIDECAR_DIRECTORY
+    (outside the data tree), so fresh worker processes attach to it without parsing JSON.
+    """
+    path = os.path.realpath(data_path)
+    stat = os.stat(path)  # Raises FileNotFoundError for missing tables
+    source_key = (stat.st_mtime_ns, stat.st_size)
+    with _TABLE_CACHE_LOCK:
+        cached = _TABLE_CACHE.get(path)
+        if cached is not None and cached[0] == source_key:
+            return cached[1]
+        table = _load_sidecar(path, source_key) if use_sidecar else None
+        if table is None:
+            table = SaturationTable.from_json(path)
+            if use_sidecar:
+                _write_sidecar(path, table, source_key)
+        _TABLE_CACHE[path] = (source_key, table)
+        return table
+
+def clear_saturation_table_cache():
+    """Drop every cached table (sidecar files on disk are left alone)"""
+    with _TABLE_CACHE_LOCK:
+        _TABLE_CACHE.clear()
@@ -0,0 +1,239 @@
+import os
+import re
+import zlib
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy import sparse
+from scripts.data_handling.customs_ingestion import CustomsImportStore, DATASET_DIRECTORY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+LABELS = ("pond_aerator", "aerator_part", "unrelated")
+TEXT_FIELDS = ["descripcion_producto_comercial", "descripcion_arancelaria", "partida_arancelaria"]
+CACHE_PATH = DATASET_DIRECTORY.rstrip(os.sep) + "_labels.parquet"
+MODEL_PATH = DATASET_DIRECTORY.rstrip(os.sep) + "_classifier.npz"
+
+# HS code prefixes whose heading settles the product family (longest matching prefix wins)
+HS_RULES = {
+    "847982": "pond_aerator", # Mixing/agitating machines: paddle-wheel aerators
+    "847989": "pond_aerator", # Other machines, incl. aerator sets for aquaculture
+    "847990": "aerator_part", # Parts of 8479 machines
+    "8481": "unrelated", # Taps and valves: faucet aerators
+    "8708": "unrelated", # Vehicle body parts: dashboard air vents
+    "8424": "unrelated", # Sprayers: tap nozzles
+    "9603": "unrelated", # Brushes and paint rollers
+    "3923": "unrelated", # Plastic closures
+    "3924": "unrelated", # Household plastics: wine aerators
+    "7013": "unrelated", # Glassware
+}
+# Description keywords (words are joined by '_'), checked in this order before the HS rules. Unrelated
+# keywords are whole words (ducto must not match reductor); a description starting with aireador that
+# states a paddle count or horsepower is a whole unit even if it mentions parts (con_partes, flotadores).
+KEYWORD_RULES = [
+    ("unrelated", r"(?<![a-z])(?:vinos?|grifos?|griferia|cocina|coin_slot|perlator|saniperls?|rodillos?|panel_instrumentos|"
+                  r"ductos?|conductos?|piton|gotero|tapa_aireadora?|cesped|acuario|residuales|lavamanos|ducha|lavabo|fregadero)(?![a-z])"),
+    ("pond_aerator", r"^aireador(?:es)?_.*?(?:(?<![a-z])\d+_?paletas|(?<![a-z.])\d+(?:\.\d+)?_?hp(?:_|$))"),
+    ("aerator_part", r"parte|repuesto|pinon|engranaje|caja_de_transmision|reductor|chumacera|brida|boya|flotador|buje|sello|"
+                     r"impeller|acople|soporte|espaciador|matrimonio|paletas?_(?:de|para)_aireador|eje(?:_|$)"),
+    ("pond_aerator", r"acuicol|acuacult|piscina|camaron|estanque|rueda_de_paleta|\d+_?paletas|paddle|\d+(?:\.\d+)?_?hp(?:_|$)|"
+                     r"aquapa|aquamix|multi_impulsor|splash"),
+]
+
+def _tokens(product, tariff, code):
+    """Feature tokens of one row: words, 6-letter stems and bigrams of the descriptions, plus HS prefixes"""
+    words = [word for word in re.split(r"[^0-9a-záéíóúñ]+", product) if word]
+    tokens = ["d:" + word for word in words]
+    tokens += ["s:" + word[:6] for word in words if len(word) > 6]
+    tokens += ["b:" + first + "_" + second for first, second in zip(words, words[1:])]
+    tokens += ["a:" + word for word in re.split(r"[^0-9a-záéíóúñ]+", tariff) if word]
+    tokens += ["hs2:" + code[:2], "hs4:" + code[:4], "hs6:" + code[:6]]
+    return tokens
+
+def row_digests(frame):
+    """64-bit digest per row of the fields the classifier reads (vectorized)"""
+    return pd.util.hash_pandas_object(frame[TEXT_FIELDS].astype("str").fillna(""), index=False).to_numpy()
+
+def seed_labels(frame):
+    """
+    Labels from the keyword and HS rules, used to train the model.
+
+    :return: (label index per row, -1 where no rule fired; method per row: 'keyword', 'hs_code' or None)
+    """
+    product = frame["descripcion_producto_comercial"].astype("str").fillna("").str.lower()
+    code = frame["partida_arancelaria"].astype("str").fillna("")
+    labels = np.full(len(frame), -1, dtype=np.int8)
+    methods = np.full(len(frame), None, dtype=object)
+    for prefix in sorted(HS_RULES, key=len): # Longer prefixes overwrite shorter ones
+        hit = code.str.startswith(prefix).to_numpy()
+        labels[hit] = LABELS.index(HS_RULES[prefix])
+        methods[hit] = "hs_code"
+    keyword_hit = np.zeros(len(frame), dtype=bool)
+    for label, pattern in KEYWORD_RULES:
+        hit = product.str.contains(pattern, regex=True).to_numpy() & ~keyword_hit
+        labels[hit] = LABELS.index(label)
+        methods[hit] = "keyword"
+        keyword_hit |= hit
+    return labels, methods
+
+class AeratorClassifier:
+    """
+    Batch classifier of customs import lines into LABELS.
+
+    Rows are featurized as hashed TF-IDF vectors (scipy.sparse) of their descriptions and HS code
+    prefixes, and scored with a multinomial naive Bayes model trained on the rows the keyword/HS
+    rules label. Keyword matches keep their rule label; everything else takes the model's. Results
+    are cached by row digest, so a refresh only scores rows not seen before.
+    """
+    def __init__(self, n_features=2 ** 18, alpha=0.1, model_path=MODEL_PATH, cache_path=CACHE_PATH):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.model_path = model_path
+        self.cache_path = cache_path
+        self.idf = None
+        self.log_prior = None
+        self.log_likelihood = None
+        self.fingerprint = None
+        if model_path and os.path.exists(model_path):
+            self.load_model()
+
+    def features(self, frame):
+        """Sparse (rows x n_features) term-count matrix; descriptions are tokenized once per distinct text"""
+        keys = frame[TEXT_FIELDS].astype("str").fillna("")
+        codes, uniques = pd.factorize(keys["descripcion_producto_comercial"] + "\x1f" + keys["descripcion_arancelaria"]
+                                      + "\x1f" + keys["partida_arancelaria"])
+        rows, columns = [], []
+        for row, key in enumerate(uniques):
+            product, tariff, code = key.split("\x1f")
+            for token in _tokens(product.lower(), tariff.lower(), code):
+                rows.append(row)
+                columns.append(zlib.crc32(token.encode("utf-8")) % self.n_features)
+        counts = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                                   shape=(len(uniques), self.n_features))
+        counts.sum_duplicates()
+        return counts[codes]
+
+    def _tfidf(self, counts):
+        weighted = counts.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.where(norms == 0, 1, norms)) @ weighted
+
+    def fit(self, frame):
+        """Train on the rule-labelled rows of frame (a new fingerprint, so labels cached by the old model are dropped)"""
+        counts = self.features(frame)
+        document_frequency = np.asarray((counts > 0).sum(axis=0)).ravel()
+        self.idf = np.log((1 + counts.shape[0]) / (1 + document_frequency)).astype(np.float32) + 1
+        labels, _ = seed_labels(frame)
+        seeded = labels >= 0
+        X = self._tfidf(counts[seeded])
+        onehot = sparse.csr_matrix((np.ones(seeded.sum()), (labels[seeded], np.arange(seeded.sum()))),
+                                   shape=(len(LABELS), seeded.sum()))
+        class_counts = np.asarray(onehot.sum(axis=1)).ravel()
+        feature_totals = np.asarray((onehot @ X).todense()) + self.alpha
+        self.log_likelihood = np.log(feature_totals / feature_totals.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.log_prior = np.log((class_counts + 1) / (class_counts.sum() + len(LABELS)))
+        digest = hashlib.sha256(self.idf.tobytes() + self.log_likelihood.tobytes() + self.log_prior.tobytes())
+        self.fingerprint = digest.hexdigest()[:16]
+        logging.info(f"Classifier trained on {int(seeded.sum())} rule-labelled rows of {len(frame)} "
+                     f"({dict(zip(LABELS, class_counts.astype(int).tolist()))}).")
+        if self.model_path:
+            self.save_model()
+        return self
+
+    def save_model(self):
+        np.savez(self.model_path, idf=self.idf, log_prior=self.log_prior, log_likelihood=self.log_likelihood,
+                 alpha=self.alpha, fingerprint=self.fingerprint)
+
+    def load_model(self):
+        model = np.load(self.model_path)
+        self.idf = model["idf"]
+        self.log_prior = model["log_prior"]
+        self.log_likelihood = model["log_likelihood"]
+        self.alpha = float(model["alpha"])
+        self.fingerprint = str(model["fingerprint"])
+        self.n_features = self.idf.shape[0]
+
+    def predict(self, frame):
+        """
+        Score every row of frame (no cache).
+
+        :return: DataFrame with label (categorical), probability of that label and method
+                 ('keyword' for rule matches, 'model' otherwise).
+        """
+        if self.log_likelihood is None:
+            raise ValueError("Classifier is not trained; call fit() first")
+        joint = self._tfidf(self.features(frame)) @ self.log_likelihood.T + self.log_prior
+        joint = np.asarray(joint)
+        probabilities = np.exp(joint - joint.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        predicted = probabilities.argmax(axis=1)
+        labels, methods = seed_labels(frame)
+        keyword = methods == "keyword"
+        predicted[keyword] = labels[keyword]
+        return pd.DataFrame({
+            "label": pd.Categorical.from_codes(predicted, categories=list(LABELS)),
+            "probability": probabilities[np.arange(len(frame)), predicted].astype(np.float32),
+            "method": pd.Categorical(np.where(keyword, "keyword", "model"), categories=["keyword", "model"]),
+        }, index=frame.index)
+
+    def _cache_key(self):
+        """Model fingerprint plus the rules, which also decide labels: changing either invalidates the cache"""
+        rules = hashlib.sha256(repr((sorted(HS_RULES.items()), KEYWORD_RULES)).encode("utf-8")).hexdigest()[:16]
+        return f"{self.fingerprint}:{rules}"
+
+    def _load_cache(self):
+        try:
+            table = pq.read_table(self.cache_path)
+        except (OSError, pa.ArrowInvalid):
+            return None
+        metadata = table.schema.metadata or {}
+        if metadata.get(b"model", b"").decode() != self._cache_key():
+            logging.info("Label cache was produced by another model, discarding it.")
+            return None
+        return table.to_pandas().set_index("digest")
+
+    def _save_cache(self, cache):
+        table = pa.Table.from_pandas(cache.reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"model": self._cache_key().encode()})
+        pq.write_table(table, self.cache_path + ".tmp")
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def classify(self, frame):
+        """
+        Labels for every row of frame, scoring only rows whose digest is not cached yet.
+
+        :return: DataFrame like predict(), aligned with frame's index.
+        """
+        if self.log_likelihood is None:
+            self.fit(frame)
+        digests = row_digests(frame)
+        cache = self._load_cache()
+        if cache is None:
+            cache = pd.DataFrame({"label": pd.Categorical([], categories=list(LABELS)),
+                                  "probability": np.array([], dtype=np.float32),
+                                  "method": pd.Categorical([], categories=["keyword", "model"])},
+                                 index=pd.Index(np.array([], dtype=np.uint64), name="digest"))
+        new = ~pd.Index(digests).isin(cache.index)
+        if new.any():
+            new_digests, first = np.unique(digests[new], return_index=True)
+            scored = self.predict(frame.iloc[np.flatnonzero(new)[first]])
+            scored.index = pd.Index(new_digests, name="digest")
+            cache = pd.concat([cache, scored])
+            self._save_cache(cache)
+        logging.info(f"Classified {len(frame)} rows ({int(new.sum())} scored, {int((~new).sum())} from cache).")
+        result = cache.reindex(digests)
+        result.index = frame.index
+        return result
+
+if __name__ == "__main__":
+    imports = CustomsImportStore().load()
+    classifier = AeratorClassifier()
+    labels = classifier.classify(imports)
+    imports = imports.join(labels)
+    print(imports.groupby("label", observed=True)[["us$_fob", "cantidad"]].sum())
+    pond = imports[imports["label"] == "pond_aerator"]
+    print(pond.groupby("year")["us$_fob_unit"].median())
@@ -0,0 +1,126 @@
+import os
+import glob
+import hashlib
+import json
+
+def digest_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def digest_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def temp_path_for(path):
+    """Temp file next to path (same filesystem, so os.replace is atomic), keeping the extension for drivers that sniff it"""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.tmp-{os.getpid()}{extension}"
+
+def write_bytes_atomic(path, data):
+    """Write via temp file + fsync + rename; readers see either the old file or the new one, never a partial one"""
+    temp_path = temp_path_for(path)
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+class ArtifactManifest:
+    """
+    JSON record of produced artefacts: digest, size and mtime of each output, plus the digest of the
+    sources it was produced from. Lets writers skip outputs that are already current using only stat().
+    """
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.changed = False
+        try:
+            with open(manifest_path, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _key(self, path):
+        return os.path.abspath(path)
+
+    def _matches_disk(self, entry, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def digest_for(self, path):
+        """Recorded digest of path if the file is untouched since it was recorded, else None"""
+        entry = self.entries.get(self._key(path))
+        if entry is not None and self._matches_disk(entry, path):
+            return entry["digest"]
+        return None
+
+    def is_current(self, path, source_digest):
+        """True if path exists unchanged and was produced from sources with this digest"""
+        entry = self.entries.get(self._key(path))
+        return entry is not None and entry.get("source_digest") == source_digest and self._matches_disk(entry, path)
+
+    def record(self, path, digest, source_digest=None):
+        stat = os.stat(path)
+        entry = {"digest": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "source_digest": source_digest}
+        if self.entries.get(self._key(path)) != entry:
+            self.entries[self._key(path)] = entry
+            self.changed = True
+
+    def digest_sources(self, paths):
+        """Combined digest of several input files, reusing recorded digests of files whose stat is unchanged"""
+        sha256 = hashlib.sha256()
+        for path in sorted(paths):
+            key = "source:" + self._key(path)
+            entry = self.entries.get(key)
+            if entry is not None and self._matches_disk(entry, path):
+                digest = entry["digest"]
+            else:
+                digest = digest_file(path)
+                stat = os.stat(path)
+                self.entries[key] = {"digest": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                self.changed = True
+            sha256.update(f"{os.path.basename(path)}:{digest}\n".encode("utf-8"))
+        return sha256.hexdigest()
+
+    def save(self):
+        """Persist the manifest (only when an entry changed, so unchanged runs do not write)"""
+        if self.changed:
+            write_bytes_atomic(self.manifest_path, json.dumps(self.entries, indent=4).encode("utf-8"))
+            self.changed = False
+
+def write_if_changed(path, data, manifest=None, current_digest=None, source_digest=None):
+    """
+    Write bytes to path only if they differ from what is on disk.
+
+    :param data: Bytes to write.
+    :param manifest: ArtifactManifest used to know the on-disk digest from stat() alone and to record the write.
+    :param current_digest: Digest of the current file contents when the caller already read them.
+    :param source_digest: Digest of the inputs this artefact was produced from (stored in the manifest).
+    :return: True if the file was written, False if it already had these contents.
+    """
+    digest = digest_bytes(data)
+    if current_digest is None and manifest is not None:
+        current_digest = manifest.digest_for(path)
+    if current_digest is None and os.path.exists(path) and os.path.getsize(path) == len(data):
+        current_digest = digest_file(path)
+    written = digest != current_digest
+    if written:
+        write_bytes_atomic(path, data)
+    if manifest is not None:
+        manifest.record(path, digest, source_digest)
+    return written
+
+def shapefile_sources(shapefile_path):
+    """The .shp and its sidecar files (.shx, .dbf, .prj, .cpg, ...) that make up one shapefile"""
+    stem = os.path.splitext(shapefile_path)[0]
+    return [path for path in glob.glob(glob.escape(stem) + ".*")
+            if os.path.splitext(path)[1].lower() in (".shp", ".shx", ".dbf", ".prj", ".cpg", ".sbn", ".sbx")]
@@ -0,0 +1,315 @@
+import os
+import re
+import shutil
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from scripts.data_handling.artifact_writer import ArtifactManifest
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DATA_DIRECTORY = "/home/luisvinatea/Dev/Repos/Aquaculture/data"
+SOURCES = {
+    "imp_aireadores": os.path.join(DATA_DIRECTORY, "datasets/financial/shrimp_industry/ecuador/imp_aireadores_2017-2023_ecuador.csv"),
+    "datasur": os.path.join(DATA_DIRECTORY, "raw/csv/datasur_aireador_2024-01_2025-01.csv"),
+}
+DATASET_DIRECTORY = os.path.join(DATA_DIRECTORY, "datasets/financial/shrimp_industry/ecuador/aerator_imports")
+
+# Unified table: column -> kind. 'code' columns are digit strings whose leading zero numeric exports dropped.
+SCHEMA = {
+    "fecha": "date",
+    "source": "category",
+    "regimen_aduanero": "category",
+    "refrendo": "string",
+    "item": "int",
+    "ruc_importador": "code",
+    "probable_importador": "category",
+    "pais_de_origen": "category",
+    "pais_de_procedencia": "category",
+    "pais_de_embarque": "category",
+    "ciudad_embarque": "category",
+    "via_de_transporte": "category",
+    "aduana": "category",
+    "partida_arancelaria": "code",
+    "descripcion_arancelaria": "category",
+    "descripcion_producto_comercial": "string",
+    "marca": "category",
+    "marca_comercial": "category",
+    "modelo_mercaderia": "string",
+    "producto": "string",
+    "caracteristicas": "string",
+    "año_fabricación": "int",
+    "estado_de_mercancia": "category",
+    "bultos": "float",
+    "cantidad": "float",
+    "unidad_de_medida": "category",
+    "advalorem": "float",
+    "us$_fob": "float",
+    "us$_flete": "float",
+    "us$_seguro": "float",
+    "us$_cif": "float",
+    "us$_fob_unit": "float",
+    "peso_neto_kg": "float",
+    "embarcador": "category",
+    "empresa_de_transporte": "category",
+    "agente_de_aduana": "category",
+    "agencia_de_carga": "category",
+    "nave": "category",
+    "conocimiento_embarque": "string",
+    "contenedor": "int",
+    "tipo_aforo": "category",
+    "incoterm": "category",
+}
+PARTITION_COLUMNS = ["year", "month"]
+
+# Source column names that hold the same field as a unified column (coalesced, first non-null wins)
+COLUMN_ALIASES = {
+    "país_de_origen": "pais_de_origen",
+    "país_de_embarque": "pais_de_embarque",
+    "descripción_arancelaria": "descripcion_arancelaria",
+    "conocimiento_de_embarque": "conocimiento_embarque",
+}
+# Spellings of the same category value across sources
+VALUE_ALIASES = {
+    "estado_de_mercancia": {"nuevo": "nueva", "usado": "usada"},
+}
+# Integer columns where 0 is a placeholder rather than a value
+ZERO_IS_MISSING = {"año_fabricación", "item"}
+# Placeholders meaning "no value"
+MISSING_VALUES = ["", "desconocido", "n/a", "nan"]
+
+# Free-text columns of the raw exports; the datasur export writes their commas unquoted
+TEXT_COLUMNS = {
+    "probable_importador", "ciudad_embarque", "descripción_arancelaria", "descripcion_producto_comercial", "marca",
+    "embarcador", "empresa_de_transporte", "agente_de_aduana", "nave", "deposito_comercial", "factura",
+    "caracteristicas", "producto", "marca_comercial", "modelo_mercaderia", "agencia_de_carga",
+}
+# Shape of the fields that anchor a repaired row (blank is always accepted)
+FIELD_PATTERNS = {
+    "dia": r"\d{1,2}",
+    "mes": r"\d{1,2}",
+    "año": r"\d{4}",
+    "item": r"\d+",
+    "ruc_importador": r"[\d_]+", # Courier shipments use 9999999999 padded with underscores
+    "partida_arancelaria": r"\d{10}",
+    "via_de_transporte": r"[a-z_]+",
+    "bultos": r"[\d.]+",
+    "cantidad": r"[\d.]+",
+    "advalorem": r"[\d.]+",
+    "us$_fob": r"[\d.]+",
+    "us$_flete": r"[\d.]+",
+    "us$_seguro": r"[\d.]+",
+    "us$_cif": r"[\d.]+",
+    "contenedor": r"\d+",
+    "peso_neto_kg": r"[\d.]+",
+    "tipo_aforo": r"aforo.*",
+    "us$_fob_unit": r"[\d.]+",
+}
+MAX_REPAIR_JOINS = 4
+
+def _unique_names(names):
+    """Header names with repeats suffixed '.1', '.2', ... as pandas does (datasur's header repeats 'dia' and 'caracteristicas')"""
+    seen = {}
+    unique = []
+    for name in names:
+        unique.append(f"{name}.{seen[name]}" if name in seen else name)
+        seen[name] = seen.get(name, 0) + 1
+    return unique
+
+def repair_row(text, names, delimiter=","):
+    """
+    Split a malformed CSV line into len(names) fields.
+
+    Commas followed by '_' (spaces became underscores in the export) are joined back first; any
+    remaining surplus is resolved by letting TEXT_COLUMNS span several tokens, choosing the first
+    split whose anchor fields match FIELD_PATTERNS. Short rows are padded with blanks.
+
+    :return: List of fields, or None if no consistent split was found.
+    """
+    patterns = {name: re.compile(pattern) for name, pattern in FIELD_PATTERNS.items()}
+    tokens = []
+    for token in text.split(delimiter):
+        if tokens and token.startswith("_"):
+            tokens[-1] += delimiter + token
+        else:
+            tokens.append(token)
+    surplus = len(tokens) - len(names)
+    if surplus < 0:
+        tokens += [""] * -surplus
+        surplus = 0
+    if surplus > MAX_REPAIR_JOINS:
+        return None
+
+    fields = []
+    def split(position, joins):
+        if len(fields) == len(names):
+            return joins == 0
+        name = names[len(fields)]
+        pattern = patterns.get(name)
+        for width in (range(1, joins + 2) if name in TEXT_COLUMNS else (1,)):
+            value = delimiter.join(tokens[position:position + width])
+            if pattern is not None and value != "" and not pattern.fullmatch(value):
+                continue
+            fields.append(value)
+            if split(position + width, joins - width + 1):
+                return True
+            fields.pop()
+        return False
+    return fields if split(0, surplus) else None
+
+def read_export(path, source):
+    """
+    Read one customs export with the Arrow CSV parser, every column as string.
+
+    Rows whose field count does not match the header are handed to repair_row; rows that cannot
+    be repaired are logged and dropped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        names = _unique_names(f.readline().rstrip("\r\n").split(","))
+    malformed = []
+    def on_invalid_row(row):
+        malformed.append(row.text)
+        return "skip"
+    table = pacsv.read_csv(
+        path,
+        read_options=pacsv.ReadOptions(column_names=names, skip_rows=1),
+        parse_options=pacsv.ParseOptions(invalid_row_handler=on_invalid_row),
+        convert_options=pacsv.ConvertOptions(column_types={name: pa.string() for name in names},
+                                             strings_can_be_null=False),
+    )
+    frame = table.to_pandas()
+    repaired = [fields for fields in (repair_row(text, names) for text in malformed) if fields is not None]
+    if malformed:
+        logging.info(f"{source}: repaired {len(repaired)} of {len(malformed)} malformed rows, "
+                     f"dropped {len(malformed) - len(repaired)}.")
+    if repaired:
+        frame = pd.concat([frame, pd.DataFrame(repaired, columns=names)], ignore_index=True)
+    frame.insert(0, "source", source)
+    return frame
+
+def _restore_code(values):
+    """Digit strings: drop a '.0' suffix and restore the leading zero of 9/12-digit IDs (cedula/RUC) and 9-digit HS codes"""
+    values = values.str.replace(r"\.0$", "", regex=True)
+    return values.where(~values.str.len().isin([9, 12]), "0" + values)
+
+def to_schema(frame):
+    """Rename, coalesce and type a raw export frame into the unified SCHEMA (missing columns become null)"""
+    frame = frame.copy()
+    frame.columns = [column.strip() for column in frame.columns]
+    if "fecha" not in frame.columns and {"dia", "mes", "año"} <= set(frame.columns):
+        frame["fecha"] = frame["año"] + "-" + frame["mes"] + "-" + frame["dia"]
+    for alias, column in COLUMN_ALIASES.items():
+        if alias in frame.columns:
+            frame[column] = frame[column].replace(MISSING_VALUES, None).fillna(frame[alias]) \
+                if column in frame.columns else frame[alias]
+
+    typed = {}
+    for column, kind in SCHEMA.items():
+        values = frame[column] if column in frame.columns else pd.Series(None, index=frame.index, dtype="str")
+        values = values.astype("str").str.strip().replace(MISSING_VALUES, None)
+        if column in VALUE_ALIASES:
+            values = values.replace(VALUE_ALIASES[column])
+        if kind == "date":
+            typed[column] = pd.to_datetime(values, format="%Y-%m-%d", errors="coerce")
+        elif kind == "float":
+            typed[column] = pd.to_numeric(values, errors="coerce").astype("float64")
+        elif kind == "int":
+            numbers = pd.to_numeric(values, errors="coerce")
+            if column in ZERO_IS_MISSING:
+                numbers = numbers.where(numbers != 0)
+            typed[column] = numbers.round().astype("Int32")
+        elif kind == "code":
+            typed[column] = _restore_code(values)
+        elif kind == "category":
+            typed[column] = values.astype("category")
+        else:
+            typed[column] = values
+    table = pd.DataFrame(typed)
+    table["year"] = table["fecha"].dt.year.astype("Int16")
+    table["month"] = table["fecha"].dt.month.astype("Int8")
+    return table
+
+class CustomsImportStore:
+    """
+    Aerator customs imports from every export in SOURCES, as one typed table stored as Parquet
+    partitioned by year/month (hive layout). The dataset is rebuilt only when a source file changes;
+    queries read only the partitions and columns they ask for.
+    """
+    def __init__(self, sources=None, dataset_directory=DATASET_DIRECTORY):
+        self.sources = sources or SOURCES
+        self.dataset_directory = dataset_directory
+        self.manifest = ArtifactManifest(dataset_directory.rstrip(os.sep) + ".manifest.json")
+
+    def _source_digest(self):
+        digest = self.manifest.digest_sources(list(self.sources.values()))
+        # The schema is part of the recipe: changing it must rebuild the dataset too
+        return digest + ":" + ",".join(f"{column}:{kind}" for column, kind in SCHEMA.items())
+
+    def ingest(self, rebuild=False):
+        """
+        Rebuild the partitioned dataset if a source changed.
+
+        :return: True if the dataset was rewritten.
+        """
+        missing = [path for path in self.sources.values() if not os.path.exists(path)]
+        if missing and os.path.exists(self.dataset_directory):
+            logging.info(f"Source exports not found ({', '.join(missing)}), using the existing dataset.")
+            return False
+        source_digest = self._source_digest()
+        if not rebuild and self.manifest.is_current(self.dataset_directory, source_digest):
+            logging.info("Customs import dataset is up to date.")
+            return False
+        frames = [to_schema(read_export(path, source)) for source, path in self.sources.items()]
+        table = pd.concat(frames, ignore_index=True)
+        for column, kind in SCHEMA.items():
+            if kind == "category": # Union of the categories of every source
+                table[column] = table[column].astype("category")
+        table["source"] = table["source"].astype("category")
+        undated = table["fecha"].isna()
+        if undated.any():
+            logging.warning(f"Dropping {int(undated.sum())} rows without a valid date.")
+            table = table[~undated]
+        table = table.sort_values(["fecha", "refrendo", "item"], kind="stable").reset_index(drop=True)
+
+        # Write next to the target and swap, so readers never see a half-written dataset
+        temp_directory = self.dataset_directory.rstrip(os.sep) + f".tmp-{os.getpid()}"
+        shutil.rmtree(temp_directory, ignore_errors=True)
+        try:
+            table.to_parquet(temp_directory, index=False, partition_cols=PARTITION_COLUMNS)
+            old_directory = self.dataset_directory.rstrip(os.sep) + f".old-{os.getpid()}"
+            if os.path.exists(self.dataset_directory):
+                os.replace(self.dataset_directory, old_directory)
+            os.replace(temp_directory, self.dataset_directory)
+            shutil.rmtree(old_directory, ignore_errors=True)
+        finally:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+        self.manifest.record(self.dataset_directory, "", source_digest)
+        self.manifest.save()
+        logging.info(f"Customs import dataset written to {self.dataset_directory} ({len(table)} rows).")
+        return True
+
+    def load(self, columns=None, filters=None):
+        """
+        Read the dataset (ingesting first if needed).
+
+        :param columns: Columns to read; all if omitted.
+        :param filters: pyarrow filter expression or DNF list, e.g. [("year", ">=", 2022)]; partition
+                        filters skip whole files.
+        :return: DataFrame with year/month as integers.
+        """
+        self.ingest()
+        partitioning = ds.partitioning(pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive")
+        dataset = ds.dataset(self.dataset_directory, format="parquet", partitioning=partitioning)
+        if isinstance(filters, list):
+            filters = pq.filters_to_expression(filters)
+        return dataset.to_table(columns=columns, filter=filters).to_pandas()
+
+if __name__ == "__main__":
+    store = CustomsImportStore()
+    store.ingest()
+    imports = store.load(columns=["year", "month", "source", "cantidad", "us$_fob", "us$_cif"])
+    print(imports.groupby(["year", "source"], observed=True)[["cantidad", "us$_fob", "us$_cif"]].sum())
@@ -1,7 +1,35 @@
+import io
 import os
 import pandas as pd
 import json
 import geopandas
+from concurrent.futures import ProcessPoolExecutor
+from scripts.data_handling.artifact_writer import (ArtifactManifest, digest_bytes, digest_file, shapefile_sources,
+                                                   temp_path_for, write_if_changed)
+from scripts.data_handling.geometry_store import GeometryStore
+
+# Per-directory record of processed files (mtime, size, content hash and extracted metadata)
+MANIFEST_NAME = ".csv_processor_manifest.json"
+# Per-directory record of every artefact the processor writes (see artifact_writer.ArtifactManifest)
+ARTIFACT_MANIFEST_NAME = ".artifact_manifest.json"
+
+def _clean_file(file_path):
+    """Worker entry point: clean one CSV in place and return its manifest entry (None on failure)"""
+    try:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        # round_trip parsing keeps re-cleaned floats identical, so clean files stay byte-for-byte unchanged
+        df = pd.read_csv(io.BytesIO(raw), float_precision="round_trip")
+        cleaned_df = CSVProcessor._clean_dataframe(df)
+        records = CSVProcessor._country_records(cleaned_df)
+        data = cleaned_df.to_csv(index=False).encode("utf-8")
+        # Already-clean files are left untouched; changed ones are replaced atomically
+        write_if_changed(file_path, data, current_digest=digest_bytes(raw))
+        stat = os.stat(file_path)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest_bytes(data), "metadata": records}
+    except Exception as e:
+        print(f"Error processing file {file_path}: {e}")
+        return None
 
 class CSVProcessor:
     def __init__(self, directory_path, currency_tickers_path, shapefile_path):
@@ -10,28 +38,88 @@ class CSVProcessor:
         self.shapefile_path = shapefile_path
         self.country_metadata = {}
         self.eurozone_interest_rate = None
+        self.artifacts = ArtifactManifest(os.path.join(directory_path, ARTIFACT_MANIFEST_NAME))
         self._load_eurozone_interest_rate()
 
-    def process_files(self):
-        """Process all CSV files in the specified directory."""
-        for file_name in os.listdir(self.directory_path):
-            if file_name.endswith(".csv"):
-                file_path = os.path.join(self.directory_path, file_name)
-                self._process_file(file_path)
+    def process_files(self, incremental=False, workers=1):
+        """
+        Process all CSV files in the specified directory.
+
+        incremental: only re-clean files whose mtime/size and content hash changed since the last run;
+                     metadata of unchanged files comes from the manifest instead of re-parsing them.
+        workers: processes used to clean files (1 cleans them in this process, None uses every core).
+        """
+        file_names = [file_name for file_name in os.listdir(self.directory_path) if file_name.endswith(".csv")]
+        manifest = self._load_manifest() if incremental else {}
+        entries = {}
+        pending = []
+        for file_name in file_names:
+            file_path = os.path.join(self.directory_path, file_name)
+            entry = manifest.get(file_name)
+            if entry is not None and self._is_unchanged(file_path, entry):
+                entries[file_name] = entry
+            else:
+                pending.append(file_name)
+
+        paths = [os.path.join(self.directory_path, file_name) for file_name in pending]
+        if workers == 1 or len(paths) <= 1:
+            cleaned = [_clean_file(path) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                cleaned = list(pool.map(_clean_file, paths))
+        for file_name, entry in zip(pending, cleaned):
+            if entry is not None:
+                entries[file_name] = entry
+                self.artifacts.record(os.path.join(self.directory_path, file_name), entry["sha256"])
+        print(f"Processed {len(pending)} of {len(file_names)} CSV files ({len(file_names) - len(pending)} unchanged)")
+
+        # Merge in directory order, as if every file had just been parsed
+        for file_name in file_names:
+            if file_name in entries:
+                self._merge_country_records(entries[file_name]["metadata"])
         self._apply_eurozone_interest_rate()
         self._save_country_metadata_summary()
+        if incremental:
+            self._save_manifest(entries)
         self._process_shapefile()
+        self.artifacts.save()
 
-    def _process_file(self, file_path):
+    @staticmethod
+    def _is_unchanged(file_path, entry):
+        """Same mtime and size, or same content hash (e.g. a touch or checkout without edits)"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        if stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]:
+            return True
+        if stat.st_size == entry["size"] and digest_file(file_path) == entry["sha256"]:
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return True
+        return False
+
+    def _load_manifest(self):
+        manifest_path = os.path.join(self.directory_path, MANIFEST_NAME)
         try:
-            df = pd.read_csv(file_path)
-            cleaned_df = self._clean_dataframe(df)
-            self._extract_country_metadata(cleaned_df)
-            cleaned_df.to_csv(file_path, index=False)
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, entries):
+        manifest_path = os.path.join(self.directory_path, MANIFEST_NAME)
+        try:
+            write_if_changed(manifest_path, json.dumps(entries).encode("utf-8"))
         except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
+            print(f"Failed to save processing manifest: {e}")
+
+    def _process_file(self, file_path):
+        entry = _clean_file(file_path)
+        if entry is not None:
+            self._merge_country_records(entry["metadata"])
 
-    def _clean_dataframe(self, df):
+    @staticmethod
+    def _clean_dataframe(df):
         for column in df.columns:
             if df[column].dtype == 'object':
                 df[column] = df[column].str.strip()
@@ -60,16 +148,24 @@ class CSVProcessor:
         return df
 
     def _extract_country_metadata(self, df):
-        if 'country' in df.columns:
-            for _, row in df.iterrows():
-                country_name = row['country']
-                row_dict = row.to_dict()
-                # Exclude the 'country' key from the metadata
-                country_data = {k: v for k, v in row_dict.items() if k != 'country'}
-                # Update the country_metadata dictionary
-                if country_name not in self.country_metadata:
-                    self.country_metadata[country_name] = {}
-                self.country_metadata[country_name].update(country_data)
+        self._merge_country_records(self._country_records(df))
+
+    @staticmethod
+    def _country_records(df):
+        """
+        [country, {column: value}] pairs for a cleaned frame, in first-appearance order.
+        A country listed twice keeps its last row, as successive dict updates would.
+        """
+        if 'country' not in df.columns:
+            return []
+        last_rows = df.drop_duplicates('country', keep='last').set_index('country')
+        records = last_rows.to_dict('index')
+        return [[country, records[country]] for country in pd.unique(df['country'])]
+
+    def _merge_country_records(self, records):
+        for country_name, country_data in records:
+            # Update the country_metadata dictionary
+            self.country_metadata.setdefault(country_name, {}).update(country_data)
 
     def _load_eurozone_interest_rate(self):
         interest_rate_file = os.path.join(self.directory_path, "interest_rate.csv")
@@ -90,24 +186,43 @@ class CSVProcessor:
     def _save_country_metadata_summary(self):
         summary_file_path = os.path.join(self.directory_path, "country_metadata_summary.json")
         try:
-            with open(summary_file_path, 'w') as f:
-                json.dump(self.country_metadata, f, indent=4)
-            print(f"Country metadata saved to {summary_file_path}")
+            data = json.dumps(self.country_metadata, indent=4).encode("utf-8")
+            if write_if_changed(summary_file_path, data, self.artifacts):
+                print(f"Country metadata saved to {summary_file_path}")
+            else:
+                print(f"Country metadata unchanged: {summary_file_path}")
         except Exception as e:
             print(f"Failed to save country metadata: {e}")
 
     def _process_shapefile(self):
         try:
+            sources = shapefile_sources(self.shapefile_path)
+            if not sources:
+                raise FileNotFoundError(self.shapefile_path)
+            source_digest = self.artifacts.digest_sources(sources)
+            outputs = [
+                (self.shapefile_path.replace('.shp', '.gpkg'), 'GPKG'), # Save as GeoPackage (recommended)
+                (self.shapefile_path.replace('.shp', '.geojson'), 'GeoJSON'), # Optional: Save as GeoJSON
+            ]
+            stale = [(path, driver) for path, driver in outputs if not self.artifacts.is_current(path, source_digest)]
+            store = GeometryStore(self.shapefile_path) # Simplified, ISO-keyed outlines used by the dashboard maps
+            if not stale and store.is_current():
+                print(f"Shapefile exports up to date: {self.shapefile_path}")
+                return
+
             world = geopandas.read_file(self.shapefile_path)
-            
-            # Save as GeoPackage (recommended)
-            gpkg_path = self.shapefile_path.replace('.shp', '.gpkg')
-            world.to_file(gpkg_path, driver='GPKG')
-            
-            # Optional: Save as GeoJSON
-            geojson_path = self.shapefile_path.replace('.shp', '.geojson')
-            world.to_file(geojson_path, driver='GeoJSON')
-            
+            store.refresh(world)
+            for path, driver in stale:
+                temp_path = temp_path_for(path)
+                try:
+                    world.to_file(temp_path, driver=driver)
+                    digest = digest_file(temp_path)
+                    os.replace(temp_path, path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                self.artifacts.record(path, digest, source_digest)
+
         except Exception as e:
             print(f"Error processing shapefile: {e}")
 
@@ -117,4 +232,4 @@ if __name__ == "__main__":
     shapefile_path = "/home/luisvinatea/Dev/Repos/Aquaculture/beraqua/data/raw/shapefiles/ne_110m_admin_0_countries.shp"
     
     processor = CSVProcessor(directory_to_process, currency_tickers_path, shapefile_path)
-    processor.process_files()
\ No newline at end of file
+    processor.process_files(incremental=True, workers=None)
\ No newline at end of file
@@ -0,0 +1,286 @@
+import os
+import re
+import difflib
+import logging
+import unicodedata
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scripts.data_handling.customs_ingestion import CustomsImportStore, DATASET_DIRECTORY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ENTITY_MAP_PATH = DATASET_DIRECTORY.rstrip(os.sep) + "_entities.parquet"
+SHRIMP_EXPORTERS_PATH = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/shrimp_industry/ecuador/shrimp_exporters.csv"
+
+# Name column -> entity domain; names are only matched within their domain. Importers and shrimp
+# exporters are both Ecuadorian companies, so they share one and can be joined on the canonical name.
+ENTITY_COLUMNS = {
+    "marca": "brand",
+    "marca_comercial": "brand",
+    "probable_importador": "company",
+    "embarcador": "shipper",
+}
+EXPORTER_COLUMN = "probable_exportador"
+# Shippers are often '<seller>-<courier>'; the courier part is dropped before matching
+STRIP_FORWARDER = {"shipper"}
+
+# Placeholder names meaning 'unknown', per domain: their keys all map to one canonical name
+PLACEHOLDERS = {
+    "brand": ("sin_marca", {"sin marca", "sin marca comercial", "sinmarca", "s marca", "smarca", "s m", "sm", "generico", "generica",
+                            "no brand", "unbranded", "n a", "na", "none"}),
+}
+# Legal forms, removed wherever they appear (the text is space-separated by then)
+LEGAL_FORMS = re.compile(
+    r"\b(?:s a de c v|sa de cv|de c v|de cv|s de r l|compania limitada|sociedad anonima|s a s|s a c|s a u|s a|c a|"
+    r"s r l|s l|c ltda|cia ltda|cia|ltda|ltd|co|inc|llc|corp|corporation|limited|company|srl|sas|sau|sa|ca|gmbh|"
+    r"cv|bv|plc|e p)\b"
+)
+STOPWORDS = {"y", "and", "et", "the", "del", "de", "la", "el"}
+ABBREVIATIONS = {"intl": "international", "int": "international", "cia": "compania", "mfg": "manufacturing"}
+# Words left over on each side must be at least this similar (names sharing only a generic tail differ)
+MIN_DISTINCT_SIMILARITY = 0.75
+# Mis-decoded characters seen in the exports (cp437 'ñ' read as latin-1)
+MOJIBAKE = str.maketrans({"¥": "n", "¤": "n"})
+
+def normalize_name(name, strip_forwarder=False):
+    """
+    Matching key of a free-text name: lowercase ASCII words without legal forms or stopwords.
+
+    :param name: Raw name ('acqua_&_co_s.r.l', 'Compañia Empacadora Dufer Cia. Ltda.').
+    :param strip_forwarder: Drop everything after the first '-' (courier of a shipper).
+    :return: Space-separated key ('acqua', 'compania empacadora dufer'); '' for blanks.
+    """
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ""
+    text = unicodedata.normalize("NFKD", str(name).lower().translate(MOJIBAKE))
+    text = text.encode("ascii", "ignore").decode("ascii")
+    if strip_forwarder and "-" in text.strip("-"):
+        text = text.strip("-").split("-", 1)[0]
+    text = re.sub(r"[^a-z0-9]+", " ", text).strip()
+    stripped = LEGAL_FORMS.sub(" ", text)
+    words = [ABBREVIATIONS.get(word, word) for word in stripped.split() if word not in STOPWORDS]
+    return " ".join(words) if words else text # A name that is only a legal form keeps it
+
+def similarity(left, right):
+    """
+    Similarity of two keys in [0, 1]: 1 when they only differ by spacing or one extends the other
+    by whole words (at least two shared), else difflib's ratio. Keys whose distinct words are not
+    alike score 0 ('yiwu deming import export' vs 'yiwu qihang import export').
+    """
+    if left.replace(" ", "") == right.replace(" ", ""):
+        return 1.0
+    left_words, right_words = left.split(), right.split()
+    shorter, longer = sorted((left_words, right_words), key=len)
+    if len(shorter) >= 2 and longer[:len(shorter)] == shorter:
+        return 1.0
+    left_only = " ".join(word for word in left_words if word not in right_words)
+    right_only = " ".join(word for word in right_words if word not in left_words)
+    if left_only and right_only and len(left_words) > 1 and len(right_words) > 1:
+        if difflib.SequenceMatcher(None, left_only, right_only, autojunk=False).ratio() < MIN_DISTINCT_SIMILARITY:
+            return 0.0
+    return difflib.SequenceMatcher(None, left, right, autojunk=False).ratio()
+
+def _ngrams(key, n):
+    padded = f" {key} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+def ngram_matrix(keys, n=3):
+    """Binary (keys x distinct n-grams) matrix of the space-padded keys"""
+    vocabulary = {}
+    rows, columns = [], []
+    for row, key in enumerate(keys):
+        for gram in _ngrams(key, n):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+    return sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                             shape=(len(keys), len(vocabulary)))
+
+def candidate_pairs(keys, queries, n=3, max_block_size=200, min_overlap=0.5, window=4):
+    """
+    Pairs of keys worth comparing, without scoring all pairs.
+
+    Two blockings are combined: n-gram blocks (keys sharing at least `min_overlap` of their
+    n-grams by Dice coefficient, ignoring n-grams shared by more than `max_block_size` keys) and
+    sorted neighbourhoods (keys within `window` places in the sorted order of the keys and of the
+    reversed keys, which catches variants n-grams miss on short names).
+
+    :param keys: List of distinct keys.
+    :param queries: Positions in keys to find candidates for (the new keys); pairs among the
+                    other keys are not generated.
+    :return: Array of (i, j) position pairs with i < j.
+    """
+    queries = np.asarray(queries, dtype=np.int64)
+    if len(keys) < 2 or len(queries) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    grams = ngram_matrix(keys, n)
+    block_sizes = np.asarray(grams.sum(axis=0)).ravel()
+    sizes = np.asarray(grams.sum(axis=1)).ravel()
+    grams = grams[:, np.flatnonzero(block_sizes <= max_block_size)]
+    shared = (grams[queries] @ grams.T).tocoo()
+    left, right = queries[shared.row], shared.col
+    dice = 2 * shared.data / (sizes[left] + sizes[right])
+    keep = (dice >= min_overlap) & (left != right)
+    pairs = [np.column_stack([left[keep], right[keep]])]
+
+    is_query = np.zeros(len(keys), dtype=bool)
+    is_query[queries] = True
+    for sort_keys in (keys, [key[::-1] for key in keys]):
+        order = np.argsort(np.array(sort_keys, dtype=object), kind="stable")
+        for offset in range(1, window + 1):
+            first, second = order[:-offset], order[offset:]
+            touches = is_query[first] | is_query[second]
+            pairs.append(np.column_stack([first[touches], second[touches]]))
+    pairs = np.sort(np.concatenate(pairs).astype(np.int64), axis=1)
+    return np.unique(pairs, axis=0)
+
+class EntityResolver:
+    """
+    Incremental entity resolution of free-text names into canonical names, per domain.
+
+    The persistent map (Parquet at map_path) holds every name seen so far with its key and
+    canonical name. Resolving names looks them up first; only unseen names are blocked against
+    all known keys (candidate_pairs), scored with similarity() and clustered as connected
+    components. A cluster joining known names takes their canonical (the one with most rows),
+    so canonical names never change once assigned; a new cluster takes its most frequent name.
+    """
+    def __init__(self, map_path=ENTITY_MAP_PATH, threshold=0.88, ngram=3, max_block_size=200, window=4):
+        self.map_path = map_path
+        self.threshold = threshold
+        self.ngram = ngram
+        self.max_block_size = max_block_size
+        self.window = window
+        self.entities = self._load_map()
+
+    def _load_map(self):
+        """Saved map, or an empty one (also when map_path is None: the map then lives in memory only)"""
+        try:
+            if self.map_path:
+                return pq.read_table(self.map_path).to_pandas()
+        except (OSError, pa.ArrowInvalid):
+            pass
+        return pd.DataFrame({"domain": pd.Series([], dtype="str"), "name": pd.Series([], dtype="str"),
+                             "key": pd.Series([], dtype="str"), "canonical": pd.Series([], dtype="str"),
+                             "rows": pd.Series([], dtype="int64")})
+
+    def save_map(self):
+        """Write the map via a temp file, so an interrupted run keeps the previous one"""
+        if not self.map_path:
+            return
+        table = pa.Table.from_pandas(self.entities, preserve_index=False)
+        pq.write_table(table, self.map_path + ".tmp")
+        os.replace(self.map_path + ".tmp", self.map_path)
+
+    def resolve(self, names, domain):
+        """
+        Canonical name of each distinct name, adding unseen names to the map.
+
+        :param names: Series of raw names (repeats count towards choosing canonical names).
+        :param domain: Entity domain, e.g. 'brand'.
+        :return: Dict raw name -> canonical name (blanks are left out).
+        """
+        counts = names.dropna().astype("str")
+        counts = counts[counts.str.strip() != ""].value_counts()
+        known = self.entities[self.entities["domain"] == domain]
+        unseen = counts[~counts.index.isin(known["name"])]
+        if len(unseen):
+            self.entities = pd.concat([self.entities, self._cluster(unseen, known, domain)], ignore_index=True)
+            logging.info(f"Resolved {len(unseen)} new '{domain}' names "
+                         f"({len(counts) - len(unseen)} already in the entity map).")
+        mapping = self.entities[self.entities["domain"] == domain]
+        mapping = dict(zip(mapping["name"], mapping["canonical"]))
+        return {name: mapping[name] for name in counts.index}
+
+    def _cluster(self, unseen, known, domain):
+        """Map rows for the unseen names (a Series name -> rows, sorted by rows descending)"""
+        strip = domain in STRIP_FORWARDER
+        new = pd.DataFrame({"domain": domain, "name": unseen.index.astype("str"),
+                            "key": [normalize_name(name, strip) for name in unseen.index],
+                            "rows": unseen.to_numpy(dtype=np.int64)})
+        # Nodes are distinct keys; a known key carries its canonical (the one with most rows if several)
+        known_keys = known.groupby(["key", "canonical"])["rows"].sum().reset_index()
+        known_keys = known_keys.sort_values("rows", ascending=False, kind="stable").drop_duplicates("key")
+        new_keys = pd.Index(new["key"].unique()).difference(known_keys["key"])
+        keys = list(known_keys["key"]) + list(new_keys)
+        queries = np.arange(len(known_keys), len(keys))
+
+        pairs = candidate_pairs(keys, queries, self.ngram, self.max_block_size, window=self.window)
+        scores = np.array([similarity(keys[i], keys[j]) for i, j in pairs])
+        edges = pairs[scores >= self.threshold] if len(pairs) else pairs
+        # Only edges touching a new key: clusters already in the map are never merged
+        edges = edges[(edges >= len(known_keys)).any(axis=1)] if len(edges) else edges
+        if domain in PLACEHOLDERS and len(edges): # Placeholders are not fuzzy-matched to real names
+            placeholder_nodes = np.isin(np.array(keys, dtype=object), list(PLACEHOLDERS[domain][1]))
+            edges = edges[~placeholder_nodes[edges].any(axis=1)]
+        graph = sparse.coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(len(keys), len(keys)))
+        _, components = connected_components(graph, directed=False)
+        logging.info(f"Compared {len(pairs)} candidate pairs for {len(new_keys)} new '{domain}' keys "
+                     f"({len(keys) * (len(keys) - 1) // 2} pairs all-against-all).")
+
+        component_of_key = dict(zip(keys, components))
+        new["component"] = new["key"].map(component_of_key)
+        nodes = pd.DataFrame({"component": components[:len(known_keys)],
+                              "canonical": known_keys["canonical"].to_numpy(), "rows": known_keys["rows"].to_numpy()})
+        # Canonical per component: the known one with most rows, else the most frequent new name
+        canonical = nodes.sort_values("rows", ascending=False, kind="stable").drop_duplicates("component")
+        canonical = canonical.set_index("component")["canonical"]
+        first_new = new.sort_values("rows", ascending=False, kind="stable").drop_duplicates("component")
+        fallback = first_new.set_index("component")["name"]
+        new["canonical"] = new["component"].map(canonical).fillna(new["component"].map(fallback))
+        if domain in PLACEHOLDERS:
+            placeholder, placeholder_keys = PLACEHOLDERS[domain]
+            new.loc[new["key"].isin(placeholder_keys), "canonical"] = placeholder
+        return new.drop(columns="component")
+
+    def apply(self, frame, columns=None):
+        """
+        Add a '<column>_canonical' column for every name column of frame.
+
+        :param columns: Dict column -> domain; defaults to the ENTITY_COLUMNS present in frame.
+        :return: Copy of frame with the canonical columns; the map is saved if it grew.
+        """
+        columns = columns or {column: domain for column, domain in ENTITY_COLUMNS.items() if column in frame}
+        size = len(self.entities)
+        result = frame.copy()
+        for domain in dict.fromkeys(columns.values()):
+            domain_columns = [column for column, column_domain in columns.items() if column_domain == domain]
+            mapping = self.resolve(pd.concat([frame[column] for column in domain_columns]), domain)
+            for column in domain_columns:
+                result[f"{column}_canonical"] = frame[column].map(mapping).astype("category")
+        if len(self.entities) > size:
+            self.save_map()
+        return result
+
+def normalize_exporters(resolver, exporters_path=SHRIMP_EXPORTERS_PATH):
+    """
+    Shrimp exporter totals with spelling variants of one company merged.
+
+    :return: DataFrame with one row per canonical exporter: summed totals and the variants merged.
+    """
+    try:
+        exporters = pd.read_csv(exporters_path)
+    except FileNotFoundError:
+        logging.error(f"Shrimp exporters file not found: {exporters_path}")
+        return None
+    exporters = resolver.apply(exporters, {EXPORTER_COLUMN: "company"})
+    canonical = f"{EXPORTER_COLUMN}_canonical"
+    totals = exporters.groupby(canonical, observed=True).agg(
+        peso_neto_total=("peso_neto_total", "sum"), valor_fob_total=("valor_fob_total", "sum"),
+        cantidad_total=("cantidad_total", "sum"), hectareas_aprox=("hectareas_aprox", "sum"),
+        variants=(EXPORTER_COLUMN, "nunique"))
+    return totals.sort_values("valor_fob_total", ascending=False).reset_index()
+
+def brand_market_share(imports, column="marca_canonical", value="us$_fob"):
+    """Share of total value per canonical brand"""
+    totals = imports.groupby(column, observed=True)[value].sum().sort_values(ascending=False)
+    return (totals / totals.sum()).rename("share")
+
+if __name__ == "__main__":
+    resolver = EntityResolver()
+    imports = resolver.apply(CustomsImportStore().load())
+    print(brand_market_share(imports).head(20))
+    print(normalize_exporters(resolver).head(20))
@@ -0,0 +1,188 @@
+import os
+import re
+import logging
+import unicodedata
+import pandas as pd
+import geopandas
+from shapely.geometry import box
+from scripts.data_handling.artifact_writer import ArtifactManifest, digest_file, shapefile_sources, temp_path_for
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SHAPEFILE_PATH = "/home/luisvinatea/Dev/Repos/Aquaculture/beraqua/data/raw/shapefiles/ne_110m_admin_0_countries.shp"
+# Simplification tolerances (degrees) precomputed for map rendering; 0.0 keeps the original outlines
+TOLERANCES = (0.0, 0.1, 0.25, 0.5)
+# Natural Earth columns tried in order for a country's ISO code (ISO_A3 is -99 for France, Norway, Kosovo, ...)
+ISO_COLUMNS = ("ISO_A3", "ISO_A3_EH", "ADM0_A3")
+NAME_COLUMNS = ("ADMIN", "NAME", "NAME_LONG", "FORMAL_EN")
+# Metadata names that none of the Natural Earth name columns spell the same way
+NAME_ALIASES = {
+    "congo": "COG",
+    "czech_republic": "CZE",
+    "macedonia": "MKD",
+    "swaziland": "SWZ",
+    "tanzania": "TZA",
+    "united_states": "USA",
+}
+
+def name_key(name):
+    """Normalize a country name the way the indicator CSVs spell it ('Guinea-Bissau' -> 'guinea_bissau')"""
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+class GeometryStore:
+    """
+    World country outlines converted once from the Natural Earth shapefile to a GeoParquet store.
+
+    The store holds one row per (tolerance, country) with the outline simplified at each of TOLERANCES,
+    written one row group per tolerance with a bounding-box covering column, so a map reads only the
+    level of detail it draws. Rows are keyed by ISO 3166 alpha-3 code; country metadata (keyed by name
+    in the indicator CSVs) is joined through a name -> ISO crosswalk index instead of matching names.
+    The store is rebuilt only when the shapefile (or one of its sidecar files) changes.
+    """
+    def __init__(self, shapefile_path=SHAPEFILE_PATH, store_path=None, tolerances=TOLERANCES, manifest=None):
+        self.shapefile_path = shapefile_path
+        self.store_path = store_path or os.path.splitext(shapefile_path)[0] + ".parquet"
+        self.tolerances = tuple(sorted(set(float(tolerance) for tolerance in tolerances)))
+        self.manifest = manifest or ArtifactManifest(self.store_path + ".manifest.json")
+        self._frames = {}
+        self._crosswalk = None
+
+    def source_digest(self):
+        sources = shapefile_sources(self.shapefile_path)
+        if not sources:
+            raise FileNotFoundError(self.shapefile_path)
+        # The tolerances are part of the recipe: changing them must rebuild the store too
+        return self.manifest.digest_sources(sources) + ":" + ",".join(map(str, self.tolerances))
+
+    def is_current(self, source_digest=None):
+        return self.manifest.is_current(self.store_path, source_digest or self.source_digest())
+
+    def refresh(self, world=None, rebuild=False):
+        """
+        Rebuild the store if the shapefile changed since it was written.
+
+        :param world: Already-read shapefile GeoDataFrame, to avoid parsing it twice.
+        :param rebuild: Rebuild even if the store is current.
+        :return: True if the store was rebuilt.
+        """
+        if not shapefile_sources(self.shapefile_path) and os.path.exists(self.store_path):
+            return False # Store shipped without its source shapefile: use it as is
+        source_digest = self.source_digest()
+        if not rebuild and self.is_current(source_digest):
+            return False
+        if world is None:
+            world = geopandas.read_file(self.shapefile_path)
+        table = self._build(world)
+        temp_path = temp_path_for(self.store_path)
+        try:
+            table.to_parquet(temp_path, index=False, row_group_size=len(world), write_covering_bbox=True)
+            digest = digest_file(temp_path)
+            os.replace(temp_path, self.store_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.manifest.record(self.store_path, digest, source_digest)
+        self.manifest.save()
+        self._frames = {}
+        self._crosswalk = None
+        logging.info(f"Geometry store built from {self.shapefile_path} ({len(world)} countries, {len(self.tolerances)} levels).")
+        return True
+
+    def _build(self, world):
+        columns = {column.upper(): column for column in world.columns}
+        iso_a3 = pd.Series(pd.NA, index=world.index, dtype=object)
+        for iso_column in ISO_COLUMNS:
+            if iso_column in columns:
+                codes = world[columns[iso_column]].astype(str).str.strip().str.upper()
+                iso_a3 = iso_a3.fillna(codes.where(codes.str.fullmatch(r"[A-Z]{3}")))
+        attributes = pd.DataFrame({"iso_a3": iso_a3})
+        for name_column in NAME_COLUMNS:
+            if name_column in columns:
+                attributes[name_column.lower()] = world[columns[name_column]].astype(str)
+        keep = attributes["iso_a3"].notna() & ~attributes["iso_a3"].duplicated()
+        if not keep.all():
+            logging.warning(f"Dropping {int((~keep).sum())} shapes without a usable or unique ISO code.")
+        attributes = attributes[keep]
+        geometry = world.geometry[keep].to_crs(4326) if world.crs is not None else world.geometry[keep]
+
+        levels = []
+        for tolerance in self.tolerances:
+            outlines = geometry if tolerance == 0 else geometry.simplify(tolerance, preserve_topology=True)
+            level = attributes.copy()
+            level.insert(1, "tolerance", tolerance)
+            levels.append(geopandas.GeoDataFrame(level, geometry=outlines.values, crs=geometry.crs))
+        return pd.concat(levels, ignore_index=True)
+
+    def geometries(self, tolerance=None):
+        """
+        Country outlines at one simplification level, indexed by ISO code.
+
+        :param tolerance: One of the store's tolerances; the coarsest level if omitted.
+        :return: GeoDataFrame (spatial index built lazily by geopandas on first .sindex use).
+        """
+        tolerance = self.tolerances[-1] if tolerance is None else float(tolerance)
+        if tolerance not in self.tolerances:
+            raise ValueError(f"Tolerance {tolerance} not in store, available: {self.tolerances}")
+        frame = self._frames.get(tolerance)
+        if frame is None:
+            self.refresh()
+            frame = geopandas.read_parquet(self.store_path, filters=[("tolerance", "==", tolerance)])
+            frame = frame.drop(columns="tolerance").set_index("iso_a3")
+            self._frames[tolerance] = frame
+        return frame
+
+    def query(self, bounds, tolerance=None):
+        """Countries whose outlines intersect the (minx, miny, maxx, maxy) box, using the spatial index"""
+        frame = self.geometries(tolerance)
+        positions = frame.sindex.query(box(*bounds), predicate="intersects")
+        return frame.iloc[sorted(positions)]
+
+    @property
+    def crosswalk(self):
+        """pd.Series name_key -> ISO code (normalized Natural Earth names plus NAME_ALIASES)"""
+        if self._crosswalk is None:
+            attributes = self.geometries(self.tolerances[-1])
+            pairs = {}
+            for name_column in NAME_COLUMNS:
+                if name_column.lower() in attributes.columns:
+                    for name, iso_a3 in zip(attributes[name_column.lower()], attributes.index):
+                        pairs.setdefault(name_key(name), iso_a3) # Earlier columns (ADMIN) take precedence
+            pairs.update(NAME_ALIASES)
+            self._crosswalk = pd.Series(pairs, name="iso_a3").rename_axis("country")
+        return self._crosswalk
+
+    def iso_codes(self, names):
+        """ISO codes for country names as spelled in the indicator CSVs (NaN where unknown)"""
+        keys = [name_key(name) for name in names]
+        positions = self.crosswalk.index.get_indexer(keys)
+        codes = self.crosswalk.to_numpy()[positions]
+        return pd.Series(codes, index=list(names), dtype=object).where(positions >= 0)
+
+    def join_metadata(self, metadata, tolerance=None, how="left"):
+        """
+        Attach country metadata to the outlines by ISO code.
+
+        :param metadata: Dict {country: {field: value}} (country_metadata_summary.json) or a DataFrame indexed by country.
+        :param tolerance: Simplification level of the outlines.
+        :param how: Join type; 'left' keeps every outline, 'inner' only countries with metadata.
+        :return: GeoDataFrame indexed by ISO code. Names mapping to the same code are combined,
+                 the first non-null value per field winning.
+        """
+        if isinstance(metadata, dict):
+            metadata = pd.DataFrame.from_dict(metadata, orient="index")
+        codes = self.iso_codes(metadata.index)
+        unmatched = codes.index[codes.isna()]
+        if len(unmatched):
+            logging.info(f"No outline for {len(unmatched)} metadata entries: {', '.join(map(str, unmatched))}")
+        by_iso = metadata[codes.notna().to_numpy()].groupby(codes.dropna().to_numpy(), sort=False).first()
+        return self.geometries(tolerance).join(by_iso, how=how)
+
+if __name__ == "__main__":
+    store = GeometryStore()
+    store.refresh()
+    metadata_path = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/indicators/forex/country_metadata_summary.json"
+    world = store.join_metadata(pd.read_json(metadata_path, orient="index"))
+    print(world[["admin", "interest_rate", "inflation_rate"]].head(10))
+    print(store.query((-92, -5, -75, 2)).index.tolist()) # Around Ecuador
@@ -0,0 +1,243 @@
+import os
+import math
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy import sparse
+from scripts.data_handling.customs_ingestion import CustomsImportStore, DATASET_DIRECTORY
+from scripts.data_handling.entity_resolution import EntityResolver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CUBE_PATH = DATASET_DIRECTORY.rstrip(os.sep) + "_cube.parquet"
+DIMENSIONS = ["month", "brand", "origin", "importer", "hs_code"]
+MEASURES = ["rows", "quantity", "fob", "cif"]
+# Import columns read to build the cube
+SOURCE_COLUMNS = ["fecha", "year", "month", "marca", "marca_comercial", "pais_de_origen", "probable_importador",
+                  "partida_arancelaria", "cantidad", "us$_fob", "us$_cif", "us$_fob_unit"]
+# Unit FOB sketches: relative error of the quantiles and the value range covered (values outside are clamped)
+RELATIVE_ACCURACY = 0.02
+SKETCH_RANGE = (1e-2, 1e8)
+
+def cube_rows(imports, resolver=None):
+    """
+    One row per import line with the cube's dimensions and measures.
+
+    Brands and importers are taken as canonical names when a resolver is given (brand falls back
+    to marca_comercial when marca is blank); the HS code is the 10-digit partida.
+    """
+    if resolver is not None:
+        imports = resolver.apply(imports, {"marca": "brand", "marca_comercial": "brand",
+                                           "probable_importador": "company"})
+        brand = imports["marca_canonical"].astype(object).fillna(imports["marca_comercial_canonical"].astype(object))
+        importer = imports["probable_importador_canonical"]
+    else:
+        brand = imports["marca"].astype(object).fillna(imports["marca_comercial"].astype(object))
+        importer = imports["probable_importador"]
+    return pd.DataFrame({
+        "month": imports["fecha"].dt.to_period("M").dt.to_timestamp(),
+        "brand": brand.astype("category"),
+        "origin": imports["pais_de_origen"].astype("category"),
+        "importer": importer.astype("category"),
+        "hs_code": imports["partida_arancelaria"].astype("category"),
+        "rows": np.ones(len(imports), dtype=np.int64),
+        "quantity": imports["cantidad"].to_numpy(dtype=np.float64),
+        "fob": imports["us$_fob"].to_numpy(dtype=np.float64),
+        "cif": imports["us$_cif"].to_numpy(dtype=np.float64),
+        "unit_fob": imports["us$_fob_unit"].to_numpy(dtype=np.float64),
+    })
+
+class ImportCube:
+    """
+    Materialized aggregates of the customs imports over month x brand x origin x importer x HS code.
+
+    Every cell holds the row count, quantity, FOB and CIF sums and a log-bucket sketch of the unit
+    FOB of its rows (bucket k counts values in (gamma^(k-1), gamma^k], so any quantile of a merged
+    sketch is within RELATIVE_ACCURACY of the exact one). Sketches are rows of a sparse
+    (cells x buckets) matrix, so rolling cells up is a sparse product and merging new rows is a sum.
+    Slices and rollups read only the cells, never the import rows.
+    """
+    def __init__(self, path=CUBE_PATH, relative_accuracy=RELATIVE_ACCURACY):
+        self.path = path
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.min_key = math.ceil(math.log(SKETCH_RANGE[0]) / math.log(self.gamma))
+        self.n_buckets = math.ceil(math.log(SKETCH_RANGE[1]) / math.log(self.gamma)) - self.min_key + 1
+        self.cells = pd.DataFrame({dimension: pd.Series([], dtype="category") for dimension in DIMENSIONS}
+                                  | {measure: pd.Series([], dtype="float64") for measure in MEASURES})
+        self.cells["rows"] = self.cells["rows"].astype("int64")
+        self.cells["month"] = self.cells["month"].astype("datetime64[us]")
+        self.sketches = sparse.csr_matrix((0, self.n_buckets), dtype=np.float64)
+        if path and os.path.exists(path):
+            self.load()
+
+    def _buckets(self, values):
+        keys = np.ceil(np.log(values) / math.log(self.gamma)).astype(np.int64) - self.min_key
+        return np.clip(keys, 0, self.n_buckets - 1)
+
+    def _bucket_values(self):
+        """Representative value of every bucket (the point of least relative error)"""
+        keys = np.arange(self.n_buckets) + self.min_key
+        return 2 * self.gamma ** keys / (self.gamma + 1)
+
+    @staticmethod
+    def _group(cells, dimensions):
+        """Group id of every cell over dimensions (blank members form their own group)"""
+        if not dimensions:
+            return np.zeros(len(cells), dtype=np.int64), 1
+        ids = cells.groupby(dimensions, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        return ids, int(ids.max()) + 1 if len(ids) else 0
+
+    @staticmethod
+    def _indicator(ids, groups):
+        return sparse.csr_matrix((np.ones(len(ids)), (ids, np.arange(len(ids)))), shape=(groups, len(ids)))
+
+    def _combine(self, cells, sketches):
+        """Sum cells (and their sketches) sharing the same dimension members"""
+        ids, groups = self._group(cells, DIMENSIONS)
+        combined = cells.groupby(ids, sort=True)[MEASURES].sum()
+        members = cells[DIMENSIONS].groupby(ids, sort=True).first()
+        for dimension in DIMENSIONS[1:]: # first() keeps categories, but be explicit about the dtype
+            members[dimension] = members[dimension].astype("category")
+        return members.join(combined).reset_index(drop=True), (self._indicator(ids, groups) @ sketches).tocsr()
+
+    def add(self, rows):
+        """
+        Merge import rows (as from cube_rows) into the cube.
+
+        :return: Number of cells after the merge.
+        """
+        if rows.empty:
+            return len(self.cells)
+        ids, groups = self._group(rows, DIMENSIONS)
+        new_cells = rows[DIMENSIONS].groupby(ids, sort=True).first()
+        new_cells = new_cells.join(rows.groupby(ids, sort=True)[MEASURES].sum()).reset_index(drop=True)
+        valid = np.isfinite(rows["unit_fob"].to_numpy()) & (rows["unit_fob"].to_numpy() > 0)
+        new_sketches = sparse.csr_matrix(
+            (np.ones(int(valid.sum())), (ids[valid], self._buckets(rows["unit_fob"].to_numpy()[valid]))),
+            shape=(groups, self.n_buckets))
+        cells = pd.concat([self.cells, new_cells], ignore_index=True)
+        for dimension in DIMENSIONS[1:]: # concat of categoricals with different categories gives object
+            cells[dimension] = cells[dimension].astype("category")
+        self.cells, self.sketches = self._combine(cells, sparse.vstack([self.sketches, new_sketches]).tocsr())
+        return len(self.cells)
+
+    def drop_months(self, months):
+        """Remove the cells of the given months (Timestamps of the month start)"""
+        keep = ~self.cells["month"].isin(pd.to_datetime(list(months))).to_numpy()
+        self.cells = self.cells[keep].reset_index(drop=True)
+        self.sketches = self.sketches[np.flatnonzero(keep)]
+
+    def refresh(self, store=None, resolver=None, rebuild=False):
+        """
+        Bring the cube up to date with the customs dataset, reading only the months it needs.
+
+        Months not in the cube are added; the latest month already in it is re-read, since it may have
+        been loaded while still incomplete. rebuild=True re-reads every month.
+
+        :return: Number of months (re)loaded.
+        """
+        store = store or CustomsImportStore()
+        available = store.load(columns=["year", "month"]).drop_duplicates()
+        available = pd.to_datetime(pd.DataFrame({"year": available["year"].astype(int),
+                                                 "month": available["month"].astype(int), "day": 1}))
+        covered = pd.DatetimeIndex(self.cells["month"].unique())
+        if rebuild or covered.empty:
+            months = set(available)
+        else:
+            months = set(available[~available.isin(covered)]) | ({covered.max()} & set(available))
+        if not months:
+            logging.info("Import cube is up to date.")
+            return 0
+        filters = [[("year", "=", month.year), ("month", "=", month.month)] for month in sorted(months)]
+        imports = store.load(columns=SOURCE_COLUMNS, filters=filters)
+        if rebuild:
+            self.cells = self.cells.iloc[0:0]
+            self.sketches = self.sketches[:0]
+        else:
+            self.drop_months(months)
+        self.add(cube_rows(imports, resolver))
+        self.save()
+        logging.info(f"Import cube refreshed with {len(imports)} rows of {len(months)} month(s) "
+                     f"({len(self.cells)} cells).")
+        return len(months)
+
+    def query(self, by=None, where=None, quantiles=(0.5,)):
+        """
+        Slice and roll up the cube.
+
+        :param by: Dimensions to group by (DIMENSIONS, plus 'year'); the grand total if omitted.
+        :param where: Dict dimension -> member or list of members to keep, e.g. {"origin": ["china"]};
+                      months may be given as 'YYYY-MM' strings.
+        :param quantiles: Unit FOB quantiles to estimate from the merged sketches.
+        :return: DataFrame with the measures, unit_fob (FOB / quantity) and unit_fob_p<q> per group.
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        cells = self.cells
+        mask = np.ones(len(cells), dtype=bool)
+        for dimension, members in (where or {}).items():
+            members = members if isinstance(members, (list, tuple, set)) else [members]
+            if dimension == "month":
+                members = pd.to_datetime(list(members))
+            elif dimension == "year":
+                mask &= cells["month"].dt.year.isin(members).to_numpy()
+                continue
+            mask &= cells[dimension].isin(members).to_numpy()
+        cells = cells[mask]
+        if "year" in by:
+            cells = cells.assign(year=cells["month"].dt.year)
+        ids, groups = self._group(cells, by)
+        result = cells.groupby(ids, sort=False)[MEASURES].sum() if len(cells) else cells[MEASURES].iloc[0:0]
+        if by:
+            result = cells[by].groupby(ids, sort=False).first().join(result)
+        result["unit_fob"] = result["fob"] / result["quantity"].where(result["quantity"] > 0)
+        histograms = np.asarray((self._indicator(ids, groups) @ self.sketches[np.flatnonzero(mask)]).todense())
+        totals = histograms.sum(axis=1)
+        cumulative = np.cumsum(histograms, axis=1)
+        values = self._bucket_values()
+        for q in quantiles:
+            # First bucket whose cumulative count reaches the (lower) rank of the quantile
+            positions = (cumulative < (np.floor(q * (totals - 1)) + 1)[:, None]).sum(axis=1)
+            result[f"unit_fob_p{round(q * 100):g}"] = np.where(totals > 0, values[np.minimum(positions, self.n_buckets - 1)],
+                                                               np.nan)
+        result = result.reset_index(drop=True)
+        return result.sort_values(by).reset_index(drop=True) if by else result
+
+    def save(self):
+        """Write cells and sketches as one Parquet file via a temp file (sketches as bucket/count lists)"""
+        if not self.path:
+            return
+        sketches = self.sketches.tocsr()
+        sketches.sort_indices()
+        table = pa.Table.from_pandas(self.cells, preserve_index=False)
+        offsets = pa.array(sketches.indptr.astype(np.int32))
+        table = table.append_column("sketch_buckets", pa.ListArray.from_arrays(offsets, pa.array(sketches.indices.astype(np.int32))))
+        table = table.append_column("sketch_counts", pa.ListArray.from_arrays(offsets, pa.array(sketches.data)))
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                               b"relative_accuracy": str(self.relative_accuracy).encode(),
+                                               b"sketch_range": repr(SKETCH_RANGE).encode()})
+        pq.write_table(table, self.path + ".tmp")
+        os.replace(self.path + ".tmp", self.path)
+
+    def load(self):
+        table = pq.read_table(self.path)
+        metadata = table.schema.metadata or {}
+        if (float(metadata.get(b"relative_accuracy", b"nan")) != self.relative_accuracy
+                or metadata.get(b"sketch_range", b"").decode() != repr(SKETCH_RANGE)):
+            logging.info("Import cube was built with other sketch settings, it will be rebuilt.")
+            return
+        buckets, counts = table.column("sketch_buckets").combine_chunks(), table.column("sketch_counts").combine_chunks()
+        self.sketches = sparse.csr_matrix(
+            (counts.flatten().to_numpy(), buckets.flatten().to_numpy(), buckets.offsets.to_numpy()),
+            shape=(table.num_rows, self.n_buckets))
+        self.cells = table.drop_columns(["sketch_buckets", "sketch_counts"]).to_pandas()
+
+if __name__ == "__main__":
+    cube = ImportCube()
+    cube.refresh(resolver=EntityResolver())
+    print(cube.query(by="year"))
+    print(cube.query(by="origin", quantiles=(0.25, 0.5, 0.75)).sort_values("fob", ascending=False).head(10))
+    print(cube.query(by=["year", "brand"]).sort_values(["year", "fob"], ascending=[True, False]).groupby("year").head(3))
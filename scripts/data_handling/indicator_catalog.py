@@ -0,0 +1,146 @@
+import os
+import glob
+import json
+import logging
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+INDICATORS_DIRECTORY = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/indicators"
+INDICATOR_COLUMNS = ["country", "last", "previous", "rate_of_change", "unit", "date"]
+VALUE_COLUMNS = ["last", "previous", "rate_of_change"]
+
+class IndicatorCatalog:
+    """
+    One typed, long-format table of every '<indicator>_countries.csv' under the indicators directory.
+
+    The consolidated table (categorical country/indicator/category/unit, float32 values) is cached as
+    Feather or Parquet next to a manifest of the source files' mtimes and sizes, and is rebuilt only
+    when a source file is added, removed or modified. Cached tables are read memory-mapped.
+    """
+    def __init__(self, root=INDICATORS_DIRECTORY, cache_path=None, cache_format="feather"):
+        if cache_format not in ("feather", "parquet"):
+            raise ValueError(f"Unknown cache format '{cache_format}', expected 'feather' or 'parquet'")
+        self.root = root
+        self.cache_format = cache_format
+        self.cache_path = cache_path or os.path.join(root, f"indicator_catalog.{cache_format}")
+        self.manifest_path = self.cache_path + ".manifest.json"
+        self.table = None
+        self._slices = {}
+        self._frames = {}
+        self.load()
+
+    def discover(self):
+        """Source files keyed by relative path -> [mtime_ns, size]"""
+        manifest = {}
+        for path in sorted(glob.glob(os.path.join(self.root, "**", "*_countries.csv"), recursive=True)):
+            stat = os.stat(path)
+            manifest[os.path.relpath(path, self.root)] = [stat.st_mtime_ns, stat.st_size]
+        return manifest
+
+    def load(self, rebuild=False):
+        """Load the cached table, rebuilding it from the CSVs if the manifest no longer matches"""
+        manifest = self.discover()
+        table = None if rebuild else self._read_cache(manifest)
+        if table is None:
+            table = self._build(manifest)
+            self._write_cache(table, manifest)
+        self.table = table
+        self._frames = {}
+        # The table is sorted by indicator, so each indicator is one contiguous row range
+        codes = table["indicator"].cat.codes.to_numpy()
+        starts = codes.searchsorted(range(len(table["indicator"].cat.categories)), side="left")
+        stops = codes.searchsorted(range(len(table["indicator"].cat.categories)), side="right")
+        self._slices = {name: (start, stop) for name, start, stop in
+                        zip(table["indicator"].cat.categories, starts, stops)}
+        return table
+
+    def _read_cache(self, manifest):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                cached_manifest = json.load(f)
+            if cached_manifest != manifest:
+                logging.info("Indicator catalog is stale, rebuilding.")
+                return None
+            if self.cache_format == "feather":
+                return feather.read_table(self.cache_path, memory_map=True).to_pandas()
+            return pq.read_table(self.cache_path, memory_map=True).to_pandas()
+        except (OSError, ValueError) as e:
+            logging.info(f"Indicator catalog cache unavailable ({e}), rebuilding.")
+            return None
+
+    def _build(self, manifest):
+        frames = []
+        for relative_path in manifest:
+            file_path = os.path.join(self.root, relative_path)
+            try:
+                df = pd.read_csv(file_path, usecols=INDICATOR_COLUMNS)
+            except Exception as e:
+                logging.error(f"Skipping {file_path}: {e}")
+                continue
+            name = os.path.basename(relative_path)[:-len("_countries.csv")]
+            df.insert(0, "indicator", name)
+            df.insert(1, "category", os.path.dirname(relative_path).replace(os.sep, "/"))
+            frames.append(df)
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["indicator", "category"] + INDICATOR_COLUMNS)
+        for column in ("indicator", "category", "country", "unit"):
+            table[column] = table[column].astype(str).str.strip().astype("category")
+        table[VALUE_COLUMNS] = table[VALUE_COLUMNS].apply(pd.to_numeric, errors="coerce").astype("float32")
+        table["date"] = pd.to_datetime(table["date"], errors="coerce")
+        table = table.sort_values(["indicator", "country"], kind="stable").reset_index(drop=True)
+        logging.info(f"Indicator catalog built from {len(frames)} files ({len(table)} rows).")
+        return table
+
+    def _write_cache(self, table, manifest):
+        """Temp file + rename, so a crashed build never leaves a partial cache behind"""
+        try:
+            if self.cache_format == "feather":
+                table.to_feather(self.cache_path + ".tmp", compression="uncompressed") # Uncompressed maps without copying
+            else:
+                table.to_parquet(self.cache_path + ".tmp", index=False)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+            with open(self.manifest_path + ".tmp", 'w') as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        except OSError as e:
+            logging.error(f"Could not write indicator catalog cache {self.cache_path}: {e}")
+
+    @property
+    def indicators(self):
+        """Indicator names available in the catalog"""
+        return list(self._slices)
+
+    def get(self, indicator, countries=None, columns=None):
+        """
+        Rows of one indicator, optionally restricted to some countries.
+
+        :param indicator: Indicator name, i.e. the file name without '_countries.csv' (e.g. 'corporate_tax_rate').
+        :param countries: Country name or list of names (as in the CSVs, e.g. 'usa'); all if omitted.
+        :param columns: Columns to return; all columns if omitted.
+        :return: DataFrame indexed by country.
+        """
+        if indicator not in self._slices:
+            raise KeyError(f"Unknown indicator '{indicator}'")
+        rows = self._frames.get(indicator)
+        if rows is None:
+            start, stop = self._slices[indicator]
+            rows = self.table.iloc[start:stop].set_index("country")
+            rows.index = rows.index.astype(str)
+            self._frames[indicator] = rows # Per-indicator view built once, reused by later queries
+        if countries is not None:
+            countries = [countries] if isinstance(countries, str) else list(countries)
+            rows = rows[rows.index.isin(countries)]
+        return rows if columns is None else rows[columns]
+
+    def pivot(self, indicators, value="last", countries=None):
+        """Wide country x indicator table of one value column"""
+        frames = {indicator: self.get(indicator, countries, [value])[value] for indicator in indicators}
+        return pd.DataFrame(frames)
+
+if __name__ == "__main__":
+    catalog = IndicatorCatalog()
+    print(f"{len(catalog.indicators)} indicators, {len(catalog.table)} rows")
+    print(catalog.get("corporate_tax_rate", ["ecuador", "peru", "singapore"]))
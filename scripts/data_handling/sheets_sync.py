@@ -0,0 +1,282 @@
+import re
+import time
+import random
+import math
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def column_letter(column):
+    """1-based column number to its A1 letters (1 -> A, 26 -> Z, 27 -> AA)"""
+    letters = ""
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def column_number(letters):
+    """A1 column letters to their 1-based number (A -> 1, AA -> 27)"""
+    number = 0
+    for letter in letters.upper():
+        number = number * 26 + ord(letter) - 64
+    return number
+
+def execute_with_backoff(request, retries=5, base_delay=1.0, max_delay=32.0, sleep=time.sleep):
+    """
+    Execute a Sheets API request, retrying rate-limit and server errors with exponential backoff.
+
+    :param request: Object with an execute() method (googleapiclient HttpRequest or the fake).
+    :param retries: Retries after the first attempt.
+    :param base_delay: Delay before the first retry in seconds; doubled on each retry, plus jitter.
+    :param sleep: Sleep function (injectable so tests do not wait).
+    :return: The response of the first successful attempt.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return request.execute()
+        except Exception as e:
+            status = getattr(getattr(e, "resp", None), "status", None)
+            if attempt == retries or status is None or int(status) not in RETRY_STATUSES:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * (1 + random.random() * 0.1)
+            print(f"Sheets API returned {status}, retrying in {delay:.1f}s ({attempt + 1}/{retries})...")
+            sleep(delay)
+
+def _cell(value):
+    """Comparable form of a cell: blanks and NaN are '', numbers compare by value whatever their type"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value) if str(value).strip() != "" else ""
+    except ValueError:
+        return str(value)
+
+def _comparable(row):
+    cells = [_cell(value) for value in row]
+    while cells and cells[-1] == "": # The API omits trailing blank cells
+        cells.pop()
+    return cells
+
+def rows_equal(left, right):
+    """True if two rows hold the same cells, ignoring trailing blanks and number formatting"""
+    return _comparable(left) == _comparable(right)
+
+def tables_equal(left, right):
+    """True if two tables (lists of rows) hold the same data, ignoring trailing blank rows and cells"""
+    left = [_comparable(row) for row in left]
+    right = [_comparable(row) for row in right]
+    while left and not left[-1]:
+        left.pop()
+    while right and not right[-1]:
+        right.pop()
+    return left == right
+
+def diff_rows(existing, new_data, key_column=0):
+    """
+    Row-level changes that turn the sheet into the merge of its rows with new_data.
+
+    Rows are matched on key_column (the header is always row 1). Keys in both tables are
+    updated in place when their cells differ, new keys are appended after the last row, and
+    sheet rows whose key is not in new_data are left as they are.
+
+    :return: List of (1-based row number, row values), sorted by row number.
+    """
+    changes = []
+    if not new_data:
+        return changes
+    if not existing or not rows_equal(existing[0], new_data[0]):
+        changes.append((1, _padded(new_data[0], existing[0] if existing else [])))
+    positions = {}
+    for number, row in enumerate(existing[1:], start=2):
+        if len(row) > key_column:
+            positions.setdefault(_cell(row[key_column]), number)
+    latest = {}
+    for row in new_data[1:]:
+        latest[_cell(row[key_column]) if len(row) > key_column else ""] = row # Last row of a repeated key wins
+    next_row = max(len(existing), 1) + 1
+    for key, row in latest.items():
+        number = positions.get(key)
+        if number is None:
+            changes.append((next_row, _padded(row, [])))
+            next_row += 1
+        elif not rows_equal(existing[number - 1], row):
+            changes.append((number, _padded(row, existing[number - 1])))
+    return sorted(changes, key=lambda change: change[0])
+
+def _padded(row, old_row):
+    """Row padded with blanks over the old row's width, so stale trailing cells are cleared"""
+    row = ["" if value is None or (isinstance(value, float) and math.isnan(value)) else value for value in row]
+    return row + [""] * (len(old_row) - len(row))
+
+def coalesce_ranges(sheet_name, changes):
+    """
+    Group changed rows into contiguous A1 ranges.
+
+    :param changes: (row number, values) pairs sorted by row number, as from diff_rows.
+    :return: List of {"range": ..., "values": ...} entries for values.batchUpdate.
+    """
+    blocks = []
+    for number, values in changes:
+        if blocks and blocks[-1]["end"] == number - 1:
+            blocks[-1]["end"] = number
+            blocks[-1]["values"].append(values)
+        else:
+            blocks.append({"start": number, "end": number, "values": [values]})
+    data = []
+    for block in blocks:
+        width = max(1, max(len(values) for values in block["values"]))
+        rows = [values + [""] * (width - len(values)) for values in block["values"]]
+        data.append({"range": f"{sheet_name}!A{block['start']}:{column_letter(width)}{block['end']}", "values": rows})
+    return data
+
+class SheetSync:
+    """
+    Incremental sync between a table (list of rows, header first) and one Google Sheets tab.
+
+    The tab is read with a single values.get call and kept as a snapshot; pushes diff against the
+    snapshot and send only the changed rows, coalesced into ranges, in one values.batchUpdate call.
+    Every request goes through execute_with_backoff.
+    """
+    def __init__(self, service, spreadsheet_id, sheet_name, key_column=0, max_ranges_per_request=500,
+                 sleep=time.sleep):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.key_column = key_column
+        self.max_ranges_per_request = max_ranges_per_request
+        self.sleep = sleep
+        self.snapshot = None
+        self.requests = 0
+
+    def _execute(self, request):
+        self.requests += 1
+        return execute_with_backoff(request, sleep=self.sleep)
+
+    def fetch(self, refresh=False):
+        """All values of the tab (one API call; cached until refresh=True or a push)"""
+        if self.snapshot is None or refresh:
+            result = self._execute(self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=self.sheet_name, # Whole tab: the API returns only the used area
+                valueRenderOption="UNFORMATTED_VALUE"
+            ))
+            self.snapshot = result.get("values", [])
+        return self.snapshot
+
+    def push(self, new_data):
+        """
+        Merge new_data into the sheet by key, sending only rows that changed.
+
+        :return: Dict with updated_rows, appended_rows, ranges, cells and requests (API calls of this push).
+        """
+        requests_before = self.requests
+        existing = self.fetch()
+        changes = diff_rows(existing, new_data, self.key_column)
+        data = coalesce_ranges(self.sheet_name, changes)
+        for start in range(0, len(data), self.max_ranges_per_request):
+            self._execute(self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={"valueInputOption": "RAW", "data": data[start:start + self.max_ranges_per_request]}
+            ))
+        # Apply the same changes to the snapshot so the next push diffs against the new sheet
+        snapshot = [list(row) for row in existing]
+        for number, values in changes:
+            while len(snapshot) < number:
+                snapshot.append([])
+            snapshot[number - 1] = list(values)
+        self.snapshot = snapshot
+        appended = sum(1 for number, _ in changes if number > max(len(existing), 1))
+        return {
+            "updated_rows": len(changes) - appended,
+            "appended_rows": appended,
+            "ranges": len(data),
+            "cells": sum(len(values) for _, values in changes),
+            "requests": self.requests - requests_before,
+        }
+
+class FakeHttpError(Exception):
+    """Stand-in for googleapiclient.errors.HttpError (exposes resp.status the same way)"""
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = type("Response", (), {"status": status})()
+
+class FakeSheetsService:
+    """
+    In-memory stand-in for the Sheets v4 service, covering the calls SheetSync makes.
+
+    Tabs are lists of rows. Every executed request is appended to `calls` as (method, kwargs), and
+    statuses listed in `failures` are raised (one per request) before requests start succeeding.
+    """
+    def __init__(self, sheets=None, failures=()):
+        self.sheets = {name: [list(row) for row in rows] for name, rows in (sheets or {}).items()}
+        self.failures = list(failures)
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range, **kwargs):
+        return _FakeRequest(self, "get", {"spreadsheetId": spreadsheetId, "range": range, **kwargs})
+
+    def update(self, spreadsheetId, range, body, **kwargs):
+        return _FakeRequest(self, "update", {"spreadsheetId": spreadsheetId, "range": range, "body": body, **kwargs})
+
+    def batchUpdate(self, spreadsheetId, body):
+        return _FakeRequest(self, "batchUpdate", {"spreadsheetId": spreadsheetId, "body": body})
+
+    def _run(self, method, kwargs):
+        self.calls.append((method, kwargs))
+        if self.failures:
+            raise FakeHttpError(self.failures.pop(0))
+        if method == "get":
+            sheet_name, first_row, _, last_row, last_column = self._parse_range(kwargs["range"])
+            rows = self.sheets.get(sheet_name, [])[first_row - 1:last_row]
+            rows = [[value for value in row[:last_column]] for row in rows]
+            for row in rows:
+                while row and row[-1] == "": # Like the API, drop trailing blank cells and rows
+                    row.pop()
+            while rows and not rows[-1]:
+                rows.pop()
+            return {"range": kwargs["range"], "values": rows} if rows else {"range": kwargs["range"]}
+        updates = kwargs["body"]["data"] if method == "batchUpdate" else [{"range": kwargs["range"], **kwargs["body"]}]
+        for update in updates:
+            self._write(update["range"], update["values"])
+        return {"totalUpdatedRows": sum(len(update["values"]) for update in updates)}
+
+    def _parse_range(self, a1_range):
+        sheet_name, _, cells = a1_range.partition("!")
+        if not cells:
+            return sheet_name, 1, 1, None, None
+        match = re.fullmatch(r"([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?", cells)
+        first_column, first_row = column_number(match.group(1)), int(match.group(2))
+        last_column = column_number(match.group(3)) if match.group(3) else None
+        last_row = int(match.group(4)) if match.group(4) else None
+        return sheet_name, first_row, first_column, last_row, last_column
+
+    def _write(self, a1_range, values):
+        sheet_name, first_row, first_column, _, _ = self._parse_range(a1_range)
+        sheet = self.sheets.setdefault(sheet_name, [])
+        for offset, row in enumerate(values):
+            number = first_row + offset
+            while len(sheet) < number:
+                sheet.append([])
+            target = sheet[number - 1]
+            while len(target) < first_column - 1 + len(row):
+                target.append("")
+            target[first_column - 1:first_column - 1 + len(row)] = list(row)
+
+class _FakeRequest:
+    def __init__(self, service, method, kwargs):
+        self.service = service
+        self.method = method
+        self.kwargs = kwargs
+
+    def execute(self):
+        return self.service._run(self.method, self.kwargs)
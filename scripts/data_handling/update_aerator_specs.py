@@ -5,6 +5,7 @@ import subprocess
 import os
 import time
 from datetime import datetime
+from scripts.data_handling.sheets_sync import SheetSync, tables_equal
 
 # Configuration
 CREDENTIALS_FILE = "/home/luisvinatea/Dev/Repos/Aquaculture/.credentials/aquacyclone-0b87afb205f8.json"
@@ -22,28 +23,6 @@ def get_sheets_service():
     service = build("sheets", "v4", credentials=creds)
     return service
 
-def get_sheet_dimensions(service, spreadsheet_id, sheet_name):
-    """Get the dimensions (last row and last column) of the sheet."""
-    sheet_metadata = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-    sheets = sheet_metadata.get("sheets", [])
-    sheet = next(s for s in sheets if s["properties"]["title"] == sheet_name)
-    grid_properties = sheet["properties"]["gridProperties"]
-    last_row = grid_properties.get("rowCount", 1)
-    last_column = grid_properties.get("columnCount", 1)
-
-    # Get the actual last row and column with data
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range=f"{sheet_name}!A1:ZZ{last_row}"
-    ).execute()
-    values = result.get("values", [])
-    if not values:
-        return 1, 1
-
-    actual_last_row = len(values)
-    actual_last_column = max(len(row) for row in values) if values else 1
-    return actual_last_row, actual_last_column
-
 def read_csv_to_list(csv_file):
     df = pd.read_csv(csv_file)
     data = [df.columns.tolist()] + df.values.tolist()
@@ -60,47 +39,17 @@ def write_list_to_csv(data, csv_file):
     df.to_csv(csv_file, index=False)
     print(f"Updated {csv_file} with {len(data)} rows.")
 
-def read_google_sheet(service, spreadsheet_id, sheet_name, last_row, last_column):
-    """Read data from the specified range in the Google Sheet."""
-    # Convert last_column to a letter (e.g., 10 -> J)
-    col_letter = chr(64 + last_column) if last_column <= 26 else "ZZ"
-    range_name = f"{sheet_name}!A1:{col_letter}{last_row}"
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range=range_name
-    ).execute()
-    values = result.get("values", [])
-    return values
+def get_sheet_sync(service=None, sheet_name=SHEET_NAME):
+    """Row-diffing sync engine for one tab (fetches the sheet once, pushes only changed rows)."""
+    return SheetSync(service or get_sheets_service(), SPREADSHEET_ID, sheet_name)
 
 def update_google_sheet(service, spreadsheet_id, sheet_name, new_data):
-    last_row, last_column = get_sheet_dimensions(service, spreadsheet_id, sheet_name)
-    existing_data = read_google_sheet(service, spreadsheet_id, sheet_name, last_row, last_column)
-    
-    if not existing_data:
-        merged_data = new_data
-    else:
-        # Assume first column (A) is a unique key (e.g., brand)
-        existing_dict = {row[0]: row for row in existing_data[1:]}  # Skip header
-        new_dict = {row[0]: row for row in new_data[1:]}
-        # Merge, prioritizing new_data for existing keys
-        merged_dict = {**existing_dict, **new_dict}
-        # Rebuild data with headers
-        merged_data = [new_data[0]] + list(merged_dict.values())
-        # Ensure all rows match the widest column count
-        max_cols = max(len(new_data[0]), len(existing_data[0]))
-        for row in merged_data:
-            while len(row) < max_cols:
-                row.append("")
-    
-    col_letter = chr(64 + len(merged_data[0])) if merged_data else "ZZ"
-    range_name = f"{sheet_name}!A1:{col_letter}{len(merged_data)}"
-    service.spreadsheets().values().update(
-        spreadsheetId=spreadsheet_id,
-        range=range_name,
-        valueInputOption="RAW",
-        body={"values": merged_data}
-    ).execute()
-    print(f"Updated {range_name} with {len(merged_data)} rows.")
+    """Merge new_data into the sheet keyed on column A, sending only the rows that changed."""
+    syncer = service if isinstance(service, SheetSync) else SheetSync(service, spreadsheet_id, sheet_name)
+    stats = syncer.push(new_data)
+    print(f"Updated {stats['updated_rows']} and appended {stats['appended_rows']} rows in {sheet_name} "
+          f"({stats['ranges']} ranges, {stats['requests']} API calls).")
+    return stats
 
 def get_last_sync_timestamp():
     """Read the last sync timestamp from the file."""
@@ -139,11 +88,10 @@ def commit_csv_changes(csv_file, message="Auto-commit during sync"):
     except subprocess.CalledProcessError as e:
         print(f"Error committing changes: {e}")
 
-def pull_from_google_sheet():
+def pull_from_google_sheet(syncer=None):
     """Pull data from the Google Sheet and update the local CSV."""
-    service = get_sheets_service()
-    last_row, last_column = get_sheet_dimensions(service, SPREADSHEET_ID, SHEET_NAME)
-    sheet_data = read_google_sheet(service, SPREADSHEET_ID, SHEET_NAME, last_row, last_column)
+    syncer = syncer or get_sheet_sync()
+    sheet_data = syncer.fetch()
 
     if not sheet_data:
         print("No data found in Google Sheet.")
@@ -153,47 +101,45 @@ def pull_from_google_sheet():
     commit_csv_changes(CSV_FILE, "Pulled changes from Google Sheet")
     save_last_sync_timestamp()
 
-def push_to_google_sheet():
-    """Push data from the local CSV to the Google Sheet."""
-    if check_git_status(CSV_FILE):
+def push_to_google_sheet(syncer=None, csv_file=CSV_FILE, sheet_name=SHEET_NAME):
+    """Push data from a local CSV (the configured one by default) to its Google Sheet tab."""
+    if check_git_status(csv_file):
         print("Uncommitted changes detected in the CSV. Committing before pushing...")
-        commit_csv_changes(CSV_FILE, "Auto-commit before pushing to Google Sheet")
+        commit_csv_changes(csv_file, "Auto-commit before pushing to Google Sheet")
 
-    csv_data = read_csv_to_list(CSV_FILE)
-    service = get_sheets_service()
-    update_google_sheet(service, SPREADSHEET_ID, SHEET_NAME, csv_data)
+    csv_data = read_csv_to_list(csv_file)
+    update_google_sheet(syncer or get_sheet_sync(sheet_name=sheet_name), SPREADSHEET_ID, sheet_name, csv_data)
     save_last_sync_timestamp()
 
 def sync():
     has_local_changes = check_git_status(CSV_FILE)
-    service = get_sheets_service()
-    last_row, last_column = get_sheet_dimensions(service, SPREADSHEET_ID, SHEET_NAME)
-    sheet_data = read_google_sheet(service, SPREADSHEET_ID, SHEET_NAME, last_row, last_column)
+    syncer = get_sheet_sync()
+    sheet_data = syncer.fetch() # The only read of the sheet; push/pull below reuse it
     csv_data = read_csv_to_list(CSV_FILE)
 
-    if sheet_data != csv_data:
+    if not tables_equal(sheet_data, csv_data):
         print("Conflict detected: Google Sheet and local CSV have diverged.")
         if has_local_changes:
             print("Local CSV has uncommitted changes. Please commit or stash them before syncing.")
             return
         if not sheet_data and csv_data:
             print("Google Sheet is empty. Pushing local CSV data instead of pulling...")
-            push_to_google_sheet()
+            push_to_google_sheet(syncer)
         else:
             print("Pulling changes from Google Sheet...")
-            pull_from_google_sheet()
+            pull_from_google_sheet(syncer)
     else:
         if has_local_changes:
             print("Pushing local changes to Google Sheet...")
-            push_to_google_sheet()
+            push_to_google_sheet(syncer)
         else:
             print("No changes to sync.")
 
 def pull():
     pull_from_google_sheet()
 
-def push():
-    push_to_google_sheet()
+def push(csv_file=CSV_FILE, sheet_name=SHEET_NAME, syncer=None):
+    push_to_google_sheet(syncer, csv_file, sheet_name)
 
 if __name__ == "__main__":
     import sys
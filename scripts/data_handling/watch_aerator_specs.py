@@ -1,27 +1,138 @@
+import os
 import time
+import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from scripts.data_handling.update_aerator_specs import push
+from scripts.data_handling.update_aerator_specs import CSV_FILE, SHEET_NAME, get_sheet_sync, push
+
+# Spec CSVs to watch and the Google Sheet tab each one is pushed to
+SPEC_SHEETS = {
+    CSV_FILE: SHEET_NAME,
+}
+# Seconds a file must stay quiet before it is pushed (editors fire several events per save)
+DEBOUNCE_SECONDS = 1.0
+
+def make_push_handler(sheet_name):
+    """
+    Handler pushing a CSV to one tab. The authenticated sync engine is created on the first
+    push and reused; its snapshot is refreshed before each push so edits made in the sheet count.
+    """
+    syncer = None
+    def handler(path):
+        nonlocal syncer
+        if syncer is None:
+            syncer = get_sheet_sync(sheet_name=sheet_name)
+        syncer.fetch(refresh=True)
+        push(csv_file=path, sheet_name=sheet_name, syncer=syncer)
+    return handler
+
+class DebouncedWorker:
+    """
+    Runs handler(path) on one background thread, once per burst of events for that path.
+
+    A path is handled when no event for it arrived for `delay` seconds; events that arrive while
+    its handler is running mark it dirty again, so it runs once more afterwards. Only one handler
+    runs at a time.
+    """
+    def __init__(self, handlers, delay=DEBOUNCE_SECONDS):
+        self.handlers = handlers
+        self.delay = delay
+        self._deadlines = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="spec-push-worker", daemon=True)
+        self._thread.start()
+
+    def schedule(self, path):
+        """Called from the event thread: (re)start the quiet period of path and return immediately"""
+        with self._condition:
+            self._deadlines[path] = time.monotonic() + self.delay
+            self._condition.notify()
+
+    def stop(self, wait=True):
+        """Stop after the running handler (pending bursts are pushed first when wait is True)"""
+        with self._condition:
+            if not wait:
+                self._deadlines.clear()
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _next_due(self):
+        """Wait for the next path whose quiet period has elapsed; None once stopped and drained"""
+        with self._condition:
+            while True:
+                if self._deadlines:
+                    path, deadline = min(self._deadlines.items(), key=lambda item: item[1])
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stopped:
+                        del self._deadlines[path]
+                        return path
+                    self._condition.wait(remaining)
+                elif self._stopped:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _run(self):
+        while True:
+            path = self._next_due()
+            if path is None:
+                return
+            try:
+                self.handlers[path](path)
+            except Exception as e:
+                print(f"Error handling change in {path}: {e}")
+
+class SpecWatcher(FileSystemEventHandler):
+    """Forwards create/modify/move events of the watched spec files to a DebouncedWorker."""
+    def __init__(self, worker):
+        super().__init__()
+        self.worker = worker
+
+    def _schedule(self, path):
+        path = os.path.abspath(path)
+        if path in self.worker.handlers:
+            self.worker.schedule(path)
 
-class CSVWatcher(FileSystemEventHandler):
     def on_modified(self, event):
-        if not event.is_directory and event.src_path.endswith("Pesos_WangFa_Beraqua_3HP_2025-03-22.csv"):
-            print(f"Detected change in {event.src_path}. Pushing to Google Sheet...")
-            push()
+        if not event.is_directory:
+            self._schedule(event.src_path)
 
-def watch_csv():
-    path = "/home/luisvinatea/Dev/Repos/Aquaculture/data/raw/csv"
-    event_handler = CSVWatcher()
+    def on_created(self, event):
+        if not event.is_directory:
+            self._schedule(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory: # Editors that save via a temp file and rename
+            self._schedule(event.dest_path)
+
+def watch_specs(spec_handlers=None, delay=DEBOUNCE_SECONDS):
+    """
+    Watch spec CSVs and push each one after its changes settle.
+
+    :param spec_handlers: Dict path -> handler(path); defaults to pushing every SPEC_SHEETS file to its tab.
+    :param delay: Debounce delay in seconds.
+    """
+    if spec_handlers is None:
+        spec_handlers = {path: make_push_handler(sheet_name) for path, sheet_name in SPEC_SHEETS.items()}
+    handlers = {os.path.abspath(path): handler for path, handler in spec_handlers.items()}
+    worker = DebouncedWorker(handlers, delay)
     observer = Observer()
-    observer.schedule(event_handler, path, recursive=False)
+    for directory in sorted({os.path.dirname(path) for path in handlers}):
+        observer.schedule(SpecWatcher(worker), directory, recursive=False)
+        print(f"Watching for changes in {directory}...")
     observer.start()
-    print(f"Watching for changes in {path}...")
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    worker.stop()
+
+def watch_csv():
+    watch_specs()
 
 if __name__ == "__main__":
-    watch_csv()
\ No newline at end of file
+    watch_csv()
@@ -1,4 +1,6 @@
+import bisect
 import os
+import numpy as np
 import pandas as pd
 import logging
 import json
@@ -7,6 +9,45 @@ from scripts.financial.hedging_calculator import HedgingCostCalculator  # Import
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def _opportunity_fields(columns, hedging_cost, hedging_type, client_rate, loan_markup, index=slice(None)):
+    """
+    Unsorted opportunity fields for the countries at `index` of the column arrays.
+    Returns (fields, score) where score is the unscaled risk-adjusted profit used for ranking.
+    """
+    interest_rate = columns["interest_rate"][index]
+    corporate_tax = columns["corporate_tax"][index]
+    hedging_cost = hedging_cost[index]
+
+    loan_margin_decimal = loan_markup / 100.0
+    foreign_loan_rate = interest_rate / 100.0 + loan_margin_decimal
+    interest_rate_diff = float(client_rate) / 100.0 - foreign_loan_rate
+    pre_tax_arbitrage_profit = interest_rate_diff - hedging_cost
+    post_tax_profit = pre_tax_arbitrage_profit * (1 - corporate_tax / 100.0)
+    risk_adjusted_profit = post_tax_profit / columns["risk_adjustment_factor"][index]
+
+    fields = {
+        "country": columns["country"][index],
+        "currency_code": columns["currency_ticker"][index],
+        "interest_rate_diff": interest_rate_diff * 100,
+        "annual_hedging_cost": hedging_cost * 100,
+        "hedging_type": hedging_type[index],
+        "pre_tax_arbitrage_profit": pre_tax_arbitrage_profit * 100,
+        "post_tax_arbitrage_profit": post_tax_profit * 100,
+        "risk_adjusted_profit": risk_adjusted_profit * 100,
+        "risk_rating": columns["te"][index].astype(np.int64),
+        "loan_margin_percentage": np.full(interest_rate.shape, loan_margin_decimal * 100),
+        "corporate_tax": corporate_tax,
+        "inflation_rate": columns["inflation_rate"][index],
+        "loan_interest_rate": interest_rate,
+        "total_loan_rate": foreign_loan_rate * 100,
+    }
+    return fields, risk_adjusted_profit
+
+def _records(fields):
+    """Column arrays -> list of dicts with plain Python values"""
+    keys = list(fields)
+    return [dict(zip(keys, row)) for row in zip(*(fields[key].tolist() for key in keys))]
+
 class ArbitrageAnalyzer:
     def __init__(self, data_directory, forward_proxy_path, inflation_proxy_path, loan_margin_percentage=6.0):
         self.data_directory = data_directory
@@ -14,6 +55,9 @@ class ArbitrageAnalyzer:
         self.inflation_proxy_path = inflation_proxy_path
         self.loan_margin_percentage = loan_margin_percentage
         self.country_metadata = None
+        self.country_frame = None
+        self._columns = None
+        self._hedging_by_horizon = {}
         self.hedging_calculator = HedgingCostCalculator(inflation_proxy_path, forward_proxy_path, verbose=False)
         self.load_data()
 
@@ -25,71 +69,186 @@ class ArbitrageAnalyzer:
         except Exception as e:
             logging.error(f"Data loading failed. Check file paths and formats. Error: {e}")
             raise
+        self.country_frame = self._build_country_frame(self.country_metadata)
+        # Plain arrays for the hot path, so repeated quotes skip DataFrame column access
+        self._columns = {column: self.country_frame[column].to_numpy() for column in
+                         ["interest_rate", "corporate_tax", "inflation_rate", "te", "risk_adjustment_factor"]}
+        self._columns["country"] = self.country_frame.index.to_numpy(dtype=object)
+        self._columns["currency_ticker"] = self.country_frame["currency_ticker"].to_numpy(dtype=object)
+        self._hedging_by_horizon = {}
+
+    @staticmethod
+    def _build_country_frame(country_metadata):
+        """
+        Typed columnar view of the countries that can be analyzed. Ecuador, countries without a
+        currency ticker and countries missing any rate or risk rating are dropped.
+        """
+        frame = pd.DataFrame.from_dict(country_metadata, orient="index")
+        frame = frame.reindex(columns=["currency_ticker", "interest_rate", "corporate_tax", "inflation_rate", "te"])
+        numeric = ["interest_rate", "corporate_tax", "inflation_rate", "te"]
+        frame[numeric] = frame[numeric].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+        has_ticker = frame["currency_ticker"].notna() & (frame["currency_ticker"].astype(object) != "")
+        eligible = (frame.index.str.lower() != "ecuador") & has_ticker & frame[numeric].notna().all(axis=1)
+        frame = frame[eligible].copy()
+        frame.index.name = "country"
+        frame["currency_ticker"] = frame["currency_ticker"].astype(str)
+        frame["currency_pair"] = "usd_" + frame["currency_ticker"].str.lower()
+        frame["risk_adjustment_factor"] = 101 - np.trunc(frame["te"]) # int(risk_rating)
+        return frame
+
+    def _hedging_costs(self, horizon):
+        """Per-country hedging cost and type for one horizon, computed once and reused by later calls"""
+        if horizon not in self._hedging_by_horizon:
+            frame = self.country_frame
+            with np.errstate(divide="ignore", invalid="ignore"): # Forward costs at horizon 0 are discarded below
+                hedging = self.hedging_calculator.compute_hedging_costs(frame["currency_pair"].tolist(), horizon)
+            costs = hedging["hedging_cost"].to_numpy()
+            # Countries without proxy data fall back to their own inflation rate, as do forward-proxy
+            # countries when the horizon is not positive (annualizing a forward needs 1 / horizon)
+            forward = (hedging["hedging_source"] == "forward_proxy").to_numpy()
+            fallback = hedging["hedging_source"].isna().to_numpy() | (forward & ~np.asarray(horizon > 0))
+            costs = np.where(fallback, frame["inflation_rate"].to_numpy() / 100.0, costs)
+            types = np.where(fallback, "Log Inflation", "Forward Rate")
+            self._hedging_by_horizon[horizon] = (costs, types)
+        return self._hedging_by_horizon[horizon]
+
+    def _opportunity_columns(self, client_rate, horizon, loan_markup):
+        """Opportunity fields as arrays, already sorted by risk_adjusted_profit (descending, stable)"""
+        hedging_cost, hedging_type = self._hedging_costs(horizon)
+        fields, score = _opportunity_fields(self._columns, hedging_cost, hedging_type, client_rate, loan_markup)
+        order = np.argsort(-score, kind="stable")
+        return {key: values[order] for key, values in fields.items()}
+
+    def rank_opportunities(self, client_rate, horizon, loan_markup, k=20):
+        """OpportunityRanker for one quote: top-K selection plus incremental updates on rate changes"""
+        return OpportunityRanker(self, client_rate, horizon, loan_markup, k)
+
+    def analyze_opportunities_frame(self, client_rate, horizon, loan_markup):
+        """
+        Rank every country for one quote with array expressions over the country frame.
+
+        Returns a DataFrame with the same columns as the analyze_opportunities records, sorted by
+        risk_adjusted_profit (descending, ties kept in country order).
+        """
+        return pd.DataFrame(self._opportunity_columns(client_rate, horizon, loan_markup))
+
+    def analyze_opportunity_grid(self, client_rates, horizons, loan_markups):
+        """
+        Evaluate every (client_rate, horizon, loan_markup) combination at once.
+
+        Returns a dict with the grid axes, the country order, risk_adjusted_profit and
+        post_tax_arbitrage_profit arrays of shape (client_rates, horizons, loan_markups, countries)
+        (in percent, like analyze_opportunities) and the best country per grid point.
+        """
+        columns = self._columns
+        client_rates = np.asarray(client_rates, dtype=np.float64)
+        loan_markups = np.asarray(loan_markups, dtype=np.float64)
+        # (horizons, countries); only the hedging cost depends on the horizon
+        hedging_cost = np.stack([self._hedging_costs(horizon)[0] for horizon in horizons])
+
+        foreign_loan_rate = columns["interest_rate"] / 100.0 + (loan_markups / 100.0)[:, None]
+        interest_rate_diff = (client_rates / 100.0)[:, None, None, None] - foreign_loan_rate[None, None, :, :]
+        pre_tax_arbitrage_profit = interest_rate_diff - hedging_cost[None, :, None, :]
+        post_tax_profit = pre_tax_arbitrage_profit * (1 - columns["corporate_tax"] / 100.0)
+        risk_adjusted_profit = post_tax_profit / columns["risk_adjustment_factor"]
+        countries = columns["country"]
+        return {
+            "client_rate": client_rates,
+            "horizon": np.asarray(horizons),
+            "loan_markup": loan_markups,
+            "countries": countries,
+            "post_tax_arbitrage_profit": post_tax_profit * 100,
+            "risk_adjusted_profit": risk_adjusted_profit * 100,
+            "best_country": countries[np.argmax(risk_adjusted_profit, axis=-1)] if len(countries) else None,
+        }
 
     def analyze_opportunities(self, client_rate, horizon, loan_markup):
-        opportunities = []
-        for country, data in self.country_metadata.items():
-            if country.lower() == "ecuador":
-                continue
-
-            currency_ticker = data.get("currency_ticker")
-            if not currency_ticker:
-                continue
-
-            currency_pair = f"usd_{currency_ticker.lower()}"
-            interest_rate = data.get("interest_rate")
-            corporate_tax = data.get("corporate_tax")
-            inflation_rate = data.get("inflation_rate")
-            risk_rating = data.get("te")
-
-            if any(pd.isna(v) for v in [interest_rate, corporate_tax, inflation_rate, risk_rating]):
-                continue
-
-            interest_rate_decimal = float(interest_rate) / 100.0
-            client_rate_decimal = float(client_rate) / 100.0
-            loan_margin_decimal = loan_markup / 100.0
-            corporate_tax_decimal = float(corporate_tax) / 100.0
-            inflation_rate_decimal = float(inflation_rate) / 100.0
-
-            foreign_loan_rate = interest_rate_decimal + loan_margin_decimal
-            interest_rate_diff = client_rate_decimal - foreign_loan_rate
-
-            try:
-                hedging_cost = self.hedging_calculator.compute_hedging_cost(currency_pair, horizon)
-                hedging_type = "Forward Rate"
-            except Exception as e:
-                hedging_cost = inflation_rate_decimal
-                hedging_type = "Log Inflation"
-
-            pre_tax_arbitrage_profit = interest_rate_diff - hedging_cost
-            post_tax_profit = pre_tax_arbitrage_profit * (1 - corporate_tax_decimal)
-            risk_adjustment_factor = (101 - int(risk_rating))
-            risk_adjusted_profit = post_tax_profit / risk_adjustment_factor
-
-            opportunities.append({
-                "country": country,
-                "currency_code": currency_ticker,
-                "interest_rate_diff": interest_rate_diff * 100,
-                "annual_hedging_cost": hedging_cost * 100,
-                "hedging_type": hedging_type,
-                "pre_tax_arbitrage_profit": pre_tax_arbitrage_profit * 100,
-                "post_tax_arbitrage_profit": post_tax_profit * 100,
-                "risk_adjusted_profit": risk_adjusted_profit * 100,
-                "risk_rating": risk_rating,
-                "loan_margin_percentage": loan_margin_decimal * 100,
-                "corporate_tax": corporate_tax,
-                "inflation_rate": inflation_rate,
-                "loan_interest_rate": interest_rate,
-                "total_loan_rate": foreign_loan_rate * 100,
-            })
-
-        return sorted(opportunities, key=lambda x: x['risk_adjusted_profit'], reverse=True)
+        return _records(self._opportunity_columns(client_rate, horizon, loan_markup))
+
+class OpportunityRanker:
+    """
+    Top-K arbitrage ranking for one quote (client_rate, horizon, loan_markup).
+
+    The first ranking uses argpartition, so only the K winners are sorted. update_country rescores
+    a single country and, from then on, keeps a sorted key list that is patched with bisect instead
+    of re-ranking every country on each market-data tick.
+    """
+    UPDATABLE = ("interest_rate", "corporate_tax", "inflation_rate", "te", "hedging_cost")
+
+    def __init__(self, analyzer, client_rate, horizon, loan_markup, k=20):
+        self.client_rate = client_rate
+        self.horizon = horizon
+        self.loan_markup = loan_markup
+        self.k = k
+        # Private copies, so ticks never leak into the analyzer's shared arrays
+        self.columns = {key: values.copy() for key, values in analyzer._columns.items()}
+        hedging_cost, hedging_type = analyzer._hedging_costs(horizon)
+        self.hedging_cost = hedging_cost.copy()
+        self.hedging_type = hedging_type.copy()
+        self.positions = {country: i for i, country in enumerate(self.columns["country"])}
+        _, self.scores = _opportunity_fields(self.columns, self.hedging_cost, self.hedging_type, client_rate, loan_markup)
+        self._ranking = None # Sorted [(-score, position)] list, built on the first update
+
+    def _select(self, k):
+        """Positions of the k best countries, in analyze_opportunities order"""
+        if self._ranking is not None:
+            return np.array([position for _, position in self._ranking[:k]], dtype=np.intp)
+        scores = self.scores
+        if k < scores.size:
+            kth = np.argpartition(-scores, k - 1)[:k]
+            # Every country tied with the K-th score competes, so ties resolve by country order as in a stable sort
+            candidates = np.flatnonzero(scores >= scores[kth].min())
+        else:
+            candidates = np.arange(scores.size)
+        return candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+
+    def top_k(self, k=None):
+        """Records of the K best opportunities (same fields as ArbitrageAnalyzer.analyze_opportunities)"""
+        k = self.k if k is None else k
+        index = self._select(min(k, self.scores.size))
+        fields, _ = _opportunity_fields(self.columns, self.hedging_cost, self.hedging_type,
+                                        self.client_rate, self.loan_markup, index)
+        return _records(fields)
+
+    def update_country(self, country, **rates):
+        """
+        Apply new rates for one country and move it to its new rank.
+
+        :param country: Country name as in the metadata (e.g. 'brazil').
+        :param rates: Any of interest_rate, corporate_tax, inflation_rate, te (in the metadata's units)
+                      or hedging_cost (decimal, annual).
+        """
+        unknown = set(rates) - set(self.UPDATABLE)
+        if unknown:
+            raise ValueError(f"Cannot update {sorted(unknown)}; expected any of {self.UPDATABLE}")
+        if any(pd.isna(value) for value in rates.values()):
+            raise ValueError(f"Missing rate for {country}: {rates}")
+        i = self.positions[country]
+        for key, value in rates.items():
+            if key == "hedging_cost":
+                self.hedging_cost[i] = value
+            else:
+                self.columns[key][i] = value
+        if "te" in rates:
+            self.columns["risk_adjustment_factor"][i] = 101 - np.trunc(rates["te"])
+        if "inflation_rate" in rates and "hedging_cost" not in rates and self.hedging_type[i] == "Log Inflation":
+            self.hedging_cost[i] = rates["inflation_rate"] / 100.0 # The fallback hedge tracks the inflation rate
+
+        if self._ranking is None:
+            order = np.lexsort((np.arange(self.scores.size), -self.scores))
+            self._ranking = list(zip((-self.scores[order]).tolist(), order.tolist()))
+        old_key = (-float(self.scores[i]), i)
+        del self._ranking[bisect.bisect_left(self._ranking, old_key)]
+        _, score = _opportunity_fields(self.columns, self.hedging_cost, self.hedging_type,
+                                       self.client_rate, self.loan_markup, [i])
+        self.scores[i] = score[0]
+        bisect.insort(self._ranking, (-float(score[0]), i))
 
 def test_arbitrage_analyzer():
     """Test function for standalone execution."""
     data_directory = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/indicators/forex"
     forward_proxy_path = os.path.join(data_directory, "forward_proxy.csv")
-    inflation_proxy_path = os.path.join(data_directory, "inflation_proxy.csv")
+    inflation_proxy_path = os.path.join(data_directory, "inflation_proxy.parquet")
     analyzer = ArbitrageAnalyzer(data_directory, forward_proxy_path, inflation_proxy_path)
     client_rate_input = 12.0
     horizon_input = 6
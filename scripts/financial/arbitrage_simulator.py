@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 from scripts.financial.arbitrage_calculator import ArbitrageAnalyzer
+from scripts.financial.credit_evaluation import evaluate_portfolio
 
 class CreditEvaluation:
     def __init__(self, aerator_price, aerator_quantity, client_rate, loan_rate, horizon, factoring_discount):
@@ -31,8 +32,10 @@ class Simulator:
     def __init__(self, data_directory, ecuador_directory):
         self.data_directory = data_directory
         self.ecuador_directory = ecuador_directory
-        self.analyzer = ArbitrageAnalyzer(data_directory, ecuador_directory)
-        self.analyzer.load_data()
+        self.analyzer = ArbitrageAnalyzer(data_directory, os.path.join(data_directory, "forward_proxy.csv"),
+                                          os.path.join(data_directory, "inflation_proxy.parquet"))
+        self.ranker = None
+        self._quote = None
 
     def analyze_opportunities(self, aerator_price, aerator_quantity, client_rate, horizon, factoring_discount, loan_markup):
         """
@@ -49,9 +52,10 @@ class Simulator:
         Returns:
             tuple: A tuple containing the metrics DataFrame and the arbitrage opportunities DataFrame.
         """
-        # Run arbitrage analysis
+        # Run arbitrage analysis: only the top 20 countries are ranked and evaluated
         client_rate_percentage = client_rate * 100
-        arbitrage_results = self.analyzer.analyze_opportunities(client_rate=client_rate_percentage, horizon=horizon, loan_markup=loan_markup)
+        self.ranker = self.analyzer.rank_opportunities(client_rate=client_rate_percentage, horizon=horizon, loan_markup=loan_markup, k=20)
+        self._quote = (aerator_price, aerator_quantity, client_rate, horizon, factoring_discount, loan_markup)
 
         # Financial Metrics Table
         evaluation = CreditEvaluation(aerator_price, aerator_quantity, client_rate, 0.05, horizon, factoring_discount)
@@ -61,46 +65,62 @@ class Simulator:
             'Value': [f"${aerator_price:.2f}", aerator_quantity, f"{client_rate * 100:.2f}%", horizon, f"{factoring_discount * 100:.2f}%", f"{loan_markup:.2f}%", f"${evaluation.initial_investment:.2f}"]
         })
 
-        # Arbitrage Opportunities (Ranking)
-        if isinstance(arbitrage_results, list) and arbitrage_results:
-            sorted_results = sorted(arbitrage_results, key=lambda x: x['risk_adjusted_profit'], reverse=True)[:20]
-
-            arbitrage_data = []
-            for res in sorted_results:
-                total_loan_rate = res['total_loan_rate'] / 100.0  # Base + markup
-                eval_country = CreditEvaluation(aerator_price, aerator_quantity, client_rate, total_loan_rate, horizon, factoring_discount)
-                cash_flows_country = eval_country.calculate_cash_flows(client_rate, total_loan_rate)
-                npv_country = eval_country.calculate_npv(cash_flows_country, total_loan_rate)
-                pi_country = eval_country.calculate_pi(npv_country)
-                arbitrage_data.append({
-                    'Country': res['country'],
-                    'Adjusted Profitability (%)': res['risk_adjusted_profit'],
-                    'Base Loan Rate (%)': res['loan_interest_rate'],
-                    'Total Loan Rate (%)': res['total_loan_rate'],  # Show base + markup
-                    'Annualized Coverage Cost (%)': res['annual_hedging_cost'],
-                    'Coverage Cost Type': res['hedging_type'],
-                    'NPV': npv_country,
-                    'PI': pi_country,
-                    'Interest Rate Differential (%)': res['interest_rate_diff'],
-                    'Pre-Tax Arbitrage Profit (%)': res['pre_tax_arbitrage_profit'],
-                    'Post-Tax Arbitrage Profit (%)': res['post_tax_arbitrage_profit'],
-                    'Risk Rating (te)': res['risk_rating'],
-                    'Loan Markup (%)': loan_markup,
-                    'Corporate Tax (%)': res['corporate_tax'],
-                    'Inflation Rate (%)': res['inflation_rate'],
-                    'Spot Exchange Rate': res['spot_exchange_rate'],
-                    'Forward Exchange Rate': res['forward_exchange_rate']
-                })
-
-            arbitrage_df = pd.DataFrame(arbitrage_data)
-            arbitrage_df['NPV'] = arbitrage_df['NPV'].apply(lambda x: f"${x:.2f}")
-            arbitrage_df['PI'] = arbitrage_df['PI'].apply(lambda x: f"{x:.4f}")
-            arbitrage_df['Spot Exchange Rate'] = arbitrage_df['Spot Exchange Rate'].apply(lambda x: f"{x:.4f}")
-            arbitrage_df['Forward Exchange Rate'] = arbitrage_df['Forward Exchange Rate'].apply(lambda x: f"{x:.4f}")
-        else:
-            arbitrage_df = pd.DataFrame()  # Empty DataFrame if no results
-
-        return metrics_df, arbitrage_df
+        return metrics_df, self._arbitrage_table(self.ranker.top_k())
+
+    def update_country(self, country, **rates):
+        """
+        Re-rank the last quote after one country's rates change (e.g. on a market-data tick).
+
+        Args:
+            country (str): Country name as in the country metadata.
+            **rates: New interest_rate, corporate_tax, inflation_rate, te and/or hedging_cost.
+
+        Returns:
+            pd.DataFrame: The updated arbitrage opportunities table.
+        """
+        if self.ranker is None:
+            raise RuntimeError("Call analyze_opportunities before updating country rates.")
+        self.ranker.update_country(country, **rates)
+        return self._arbitrage_table(self.ranker.top_k())
+
+    def _arbitrage_table(self, top_results):
+        """Arbitrage Opportunities (Ranking) table; NPV and PI are evaluated only for the ranked countries"""
+        aerator_price, aerator_quantity, client_rate, horizon, factoring_discount, loan_markup = self._quote
+        if not top_results:
+            return pd.DataFrame()  # Empty DataFrame if no results
+
+        hedging_calculator = self.analyzer.hedging_calculator
+        total_loan_rates = [res['total_loan_rate'] / 100.0 for res in top_results]  # Base + markup
+        deals = evaluate_portfolio(aerator_price, aerator_quantity, client_rate, total_loan_rates, horizon, factoring_discount)
+        arbitrage_data = []
+        for res, npv_country, pi_country in zip(top_results, deals['npv'], deals['pi']):
+            spot_rate, forward_rate = hedging_calculator.get_exchange_rates(f"usd_{res['currency_code'].lower()}")
+            arbitrage_data.append({
+                'Country': res['country'],
+                'Adjusted Profitability (%)': res['risk_adjusted_profit'],
+                'Base Loan Rate (%)': res['loan_interest_rate'],
+                'Total Loan Rate (%)': res['total_loan_rate'],  # Show base + markup
+                'Annualized Coverage Cost (%)': res['annual_hedging_cost'],
+                'Coverage Cost Type': res['hedging_type'],
+                'NPV': npv_country,
+                'PI': pi_country,
+                'Interest Rate Differential (%)': res['interest_rate_diff'],
+                'Pre-Tax Arbitrage Profit (%)': res['pre_tax_arbitrage_profit'],
+                'Post-Tax Arbitrage Profit (%)': res['post_tax_arbitrage_profit'],
+                'Risk Rating (te)': res['risk_rating'],
+                'Loan Markup (%)': loan_markup,
+                'Corporate Tax (%)': res['corporate_tax'],
+                'Inflation Rate (%)': res['inflation_rate'],
+                'Spot Exchange Rate': spot_rate,
+                'Forward Exchange Rate': forward_rate
+            })
+
+        arbitrage_df = pd.DataFrame(arbitrage_data)
+        arbitrage_df['NPV'] = arbitrage_df['NPV'].apply(lambda x: f"${x:.2f}")
+        arbitrage_df['PI'] = arbitrage_df['PI'].apply(lambda x: f"{x:.4f}")
+        arbitrage_df['Spot Exchange Rate'] = arbitrage_df['Spot Exchange Rate'].apply(lambda x: f"{x:.4f}")
+        arbitrage_df['Forward Exchange Rate'] = arbitrage_df['Forward Exchange Rate'].apply(lambda x: f"{x:.4f}")
+        return arbitrage_df
 
     def save_results(self, metrics_df, arbitrage_df, aerator_price, aerator_quantity, client_rate, horizon, factoring_discount, loan_markup):
         """
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+def initial_investment(aerator_price, aerator_quantity, factoring_discount):
+    """
+    Amount financed per deal after the supplier's factoring discount.
+
+    Args:
+        aerator_price (array_like): Price per aerator.
+        aerator_quantity (array_like): Aerators per deal.
+        factoring_discount (array_like): Factoring discount as a decimal.
+
+    Returns:
+        np.ndarray: Initial investment per deal (same formula as CreditEvaluation).
+    """
+    return (np.asarray(aerator_price, dtype=np.float64) * (1 - np.asarray(factoring_discount, dtype=np.float64))) \
+        * np.asarray(aerator_quantity, dtype=np.float64)
+
+def _annuity_factor(rate, horizon):
+    """Present value of 1 per period for `horizon` periods: (1 - (1 + r)^-n) / r, and n when r == 0"""
+    rate = np.asarray(rate, dtype=np.float64)
+    horizon = np.asarray(horizon, dtype=np.float64)
+    zero = rate == 0
+    safe_rate = np.where(zero, 1.0, rate)
+    return np.where(zero, horizon, (1 - (1 + safe_rate) ** -horizon) / safe_rate)
+
+def annuity_payment(principal, rate, horizon):
+    """
+    Level payment that amortizes `principal` over `horizon` periods at `rate`.
+
+    Args:
+        principal (array_like): Amount financed.
+        rate (array_like): Rate per period as a decimal.
+        horizon (array_like): Number of periods.
+
+    Returns:
+        np.ndarray: Payment per period.
+    """
+    return np.asarray(principal, dtype=np.float64) / _annuity_factor(rate, horizon)
+
+def level_npv(investment, payment, reference_rate, horizon):
+    """
+    NPV of -investment today followed by `horizon` equal payments, in closed form.
+
+    Args:
+        investment (array_like): Outflow at t=0 (positive number).
+        payment (array_like): Payment per period.
+        reference_rate (array_like): Discount rate per period.
+        horizon (array_like): Number of payments.
+
+    Returns:
+        np.ndarray: Net present value per deal.
+    """
+    return np.asarray(payment, dtype=np.float64) * _annuity_factor(reference_rate, horizon) \
+        - np.asarray(investment, dtype=np.float64)
+
+def profitability_index(npv, investment):
+    """PI = (NPV + investment) / |investment|, as in CreditEvaluation.calculate_pi"""
+    investment = np.asarray(investment, dtype=np.float64)
+    return (np.asarray(npv, dtype=np.float64) + investment) / np.abs(investment)
+
+def level_irr(investment, payment, horizon, max_iter=50, tol=1e-12):
+    """
+    IRR of -investment followed by `horizon` equal payments, for many deals at once.
+
+    Solves investment = payment * sum(v^t, t=1..n) for v = 1 / (1 + IRR) with Newton's method.
+    The left side is increasing and convex in v, so starting where it is >= 0 converges monotonically.
+
+    Args:
+        investment (array_like): Outflow at t=0 (positive number).
+        payment (array_like): Payment per period (positive number).
+        horizon (array_like): Number of payments (integers, may differ per deal).
+
+    Returns:
+        np.ndarray: IRR per deal.
+    """
+    investment, payment, horizon = np.broadcast_arrays(np.asarray(investment, dtype=np.float64),
+                                                       np.asarray(payment, dtype=np.float64),
+                                                       np.asarray(horizon, dtype=np.int64))
+    periods = np.arange(1, horizon.max(initial=0) + 1)
+    in_horizon = periods <= horizon[..., None] # Deals with shorter horizons ignore the padded periods
+    v = np.maximum(1.0, investment / (horizon * payment))
+    for _ in range(max_iter):
+        powers = np.where(in_horizon, v[..., None] ** periods, 0.0)
+        f = payment * powers.sum(axis=-1) - investment
+        df = payment * (periods * powers).sum(axis=-1) / v
+        step = f / df
+        v = v - step
+        if np.all(np.abs(step) <= tol * v):
+            break
+    return 1 / v - 1
+
+def amortization_schedule(principal, rate, horizon):
+    """
+    Period-by-period amortization of level-payment loans, padded to the longest horizon.
+
+    Args:
+        principal (array_like): Amount financed per deal.
+        rate (array_like): Rate per period as a decimal.
+        horizon (array_like): Number of periods per deal.
+
+    Returns:
+        dict: Arrays of shape (deals, max_horizon) for 'payment', 'interest', 'principal' and
+              'balance' (remaining balance after each payment); periods beyond a deal's horizon are 0.
+    """
+    principal, rate, horizon = np.broadcast_arrays(np.asarray(principal, dtype=np.float64),
+                                                   np.asarray(rate, dtype=np.float64),
+                                                   np.asarray(horizon, dtype=np.int64))
+    principal, rate, horizon = np.atleast_1d(principal, rate, horizon)
+    payment = annuity_payment(principal, rate, horizon)
+    periods = np.arange(1, horizon.max(initial=0) + 1)
+    in_horizon = periods <= horizon[:, None]
+    growth = (1 + rate[:, None]) ** periods
+    # Closed-form remaining balance: B_t = P (1+r)^t - A ((1+r)^t - 1) / r (and P - A t when r == 0)
+    zero = rate[:, None] == 0
+    safe_rate = np.where(zero, 1.0, rate[:, None])
+    balance = np.where(zero, principal[:, None] - payment[:, None] * periods,
+                       principal[:, None] * growth - payment[:, None] * (growth - 1) / safe_rate)
+    balance = np.where(periods == horizon[:, None], 0.0, balance) # Remove rounding residue on the last payment
+    previous_balance = np.concatenate([principal[:, None], balance[:, :-1]], axis=1)
+    interest = previous_balance * rate[:, None]
+    return {
+        "payment": np.where(in_horizon, payment[:, None], 0.0),
+        "interest": np.where(in_horizon, interest, 0.0),
+        "principal": np.where(in_horizon, previous_balance - balance, 0.0),
+        "balance": np.where(in_horizon, balance, 0.0),
+    }
+
+def evaluate_portfolio(aerator_price, aerator_quantity, client_rate, loan_rate, horizon, factoring_discount):
+    """
+    Price many aerator financing deals at once (vectorized CreditEvaluation).
+
+    Each deal finances the initial investment at client_rate with level annual payments over
+    `horizon` years; NPV and PI discount those payments at loan_rate. All arguments broadcast.
+
+    Args:
+        aerator_price (array_like): Price per aerator.
+        aerator_quantity (array_like): Aerators per deal.
+        client_rate (array_like): Annual rate charged to the client (decimal).
+        loan_rate (array_like): Annual funding rate used as reference rate (decimal).
+        horizon (array_like): Years.
+        factoring_discount (array_like): Supplier factoring discount (decimal).
+
+    Returns:
+        pd.DataFrame: One row per deal with the inputs plus initial_investment, annual_payment, npv, pi and irr.
+    """
+    columns = np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in
+                                    (aerator_price, aerator_quantity, client_rate, loan_rate, horizon, factoring_discount)))
+    aerator_price, aerator_quantity, client_rate, loan_rate, horizon, factoring_discount = columns
+    investment = initial_investment(aerator_price, aerator_quantity, factoring_discount)
+    payment = annuity_payment(investment, client_rate, horizon)
+    npv = level_npv(investment, payment, loan_rate, horizon)
+    return pd.DataFrame({
+        "aerator_price": aerator_price,
+        "aerator_quantity": aerator_quantity,
+        "client_rate": client_rate,
+        "loan_rate": loan_rate,
+        "horizon": horizon,
+        "factoring_discount": factoring_discount,
+        "initial_investment": investment,
+        "annual_payment": payment,
+        "npv": npv,
+        "pi": profitability_index(npv, investment),
+        "irr": level_irr(investment, payment, horizon),
+    })
@@ -1,8 +1,53 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
 from scipy.optimize import differential_evolution
+from scipy.stats import qmc
 import numpy_financial as npf
 
-def calcular_metricas_parametros_fijos(variables):
+# Parámetros del modelo de factoring; cada escenario sobrescribe solo las claves que cambia
+PARAMETROS_BASE = {
+    'descuento_factoring': 0.10, # Descuento de factoring
+    'porcentaje_principal': 0.25, # Porcentaje principal del camaronero
+    'periodo_pago_camaronero_meses': 72, # Periodo de pago del camaronero en meses
+    'tasa_base_suiza_anual': 0.005, # Tasa base anual en Suiza
+    'costo_hedging_anual': -0.00036, # Costo anual de cobertura (hedging)
+    'tasa_impuestos': 0.146, # Tasa de impuestos
+    'recebibles_iniciales': 120_000, # Monto inicial de cuentas por cobrar
+    'limites_markup': (4, 6), # Rango del markup (%)
+    'limites_tasa_camaronero': (12, 14), # Rango de la tasa de interés al camaronero (%)
+}
+
+# Métricas del frente de Pareto y sentido de optimización. Dentro de un escenario ROI, ROE y TIR crecen
+# juntos con la utilidad; la diferencia de tasas (el diferencial cobrado al camaronero, que se busca
+# minimizar) compite con ellos, y es lo que da un frente con compromisos reales.
+OBJETIVOS_PARETO = {'roi': 'max', 'roe': 'max', 'irr': 'max', 'rate_difference': 'min'}
+# Puntos muestreados por escenario (hipercubo latino sobre los límites) además de las poblaciones de DE
+MUESTRAS_PARETO = 256
+# Filas comparadas a la vez con el frente acumulado al filtrar el frente de Pareto
+BLOQUE_PARETO = 512
+
+def crear_parametros(**cambios):
+    """
+    Crea un conjunto de parámetros a partir de PARAMETROS_BASE.
+
+    Args:
+        **cambios: Claves de PARAMETROS_BASE a sobrescribir (por ejemplo descuento_factoring=0.08).
+
+    Returns:
+        dict: Parámetros completos del escenario.
+    """
+    desconocidas = set(cambios) - set(PARAMETROS_BASE)
+    if desconocidas:
+        raise KeyError(f"Parámetros desconocidos: {sorted(desconocidas)}")
+    return {**PARAMETROS_BASE, **cambios}
+
+def _numero_flujos(parametros):
+    """Número de flujos de caja anuales del plazo (6 para 72 meses)."""
+    return int(np.ceil(parametros['periodo_pago_camaronero_meses'] / 12))
+
+def calcular_metricas_parametros_fijos(variables, parametros=None):
     """
     Calcula las métricas financieras del proyecto con parámetros de descuento de factoring
     y porcentaje principal del camaronero fijos.
@@ -11,6 +56,7 @@ def calcular_metricas_parametros_fijos(variables):
         variables (tuple): Tupla que contiene el markup (en porcentaje) y la tasa de interés al camaronero (en porcentaje).
                            - variables[0]: Markup para la tasa de financiamiento suiza (%).
                            - variables[1]: Tasa de interés anual cobrada a los camaroneros (%).
+        parametros (dict, optional): Parámetros del escenario (ver crear_parametros); PARAMETROS_BASE si se omite.
 
     Returns:
         dict: Un diccionario que contiene las métricas financieras calculadas:
@@ -28,20 +74,23 @@ def calcular_metricas_parametros_fijos(variables):
               - 'tasa_suiza_anual': Tasa de interés suiza anual utilizada en el cálculo.
               - 'costo_inicial': Costo inicial de la inversión.
     """
+    parametros = PARAMETROS_BASE if parametros is None else parametros
     markup, tasa_camaronero = variables
-    descuento_factoring = 0.10  # Fijo en 10%
-    porcentaje_principal = 0.25   # Fijo en 25%
-    periodo_pago_camaronero_meses = 72 # Periodo de pago del camaronero en meses
-    TASA_BASE_SUIZA_ANUAL = 0.005 # Tasa base anual en Suiza
-    COSTO_HEDGING_ANUAL = -0.00036 # Costo anual de cobertura (hedging)
-    TASA_IMPUESTOS = 0.146 # Tasa de impuestos
-    RECEBIBLES_INICIALES = 120_000 # Monto inicial de cuentas por cobrar
+    descuento_factoring = parametros['descuento_factoring']
+    porcentaje_principal = parametros['porcentaje_principal']
+    periodo_pago_camaronero_meses = parametros['periodo_pago_camaronero_meses']
+    TASA_BASE_SUIZA_ANUAL = parametros['tasa_base_suiza_anual']
+    COSTO_HEDGING_ANUAL = parametros['costo_hedging_anual']
+    TASA_IMPUESTOS = parametros['tasa_impuestos']
+    RECEBIBLES_INICIALES = parametros['recebibles_iniciales']
+    markup_min, markup_max = parametros['limites_markup']
+    tasa_min, tasa_max = parametros['limites_tasa_camaronero']
 
     markup /= 100 # Convertir markup de porcentaje a decimal
     tasa_camaronero_anual = tasa_camaronero / 100 # Convertir tasa camaronero de porcentaje a decimal
 
     # Validar rangos de parámetros de entrada
-    if not (0.04 <= markup <= 0.06 and 0.12 <= tasa_camaronero_anual <= 0.14):
+    if not (markup_min / 100 <= markup <= markup_max / 100 and tasa_min / 100 <= tasa_camaronero_anual <= tasa_max / 100):
         return {
             'roi': -np.inf, 'roe': -np.inf, 'payback': np.inf, 'irr': -np.inf, 'npv': -np.inf, 'pi': -np.inf,
             'rate_difference': np.inf, 'valid': False, 'utilidad_despues_de_impuestos': 0, 'capital_propio': 0, 'monto_financiado': 0, 'tasa_suiza_anual': 0, 'costo_inicial': 0
@@ -78,7 +127,7 @@ def calcular_metricas_parametros_fijos(variables):
     payback = costo_inicial / utilidad_despues_de_impuestos if utilidad_despues_de_impuestos != 0 else np.inf # Payback
 
     inversion_inicial = costo_inicial # Inversión inicial
-    flujos_caja = [utilidad_despues_de_impuestos] * 6 # Flujos de caja
+    flujos_caja = [utilidad_despues_de_impuestos] * _numero_flujos(parametros) # Flujos de caja
     flujo_caja_array = np.insert(flujos_caja, 0, -inversion_inicial) # Array de flujos de caja incluyendo la inversión inicial
     irr_value = npf.irr(flujo_caja_array) # TIR
     npv_value = npf.npv(tasa_suiza_anual, flujo_caja_array) # VPN
@@ -105,7 +154,7 @@ def calcular_metricas_parametros_fijos(variables):
     }
     return metricas
 
-def objetivo_combinado_parametros_fijos(variables):
+def objetivo_combinado_parametros_fijos(variables, parametros=None):
     """
     Función objetivo combinada para la optimización, penaliza soluciones inválidas
     y aquellas que no cumplen con los rangos objetivo de las métricas financieras.
@@ -113,13 +162,14 @@ def objetivo_combinado_parametros_fijos(variables):
 
     Args:
         variables (tuple): Tupla que contiene el markup y la tasa de interés al camaronero.
+        parametros (dict, optional): Parámetros del escenario; PARAMETROS_BASE si se omite.
 
     Returns:
         float: Valor de la función objetivo. Retorna np.inf si la solución no es válida o no cumple las restricciones.
                Retorna la diferencia de tasas si la solución es válida y cumple las restricciones.
     """
     markup, tasa_camaronero = variables
-    metricas_objetivo = calcular_metricas_parametros_fijos(variables)
+    metricas_objetivo = calcular_metricas_parametros_fijos(variables, parametros)
 
     if not metricas_objetivo['valid']:
         return np.inf  # Penalización alta para conjuntos de parámetros inválidos
@@ -146,34 +196,310 @@ def objetivo_combinado_parametros_fijos(variables):
     return metricas_objetivo['rate_difference'] # Minimizar la diferencia de tasas si se cumplen todos los objetivos
 
 
-# Definir límites (bounds) para la optimización de markup y tasa_camaronero
-limites_parametros_fijos = [(4, 6), (12, 14)] # Límites para markup y tasa_camaronero (rangos en porcentaje)
-
-# Optimización utilizando el algoritmo de evolución diferencial
-resultado_fijo = differential_evolution(
-    objetivo_combinado_parametros_fijos, # Función objetivo a minimizar
-    limites_parametros_fijos,           # Límites de los parámetros
-    strategy='best1bin',                # Estrategia de evolución diferencial
-    maxiter=1000,                       # Número máximo de iteraciones
-    popsize=15,                         # Tamaño de la población en cada iteración
-    tol=0.001,                          # Tolerancia para la convergencia
-    mutation=(0.5, 1),                  # Rango de mutación
-    recombination=0.7,                  # Probabilidad de recombinación
-    seed=42                             # Semilla para la reproducibilidad
-)
-
-# Extraer resultados de la optimización
-variables_optimas_fijas = resultado_fijo.x # Valores óptimos de markup y tasa_camaronero
-diferencia_tasas_minimizada = resultado_fijo.fun # Valor mínimo de la diferencia de tasas alcanzado
-metricas_optimas_fijas = calcular_metricas_parametros_fijos(variables_optimas_fijas) # Métricas financieras con parámetros óptimos
-
-# Imprimir resultados de la optimización
-print(f"""
+def _tir_flujos_nivelados(inversion, flujo, n_periodos, max_iter=50, tol=1e-12):
+    """
+    TIR vectorizada para flujos nivelados: -inversion + flujo * sum(v^t, t=1..n) = 0, con v = 1/(1+TIR).
+
+    El VPN en v es creciente y convexo para flujo > 0, por lo que Newton converge de forma monótona
+    partiendo de un punto con VPN >= 0 (v0 = max(1, inversion / (n * flujo))). Da la misma raíz real que npf.irr.
+
+    Args:
+        inversion (np.ndarray): Inversión inicial por individuo.
+        flujo (np.ndarray): Flujo de caja anual constante por individuo (debe ser > 0).
+        n_periodos (int): Número de flujos anuales.
+
+    Returns:
+        np.ndarray: TIR por individuo.
+    """
+    t = np.arange(1, n_periodos + 1)
+    v = np.maximum(1.0, inversion / (n_periodos * flujo))
+    for _ in range(max_iter):
+        potencias = v[..., None] ** t # v^1 .. v^n
+        f = flujo * potencias.sum(axis=-1) - inversion
+        df = flujo * (t * potencias / v[..., None]).sum(axis=-1)
+        paso = f / df
+        v = v - paso
+        if np.all(np.abs(paso) <= tol * v):
+            break
+    return 1 / v - 1
+
+def calcular_metricas_poblacion(poblacion, parametros=None):
+    """
+    Versión vectorizada de calcular_metricas_parametros_fijos que evalúa una población completa en una llamada.
+
+    Usa VPN e IR en forma cerrada (anualidad) y una TIR por Newton vectorizado, ya que los flujos de caja
+    son nivelados. Los individuos inválidos reciben los mismos valores centinela que la versión escalar.
+
+    Args:
+        poblacion (np.ndarray): Arreglo de forma (2, S) (formato de differential_evolution con vectorized=True)
+                                o (2,) con el markup (%) y la tasa de interés al camaronero (%) por individuo.
+        parametros (dict, optional): Parámetros del escenario; PARAMETROS_BASE si se omite.
+
+    Returns:
+        dict: Las mismas claves que calcular_metricas_parametros_fijos, con arreglos de forma (S,).
+    """
+    parametros = PARAMETROS_BASE if parametros is None else parametros
+    markup, tasa_camaronero = np.asarray(poblacion, dtype=np.float64)
+    descuento_factoring = parametros['descuento_factoring']
+    porcentaje_principal = parametros['porcentaje_principal']
+    periodo_pago_camaronero_meses = parametros['periodo_pago_camaronero_meses']
+    TASA_BASE_SUIZA_ANUAL = parametros['tasa_base_suiza_anual']
+    COSTO_HEDGING_ANUAL = parametros['costo_hedging_anual']
+    TASA_IMPUESTOS = parametros['tasa_impuestos']
+    RECEBIBLES_INICIALES = parametros['recebibles_iniciales']
+    markup_min, markup_max = parametros['limites_markup']
+    tasa_min, tasa_max = parametros['limites_tasa_camaronero']
+    N_FLUJOS = _numero_flujos(parametros) # Número de flujos de caja anuales
+
+    markup = markup / 100 # Convertir markup de porcentaje a decimal
+    tasa_camaronero_anual = tasa_camaronero / 100 # Convertir tasa camaronero de porcentaje a decimal
+
+    periodo_años = periodo_pago_camaronero_meses / 12 # Periodo de pago en años
+    costo_inicial = RECEBIBLES_INICIALES * (1 - descuento_factoring) # Costo inicial de la inversión
+    principal = costo_inicial * porcentaje_principal # Monto del principal
+    capital_propio = costo_inicial - principal # Capital propio invertido
+    monto_financiado = costo_inicial - principal # Monto financiado externamente
+    tasa_suiza_anual = TASA_BASE_SUIZA_ANUAL + markup + COSTO_HEDGING_ANUAL # Tasa de financiamiento suiza anual
+    utilidad_antes_de_impuestos = monto_financiado * (tasa_camaronero_anual - tasa_suiza_anual) * periodo_años
+    utilidad_despues_de_impuestos = utilidad_antes_de_impuestos * (1 - TASA_IMPUESTOS) # Utilidad despues de impuestos
+
+    # Mismas reglas de validez que la versión escalar
+    valido = ((markup_min / 100 <= markup) & (markup <= markup_max / 100)
+              & (tasa_min / 100 <= tasa_camaronero_anual) & (tasa_camaronero_anual <= tasa_max / 100)
+              & (capital_propio > 0) & (utilidad_antes_de_impuestos > 0))
+    # Los individuos inválidos se evalúan con valores neutros y luego se sobrescriben
+    utilidad = np.where(valido, utilidad_despues_de_impuestos, 1.0)
+    tasa = np.where(valido, tasa_suiza_anual, 0.05)
+
+    # Anualidad en forma cerrada: sum_{t=1..n} U / (1+r)^t = U * (1 - (1+r)^-n) / r
+    pv_flujos_caja_entrantes = utilidad * (1 - (1 + tasa) ** -N_FLUJOS) / tasa
+    npv_value = pv_flujos_caja_entrantes - costo_inicial # VPN
+    pi_value = (pv_flujos_caja_entrantes + costo_inicial) / costo_inicial # IR (misma definición que la versión escalar)
+    irr_value = _tir_flujos_nivelados(costo_inicial, utilidad, N_FLUJOS) # TIR
+
+    return {
+        'roi': np.where(valido, utilidad / costo_inicial, -np.inf),
+        'roe': np.where(valido, utilidad / capital_propio, -np.inf),
+        'payback': np.where(valido, costo_inicial / utilidad, np.inf),
+        'irr': np.where(valido, irr_value, -np.inf),
+        'npv': np.where(valido, npv_value, -np.inf),
+        'pi': np.where(valido, pi_value, -np.inf),
+        'rate_difference': np.where(valido, np.abs(tasa_camaronero_anual - tasa_suiza_anual), np.inf),
+        'valid': valido,
+        'utilidad_despues_de_impuestos': np.where(valido, utilidad, 0),
+        'capital_propio': np.where(valido, capital_propio, 0),
+        'monto_financiado': np.where(valido, monto_financiado, 0),
+        'tasa_suiza_anual': np.where(valido, tasa_suiza_anual, 0),
+        'costo_inicial': np.where(valido, costo_inicial, 0)
+    }
+
+def objetivo_combinado_poblacion(poblacion, parametros=None):
+    """
+    Versión vectorizada de objetivo_combinado_parametros_fijos para differential_evolution(vectorized=True).
+
+    Args:
+        poblacion (np.ndarray): Arreglo de forma (2, S) con el markup y la tasa de interés al camaronero.
+        parametros (dict, optional): Parámetros del escenario; PARAMETROS_BASE si se omite.
+
+    Returns:
+        np.ndarray: Valor de la función objetivo por individuo, con las mismas penalizaciones que la versión escalar.
+    """
+    m = calcular_metricas_poblacion(poblacion, parametros)
+    fuera_de_rango = (
+        ~((0.20 <= m['irr']) & (m['irr'] <= 0.30)), # TIR fuera de rango
+        m['pi'] <= 1, # IR menor o igual a 1
+        m['npv'] <= 0, # VPN menor o igual a 0
+        ~((0.10 <= m['roe']) & (m['roe'] <= 0.15)), # ROE fuera de rango
+        ~((0.20 <= m['roi']) & (m['roi'] <= 0.30)), # ROI fuera de rango
+        m['payback'] > 6, # Payback mayor a 6 años
+    )
+    penalizacion = 100.0 * np.sum(fuera_de_rango, axis=0) # Penalización sustancial por cada objetivo incumplido
+    objetivo = np.where(penalizacion > 0, penalizacion, m['rate_difference'])
+    return np.where(m['valid'], objetivo, np.inf) # Penalización alta para conjuntos de parámetros inválidos
+
+# Configuración de differential_evolution compartida por todas las corridas
+OPCIONES_DE = {
+    'strategy': 'best1bin', # Estrategia de evolución diferencial
+    'maxiter': 1000, # Número máximo de iteraciones
+    'popsize': 15, # Tamaño de la población en cada iteración
+    'tol': 0.001, # Tolerancia para la convergencia
+    'mutation': (0.5, 1), # Rango de mutación
+    'recombination': 0.7, # Probabilidad de recombinación
+}
+
+def optimizar_escenario(parametros=None, semilla=42):
+    """
+    Ejecuta differential_evolution (vectorizado) para un escenario y una semilla.
+
+    Args:
+        parametros (dict, optional): Parámetros del escenario; PARAMETROS_BASE si se omite.
+        semilla (int): Semilla para la reproducibilidad.
+
+    Returns:
+        dict: Resultado de la corrida:
+              - 'parametros', 'semilla': Entradas de la corrida.
+              - 'x': Markup (%) y tasa al camaronero (%) óptimos.
+              - 'objetivo': Valor mínimo de la función objetivo penalizada.
+              - 'metricas': Métricas financieras en el óptimo.
+              - 'poblacion': Población final de forma (S, 2), usada para el frente de Pareto.
+    """
+    parametros = PARAMETROS_BASE if parametros is None else parametros
+    resultado = differential_evolution(
+        objetivo_combinado_poblacion,
+        [parametros['limites_markup'], parametros['limites_tasa_camaronero']],
+        args=(parametros,),
+        seed=semilla,
+        vectorized=True, # Una sola llamada por generación
+        updating='deferred', # Requerido por el modo vectorizado
+        **OPCIONES_DE
+    )
+    return {
+        'parametros': parametros,
+        'semilla': semilla,
+        'x': resultado.x,
+        'objetivo': resultado.fun,
+        'metricas': calcular_metricas_parametros_fijos(resultado.x, parametros),
+        'poblacion': resultado.population,
+    }
+
+def _optimizar_tarea(tarea):
+    """Punto de entrada de los procesos del pool: (índice de escenario, parámetros, semilla)."""
+    indice, parametros, semilla = tarea
+    resultado = optimizar_escenario(parametros, semilla)
+    resultado['escenario'] = indice
+    return resultado
+
+def generar_semillas(n_semillas, semilla_base=42):
+    """Semillas independientes y reproducibles derivadas de semilla_base mediante SeedSequence."""
+    return [int(hijo.generate_state(1)[0]) for hijo in np.random.SeedSequence(semilla_base).spawn(n_semillas)]
+
+def frente_pareto(tabla, objetivos=None):
+    """
+    Filtra las filas no dominadas de una tabla de métricas.
+
+    Los candidatos se recorren en orden lexicográfico descendente, por bloques de BLOQUE_PARETO filas:
+    un punto solo puede estar dominado por uno anterior, y basta compararlo (vectorizado) con el
+    frente acumulado y con su propio bloque, porque la dominancia es transitiva.
+
+    Args:
+        tabla (pd.DataFrame): Una fila por candidato con las columnas de objetivos.
+        objetivos (dict, optional): Métrica -> 'max' o 'min'; OBJETIVOS_PARETO si se omite.
+
+    Returns:
+        pd.DataFrame: Filas no dominadas (sin duplicados exactos), ordenadas por el primer objetivo.
+    """
+    objetivos = OBJETIVOS_PARETO if objetivos is None else objetivos
+    # Todo se expresa como maximización
+    valores = np.column_stack([tabla[m].to_numpy(dtype=np.float64) * (1 if sentido == 'max' else -1)
+                               for m, sentido in objetivos.items()])
+    orden = np.lexsort(valores.T[::-1])[::-1] # Descendente por el primer objetivo, luego los siguientes
+    # Duplicados exactos: se conserva el primero en el orden
+    _, primeros = np.unique(valores[orden], axis=0, return_index=True)
+    orden = orden[np.sort(primeros)]
+
+    def dominados(puntos, por):
+        """Máscara de los puntos dominados por alguna fila de `por`."""
+        return np.any(np.all(por[None] >= puntos[:, None], axis=2) & np.any(por[None] > puntos[:, None], axis=2), axis=1)
+
+    frente = np.empty(0, dtype=np.intp)
+    for inicio in range(0, len(orden), BLOQUE_PARETO):
+        bloque = orden[inicio:inicio + BLOQUE_PARETO]
+        puntos = valores[bloque]
+        conservar = ~dominados(puntos, valores[frente]) & ~dominados(puntos, puntos)
+        frente = np.concatenate([frente, bloque[conservar]])
+    return tabla.iloc[frente].reset_index(drop=True)
+
+def muestrear_limites(parametros, n_muestras, semilla):
+    """
+    Muestra de hipercubo latino de (markup, tasa al camaronero) dentro de los límites del escenario.
+
+    Returns:
+        np.ndarray: Arreglo de forma (n_muestras, 2), como la población de differential_evolution.
+    """
+    limites = np.array([parametros['limites_markup'], parametros['limites_tasa_camaronero']], dtype=np.float64)
+    muestra = qmc.LatinHypercube(d=2, seed=semilla).random(n_muestras)
+    return qmc.scale(muestra, limites[:, 0], limites[:, 1])
+
+def _tabla_candidatos(puntos, parametros, indice, semilla, origen):
+    """Métricas y objetivo penalizado de cada punto (markup, tasa) de un escenario."""
+    metricas = calcular_metricas_poblacion(puntos.T, parametros)
+    tabla = pd.DataFrame({clave: valor for clave, valor in metricas.items()})
+    tabla.insert(0, 'tasa_camaronero', puntos[:, 1])
+    tabla.insert(0, 'markup', puntos[:, 0])
+    tabla.insert(0, 'origen', origen)
+    tabla.insert(0, 'semilla', semilla)
+    tabla.insert(0, 'escenario', indice)
+    tabla['objetivo'] = objetivo_combinado_poblacion(puntos.T, parametros)
+    for clave in ('descuento_factoring', 'porcentaje_principal', 'periodo_pago_camaronero_meses', 'tasa_impuestos'):
+        tabla[clave] = parametros[clave]
+    return tabla
+
+def optimizar_lote(escenarios, n_semillas=4, semilla_base=42, workers=None, objetivos=None, solo_factibles=False,
+                   n_muestras=MUESTRAS_PARETO):
+    """
+    Optimiza muchos escenarios con varias semillas en paralelo y construye el frente de Pareto de cada uno.
+
+    Cada corrida minimiza la función objetivo penalizada, por lo que su población final se concentra
+    alrededor de un único óptimo. Para que el frente cubra los compromisos dentro de cada escenario,
+    los candidatos son esas poblaciones más n_muestras puntos de hipercubo latino sobre los límites
+    de markup y tasa de cada escenario; el frente se calcula por escenario con OBJETIVOS_PARETO
+    (ROI/ROE/TIR frente a la diferencia de tasas), así ningún segmento queda oculto tras otro más rentable.
+
+    Args:
+        escenarios (list): Lista de parámetros (ver crear_parametros).
+        n_semillas (int): Corridas independientes por escenario.
+        semilla_base (int): Semilla raíz; el mismo valor reproduce el lote completo.
+        workers (int, optional): Número de procesos (os.cpu_count() si se omite; 1 ejecuta en el proceso actual).
+        objetivos (dict, optional): Objetivos del frente de Pareto; OBJETIVOS_PARETO si se omite.
+        solo_factibles (bool): Usar solo candidatos que cumplen todos los rangos objetivo (objetivo < 100).
+        n_muestras (int): Puntos muestreados por escenario sobre los límites (0 usa solo las poblaciones de DE).
+
+    Returns:
+        dict: - 'resultados': Resultado de cada corrida (ver optimizar_escenario), en orden de escenario y semilla.
+              - 'candidatos': pd.DataFrame con las métricas de cada individuo de las poblaciones finales.
+              - 'pareto': dict escenario -> pd.DataFrame con sus candidatos no dominados (vacío si no tiene).
+    """
+    semillas = generar_semillas(n_semillas, semilla_base)
+    tareas = [(indice, parametros, semilla) for indice, parametros in enumerate(escenarios) for semilla in semillas]
+    workers = os.cpu_count() if workers is None else workers
+    if workers == 1:
+        resultados = [_optimizar_tarea(tarea) for tarea in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultados = list(pool.map(_optimizar_tarea, tareas)) # map conserva el orden de las tareas
+
+    tablas = [_tabla_candidatos(resultado['poblacion'], resultado['parametros'], resultado['escenario'],
+                                resultado['semilla'], 'de') for resultado in resultados]
+    if n_muestras > 0:
+        semillas_muestras = generar_semillas(len(escenarios), semilla_base + 1)
+        for indice, (parametros, semilla) in enumerate(zip(escenarios, semillas_muestras)):
+            tablas.append(_tabla_candidatos(muestrear_limites(parametros, n_muestras, semilla), parametros,
+                                            indice, semilla, 'muestra'))
+    candidatos = pd.concat(tablas, ignore_index=True)
+    factibles = candidatos[candidatos['valid']]
+    if solo_factibles:
+        factibles = factibles[factibles['objetivo'] < 100]
+    grupos = dict(tuple(factibles.groupby('escenario')))
+    pareto = {indice: frente_pareto(grupos[indice], objetivos) if indice in grupos else factibles.iloc[:0].reset_index(drop=True)
+              for indice in range(len(escenarios))}
+    return {'resultados': resultados, 'candidatos': candidatos, 'pareto': pareto}
+
+if __name__ == "__main__":
+    # Optimización utilizando el algoritmo de evolución diferencial con los parámetros base
+    resultado_fijo = optimizar_escenario(PARAMETROS_BASE, semilla=42)
+
+    # Extraer resultados de la optimización
+    variables_optimas_fijas = resultado_fijo['x'] # Valores óptimos de markup y tasa_camaronero
+    diferencia_tasas_minimizada = resultado_fijo['objetivo'] # Valor mínimo de la diferencia de tasas alcanzado
+    metricas_optimas_fijas = resultado_fijo['metricas'] # Métricas financieras con parámetros óptimos
+
+    # Imprimir resultados de la optimización
+    print(f"""
 Parámetros Óptimos para Minimizar la Diferencia de Tasas (con Descuento de Factoring y Principal del Camaronero Fijos) para cumplir con los Objetivos:
 - Markup: {variables_optimas_fijas[0]:.2f}%
 - Tasa de Interés al Camaronero (Anual): {variables_optimas_fijas[1]:.2f}%
-- Descuento de Factoring (Fijo): 10.00%
-- Principal del Camaronero (Fijo): 25.00%
+- Descuento de Factoring (Fijo): {PARAMETROS_BASE['descuento_factoring']:.2%}
+- Principal del Camaronero (Fijo): {PARAMETROS_BASE['porcentaje_principal']:.2%}
 
 Diferencia de Tasas Minimizada: {diferencia_tasas_minimizada:.4f}
 
@@ -194,47 +520,47 @@ Rangos Objetivo de las Métricas:
 - Payback Time: <= 6 años
 """)
 
-# --- Cálculo del Modelo de Flujo de Caja Descontado (DCF) ---
+    # --- Cálculo del Modelo de Flujo de Caja Descontado (DCF) ---
 
-# Parámetros asumidos para el DCF
-TASA_CRECIMIENTO_PERPETUIDAD = 0.02 # Tasa de crecimiento a perpetuidad
-TASA_LIBRE_DE_RIESGO = 0.015 # Tasa libre de riesgo
-RETORNO_MERCADO = 0.08 # Retorno esperado del mercado
-BETA_APALANCADO = 1.2 # Beta apalancado
+    # Parámetros asumidos para el DCF
+    TASA_CRECIMIENTO_PERPETUIDAD = 0.02 # Tasa de crecimiento a perpetuidad
+    TASA_LIBRE_DE_RIESGO = 0.015 # Tasa libre de riesgo
+    RETORNO_MERCADO = 0.08 # Retorno esperado del mercado
+    BETA_APALANCADO = 1.2 # Beta apalancado
 
-# Extraer valores relevantes de las métricas óptimas
-utilidad_despues_de_impuestos_anio1 = metricas_optimas_fijas['utilidad_despues_de_impuestos'] # Utilidad después de impuestos del primer año (proxy para FCF)
-capital_propio_optimizado = metricas_optimas_fijas['capital_propio'] # Capital propio óptimo
-monto_financiado_optimizado = metricas_optimas_fijas['monto_financiado'] # Monto financiado óptimo
-tasa_suiza_anual_optima = metricas_optimas_fijas['tasa_suiza_anual'] # Tasa suiza óptima
-TASA_IMPUESTOS_DEF = 0.146 # Tasa de impuestos
+    # Extraer valores relevantes de las métricas óptimas
+    utilidad_despues_de_impuestos_anio1 = metricas_optimas_fijas['utilidad_despues_de_impuestos'] # Utilidad después de impuestos del primer año (proxy para FCF)
+    capital_propio_optimizado = metricas_optimas_fijas['capital_propio'] # Capital propio óptimo
+    monto_financiado_optimizado = metricas_optimas_fijas['monto_financiado'] # Monto financiado óptimo
+    tasa_suiza_anual_optima = metricas_optimas_fijas['tasa_suiza_anual'] # Tasa suiza óptima
+    TASA_IMPUESTOS_DEF = PARAMETROS_BASE['tasa_impuestos'] # Tasa de impuestos
 
-# Calcular el Costo del Capital Propio (Ke) utilizando CAPM
-costo_capital_propio = TASA_LIBRE_DE_RIESGO + BETA_APALANCADO * (RETORNO_MERCADO - TASA_LIBRE_DE_RIESGO)
+    # Calcular el Costo del Capital Propio (Ke) utilizando CAPM
+    costo_capital_propio = TASA_LIBRE_DE_RIESGO + BETA_APALANCADO * (RETORNO_MERCADO - TASA_LIBRE_DE_RIESGO)
 
-# Calcular el Costo de la Deuda (Kd) después de impuestos
-costo_deuda_antes_de_impuestos = tasa_suiza_anual_optima # Costo de la deuda antes de impuestos es la tasa suiza
-costo_deuda_despues_de_impuestos = costo_deuda_antes_de_impuestos * (1 - TASA_IMPUESTOS_DEF) # Costo de la deuda después de impuestos
+    # Calcular el Costo de la Deuda (Kd) después de impuestos
+    costo_deuda_antes_de_impuestos = tasa_suiza_anual_optima # Costo de la deuda antes de impuestos es la tasa suiza
+    costo_deuda_despues_de_impuestos = costo_deuda_antes_de_impuestos * (1 - TASA_IMPUESTOS_DEF) # Costo de la deuda después de impuestos
 
-# Calcular las Ponderaciones de la Estructura de Capital
-capital_total = capital_propio_optimizado + monto_financiado_optimizado # Capital total
-ponderacion_capital_propio = capital_propio_optimizado / capital_total if capital_total != 0 else 0 # Ponderación del capital propio
-ponderacion_deuda = monto_financiado_optimizado / capital_total if capital_total != 0 else 0 # Ponderación de la deuda
+    # Calcular las Ponderaciones de la Estructura de Capital
+    capital_total = capital_propio_optimizado + monto_financiado_optimizado # Capital total
+    ponderacion_capital_propio = capital_propio_optimizado / capital_total if capital_total != 0 else 0 # Ponderación del capital propio
+    ponderacion_deuda = monto_financiado_optimizado / capital_total if capital_total != 0 else 0 # Ponderación de la deuda
 
-# Calcular el WACC (Costo Promedio Ponderado de Capital)
-WACC = (ponderacion_capital_propio * costo_capital_propio) + (ponderacion_deuda * costo_deuda_despues_de_impuestos)
+    # Calcular el WACC (Costo Promedio Ponderado de Capital)
+    WACC = (ponderacion_capital_propio * costo_capital_propio) + (ponderacion_deuda * costo_deuda_despues_de_impuestos)
 
-# Calcular el Valor de la Empresa (Enterprise Value - EV) utilizando el modelo de crecimiento perpetuo
-if WACC <= TASA_CRECIMIENTO_PERPETUIDAD:
-    valor_empresa = np.inf # Evitar división por cero o denominador negativo
-else:
-    valor_empresa = utilidad_despues_de_impuestos_anio1 * (1 + TASA_CRECIMIENTO_PERPETUIDAD) / (WACC - TASA_CRECIMIENTO_PERPETUIDAD)
+    # Calcular el Valor de la Empresa (Enterprise Value - EV) utilizando el modelo de crecimiento perpetuo
+    if WACC <= TASA_CRECIMIENTO_PERPETUIDAD:
+        valor_empresa = np.inf # Evitar división por cero o denominador negativo
+    else:
+        valor_empresa = utilidad_despues_de_impuestos_anio1 * (1 + TASA_CRECIMIENTO_PERPETUIDAD) / (WACC - TASA_CRECIMIENTO_PERPETUIDAD)
 
-# Calcular el Valor del Capital Propio (Equity Value)
-valor_capital_propio = valor_empresa - monto_financiado_optimizado
+    # Calcular el Valor del Capital Propio (Equity Value)
+    valor_capital_propio = valor_empresa - monto_financiado_optimizado
 
-# Imprimir resultados del modelo DCF
-print(f"""
+    # Imprimir resultados del modelo DCF
+    print(f"""
 
 --- Modelo de Flujo de Caja Descontado (DCF) ---
 
@@ -256,3 +582,11 @@ Valoración:
 - Valor de la Empresa (EV): ${valor_empresa:,.2f}
 - Valor del Capital Propio: ${valor_capital_propio:,.2f}
 """)
+
+    # Lote de escenarios de plazos de crédito: frente de Pareto ROI/ROE/TIR sobre todas las corridas
+    escenarios = [crear_parametros(descuento_factoring=d, porcentaje_principal=p, periodo_pago_camaronero_meses=m)
+                  for d in (0.08, 0.10, 0.12) for p in (0.20, 0.25, 0.30) for m in (48, 60, 72)]
+    lote = optimizar_lote(escenarios, n_semillas=4)
+    print(f"Frente de Pareto ROI/ROE/TIR ({len(lote['pareto'])} de {len(lote['candidatos'])} candidatos):")
+    print(lote['pareto'][['descuento_factoring', 'porcentaje_principal', 'periodo_pago_camaronero_meses',
+                          'markup', 'tasa_camaronero', 'roi', 'roe', 'irr']].to_string(index=False))
@@ -0,0 +1,171 @@
+import os
+import numpy as np
+import pandas as pd
+from scripts.financial.inflation_proxier import COUNTRY_ALIASES
+
+# Define file paths based on user's provided paths
+base_dir = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/indicators/forex/"
+spot_exchange_rates_file = os.path.join(base_dir, "all_spot_exchange_rates.csv")
+currency_tickers_file = os.path.join(base_dir, "currency_tickers.csv")
+forward_proxy_file = os.path.join(base_dir, "forward_proxy.csv")
+fx_history_file = os.path.join(base_dir, "fx_history.parquet")
+# Snapshots holding today's spots: the major currencies are only in the forward proxy
+SNAPSHOT_FILES = [spot_exchange_rates_file, forward_proxy_file]
+
+# Index keys pack (pair code, day number) into one int64: day numbers are shifted to be non-negative
+DAY_OFFSET = 1 << 20
+DAY_SPAN = 1 << 22
+
+class FxRateStore:
+    """
+    Time series of USD spot rates ('usd_xxx' pairs, units of xxx per USD) with vectorized as-of lookups.
+
+    Rates are kept sorted by (currency pair, date) and indexed by one int64 key per row packing the
+    pair code and the day, so looking up any number of (pair, date) queries is a single
+    np.searchsorted over the index: each query gets the latest rate on or before its date.
+    """
+    def __init__(self, path=fx_history_file):
+        self.path = path
+        self.rates = pd.DataFrame({"date": pd.Series([], dtype="datetime64[us]"),
+                                   "currency_pair": pd.Series([], dtype=object),
+                                   "spot_price": pd.Series([], dtype=np.float64)})
+        if path and os.path.exists(path):
+            self.rates = pd.read_parquet(path)
+        self._build_index()
+
+    @staticmethod
+    def _days(dates):
+        return pd.to_datetime(dates).to_numpy(dtype="datetime64[D]").astype(np.int64) + DAY_OFFSET
+
+    def _build_index(self):
+        """Sort the rates and build the pair and key arrays the lookups search"""
+        rates = self.rates.copy()
+        rates["date"] = pd.to_datetime(rates["date"]).dt.normalize()
+        rates["currency_pair"] = rates["currency_pair"].astype(str).str.strip().str.lower()
+        rates["spot_price"] = pd.to_numeric(rates["spot_price"], errors="coerce")
+        rates = rates.dropna(subset=["date", "spot_price"])
+        # One rate per pair and day: the last one added wins
+        rates = rates.drop_duplicates(["currency_pair", "date"], keep="last")
+        self.rates = rates.sort_values(["currency_pair", "date"], kind="stable").reset_index(drop=True)
+        self.pairs = pd.Index(self.rates["currency_pair"].unique())
+        codes = self.pairs.get_indexer(self.rates["currency_pair"])
+        self._keys = codes.astype(np.int64) * DAY_SPAN + self._days(self.rates["date"])
+        self._prices = self.rates["spot_price"].to_numpy(dtype=np.float64)
+        self._dates = self.rates["date"].to_numpy()
+
+    def add_rates(self, rates):
+        """
+        Add rates to the series (rows replace stored ones of the same pair and date).
+
+        :param rates: DataFrame with date, currency_pair and spot_price.
+        :return: Number of rates stored.
+        """
+        self.rates = pd.concat([self.rates, rates[["date", "currency_pair", "spot_price"]]], ignore_index=True)
+        self._build_index()
+        return len(self.rates)
+
+    def add_snapshot(self, snapshot_paths=None, as_of=None):
+        """
+        Record spot snapshots (CSVs with currency_pair and spot_price) as the rates of one day.
+
+        :param snapshot_paths: CSV paths; defaults to SNAPSHOT_FILES. A pair in several files takes the first file's spot.
+        :param as_of: Date of the snapshot; defaults to the first file's modification date.
+        """
+        snapshot_paths = snapshot_paths or SNAPSHOT_FILES
+        try:
+            spots = pd.concat([pd.read_csv(path, usecols=["currency_pair", "spot_price"]) for path in snapshot_paths])
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"Error: spot exchange rates file not found. {e}")
+        if as_of is None:
+            as_of = pd.Timestamp(os.path.getmtime(snapshot_paths[0]), unit="s")
+        spots = spots.drop_duplicates("currency_pair", keep="first")
+        spots["date"] = pd.Timestamp(as_of).normalize()
+        return self.add_rates(spots)
+
+    def save(self):
+        """Write the series via a temp file, so readers never see a partial table"""
+        temp_path = self.path + ".tmp"
+        try:
+            self.rates.to_parquet(temp_path, index=False)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def rates_as_of(self, currency_pairs, dates, tolerance=None):
+        """
+        Latest spot rate on or before each date, for every (pair, date) in one pass.
+
+        :param currency_pairs: Sequence of pairs 'usd_xxx' (or one pair for all dates).
+        :param dates: Sequence of dates (or one date for all pairs).
+        :param tolerance: Oldest usable rate as a pd.Timedelta (or days); older rates give NaN.
+        :return: DataFrame with spot_price and rate_date per query, in query order. 'usd_usd' is 1.0;
+                 unknown pairs and dates before a pair's first rate give NaN.
+        """
+        pairs = pd.Series(np.asarray(currency_pairs, dtype=object)).astype(str).str.strip().str.lower()
+        dates = pd.Series(pd.to_datetime(dates))
+        if len(pairs) == 1 and len(dates) > 1:
+            pairs = pd.Series(np.repeat(pairs.to_numpy(), len(dates)))
+        elif len(dates) == 1 and len(pairs) > 1:
+            dates = pd.Series(np.repeat(dates.to_numpy(), len(pairs)))
+        # Pair codes through the distinct pairs, so millions of rows cost one hash lookup per pair
+        pair_codes, unique_pairs = pd.factorize(pairs)
+        codes = self.pairs.get_indexer(unique_pairs)[pair_codes] if len(unique_pairs) else pair_codes
+        days = self._days(dates.fillna(pd.Timestamp(0)))
+        positions = np.searchsorted(self._keys, codes.astype(np.int64) * DAY_SPAN + days, side="right") - 1
+        found = (codes >= 0) & (positions >= 0) & dates.notna().to_numpy()
+        found[found] = self._keys[positions[found]] // DAY_SPAN == codes[found] # Same pair, not the previous one
+        prices = np.full(len(pairs), np.nan)
+        prices[found] = self._prices[positions[found]]
+        rate_dates = np.full(len(pairs), np.datetime64("NaT"), dtype="datetime64[us]")
+        rate_dates[found] = self._dates[positions[found]]
+        if tolerance is not None:
+            tolerance = tolerance if isinstance(tolerance, pd.Timedelta) else pd.Timedelta(days=tolerance)
+            stale = found & ((dates.to_numpy(dtype="datetime64[us]") - rate_dates) > tolerance.to_timedelta64())
+            prices[stale] = np.nan
+            rate_dates[stale] = np.datetime64("NaT")
+        usd = (pairs == "usd_usd").to_numpy() & dates.notna().to_numpy()
+        prices[usd] = 1.0
+        rate_dates[usd] = dates[usd].dt.normalize().to_numpy(dtype="datetime64[us]")
+        return pd.DataFrame({"spot_price": prices, "rate_date": rate_dates})
+
+    def convert(self, frame, value_columns, date_column="fecha", country_column="pais_de_origen",
+                currency_column=None, currency_tickers_path=currency_tickers_file, tolerance=None):
+        """
+        Convert USD values of a whole table to local currency at the rate as of each row's date.
+
+        :param frame: Table with a date column and USD value columns (e.g. the customs imports).
+        :param value_columns: USD columns to convert, e.g. ["us$_fob", "us$_cif"].
+        :param country_column: Country of each row, mapped to its currency with the tickers CSV
+                               (ignored when currency_column is given).
+        :param currency_column: Column with ISO currency codes, if the table has one.
+        :return: Copy of frame with currency, fx_rate, fx_date and '<column>_local' per value column.
+        """
+        if currency_column is not None:
+            currencies = frame[currency_column].astype(object).str.strip().str.lower()
+        else:
+            tickers = pd.read_csv(currency_tickers_path)
+            countries = tickers["country"].astype(str).str.strip().str.lower().str.replace(r"[^a-z0-9]+", "_", regex=True)
+            countries = countries.replace(COUNTRY_ALIASES)
+            currency_of = dict(zip(countries[::-1], tickers["ticker"].astype(str).str.strip().str.lower()[::-1]))
+            keys = frame[country_column].astype(object).str.strip().str.lower().str.replace(r"[^a-z0-9]+", "_", regex=True)
+            currencies = keys.replace(COUNTRY_ALIASES).map(currency_of)
+        pairs = ("usd_" + currencies.fillna("")).to_numpy(dtype=object)
+        rates = self.rates_as_of(pairs, frame[date_column], tolerance)
+        result = frame.copy()
+        result["currency"] = currencies.astype("category").to_numpy()
+        result["fx_rate"] = rates["spot_price"].to_numpy()
+        result["fx_date"] = rates["rate_date"].to_numpy()
+        for column in value_columns:
+            result[f"{column}_local"] = result[column].to_numpy(dtype=np.float64) * result["fx_rate"].to_numpy()
+        return result
+
+if __name__ == "__main__":
+    from scripts.data_handling.customs_ingestion import CustomsImportStore
+    store = FxRateStore()
+    store.add_snapshot()
+    store.save()
+    imports = CustomsImportStore().load(columns=["fecha", "pais_de_origen", "us$_fob", "us$_cif"])
+    converted = store.convert(imports, ["us$_fob", "us$_cif"])
+    print(converted.groupby("currency", observed=True)[["us$_fob", "us$_fob_local"]].sum())
+    print(f"{converted['fx_rate'].isna().mean():.1%} of rows have no rate as of their date.")
@@ -2,30 +2,34 @@ import pandas as pd
 import os
 import numpy as np
 
-# US inflation rate (constant, as defined previously)
+# US inflation rate for proxy tables without a us_inflation_rate column (older inflation_proxy files)
 us_inflation_rate = 3.0
 
 class HedgingCostCalculator:
-    def __init__(self, inflation_proxy_path, forward_proxy_path, verbose=True): # Add verbose parameter, default True
+    def __init__(self, inflation_proxy_path, forward_proxy_path, verbose=True, fx_store=None): # Add verbose parameter, default True
         """
         Initialize the HedgingCostCalculator with paths to spot, forward proxy, and inflation proxy CSV files.
+        An FxRateStore (fx_store) enables spot rates as of past dates.
         """
         self.inflation_proxy_path = inflation_proxy_path
         self.forward_proxy_path = forward_proxy_path
         self.forward_proxy_data = None
         self.inflation_proxy_data = None
+        self.forward_index = None
+        self.inflation_index = None
         self.verbose = verbose # Store verbose setting
+        self.fx_store = fx_store
 
         # Load data on initialization
         self._load_data()
 
     def _load_data(self):
         """
-        Load spot, forward proxy, and inflation proxy data from the provided CSV files.
+        Load spot, forward proxy, and inflation proxy data from the provided CSV or Parquet files.
         """
         try:
-            self.forward_proxy_data = pd.read_csv(self.forward_proxy_path)
-            self.inflation_proxy_data = pd.read_csv(self.inflation_proxy_path)
+            self.forward_proxy_data = self._read_table(self.forward_proxy_path)
+            self.inflation_proxy_data = self._read_table(self.inflation_proxy_path)
             # Print first few rows to inspect data loading - Inflation Proxy, Conditionally
             if self.verbose: # Only print if verbose is True
                 print("Inflation Proxy Data sample:")
@@ -36,6 +40,38 @@ class HedgingCostCalculator:
                 print(self.forward_proxy_data.head())
         except Exception as e:
             raise Exception(f"Error loading data: {e}")
+        self._build_index()
+
+    @staticmethod
+    def _read_table(path):
+        """
+        Read a proxy table from CSV or Parquet (as written by inflation_proxier), chosen by extension.
+        """
+        if str(path).endswith(".parquet"):
+            return pd.read_parquet(path)
+        return pd.read_csv(path)
+
+    def _build_index(self):
+        """
+        Index both proxy tables by currency pair once, so lookups do not scan the DataFrames.
+        Only the first row of a duplicated pair is kept, matching the .iloc[0] lookups.
+        """
+        forward = self.forward_proxy_data.drop_duplicates('currency_pair', keep='first')
+        inflation = self.inflation_proxy_data.drop_duplicates('currency_pair', keep='first')
+        self.forward_index = pd.Index(forward['currency_pair'])
+        self.forward_spot = forward['spot_price'].to_numpy(dtype=np.float64)
+        self.forward_price = forward['future_price'].to_numpy(dtype=np.float64)
+        self.inflation_index = pd.Index(inflation['currency_pair'])
+        self.inflation_spot = inflation['spot_price'].to_numpy(dtype=np.float64)
+        self.inflation_differential = inflation['inflation_differential'].to_numpy(dtype=np.float64)
+        # Each differential was taken against its own source's US rate (see inflation_proxier)
+        if 'us_inflation_rate' in inflation.columns:
+            self.us_inflation = inflation['us_inflation_rate'].to_numpy(dtype=np.float64)
+        else:
+            self.us_inflation = np.full(len(inflation), us_inflation_rate)
+        # Scalar lookups go through plain dicts: pair -> position in the arrays above
+        self._forward_positions = {pair: i for i, pair in enumerate(self.forward_index)}
+        self._inflation_positions = {pair: i for i, pair in enumerate(self.inflation_index)}
 
     def compute_hedging_cost(self, currency_pair, time_horizon):
         """
@@ -46,51 +82,120 @@ class HedgingCostCalculator:
         :param time_horizon: The time horizon in years (e.g., 1 for 1 year).
         :return: The hedging cost as a float.
         """
-        if self.inflation_proxy_data is None or self.forward_proxy_data is None or self.inflation_proxy_data is None:
+        if self.forward_index is None or self.inflation_index is None:
             raise Exception("Data not loaded. Please check the CSV file paths.")
 
         if currency_pair == "usd_usd":
             return 0.0  # Hedging cost for USD/USD is 0
 
-        # Find the spot rate for the given currency pair from inflation proxy as spot data is there for all currencies
-        spot_rate_series = self.inflation_proxy_data.loc[self.inflation_proxy_data['currency_pair'] == currency_pair, 'spot_price']
-
-        if not spot_rate_series.empty:
-            spot_rate = spot_rate_series.iloc[0] # Get the first value if series is not empty
-        else:
-            spot_rate = None # Spot rate not found
+        # Try to find forward proxy rate
+        forward_position = self._forward_positions.get(currency_pair)
+        if forward_position is not None:
+            # Forward proxy data is available, compute hedging cost using forward proxy
+            forward_rate = self.forward_price[forward_position]
+            spot_rate_hedge = self.forward_spot[forward_position] # Use spot price from hedge file, not inflation proxy
+            return (forward_rate / spot_rate_hedge) ** (1 / time_horizon) - 1 # Corrected formula: forward_rate / spot_rate
+
+        # Forward proxy data is not available, use inflation proxy (LOG DIFFERENTIAL)
+        inflation_position = self._inflation_positions.get(currency_pair)
+        if inflation_position is not None:
+            inflation_differential = self.inflation_differential[inflation_position]
+            us_inflation = self.us_inflation[inflation_position]
+            foreign_inflation_rate = inflation_differential + us_inflation # Calculate foreign inflation
+            return np.log1p(foreign_inflation_rate / 100.0) - np.log1p(us_inflation / 100.0) # Log differential
+        raise ValueError(f"No hedging data (forward proxy or inflation proxy) found for currency pair: {currency_pair}")
+
+    def get_exchange_rates(self, currency_pair, as_of=None):
+        """
+        Spot and forward rates for a currency pair from the indexed proxy tables.
 
+        :param currency_pair: The currency pair in the format 'usd_xxx'.
+        :param as_of: Date of the spot rate, looked up in the FX store (requires fx_store); the
+                      forward stays the proxy's.
+        :return: (spot, forward); forward-proxy prices when available, otherwise the inflation-proxy
+                 spot and a NaN forward. Both are NaN for pairs without data.
+        """
+        if currency_pair == "usd_usd":
+            return 1.0, 1.0
+        if as_of is not None:
+            spot = float(self.get_spot_rates([currency_pair], as_of)[0])
+            forward_position = self._forward_positions.get(currency_pair)
+            return spot, float(self.forward_price[forward_position]) if forward_position is not None else float("nan")
+        forward_position = self._forward_positions.get(currency_pair)
+        if forward_position is not None:
+            return float(self.forward_spot[forward_position]), float(self.forward_price[forward_position])
+        inflation_position = self._inflation_positions.get(currency_pair)
+        if inflation_position is not None:
+            return float(self.inflation_spot[inflation_position]), float("nan")
+        return float("nan"), float("nan")
+
+    def get_spot_rates(self, currency_pairs, as_of=None):
+        """
+        Vectorized spot rates for many currency pairs.
 
-        # Try to find forward proxy rate
-        forward_rate_series = self.forward_proxy_data.loc[self.forward_proxy_data['currency_pair'] == currency_pair, 'future_price']
-        spot_hedge_series = self.forward_proxy_data.loc[self.forward_proxy_data['currency_pair'] == currency_pair, 'spot_price']
+        :param currency_pairs: Sequence of currency pairs in the format 'usd_xxx'.
+        :param as_of: Date (or one date per pair) of the rates, looked up as-of in the FX store;
+                      None for the proxy tables' current spots (forward proxy first, like get_exchange_rates).
+        :return: Array of spot rates, NaN for pairs without data.
+        """
+        currency_pairs = pd.Index(currency_pairs, dtype=object)
+        if as_of is not None:
+            if self.fx_store is None:
+                raise ValueError("Spot rates as of a date need an FX store (fx_store).")
+            return self.fx_store.rates_as_of(currency_pairs, np.atleast_1d(pd.to_datetime(as_of)))["spot_price"].to_numpy()
+        forward_positions = self.forward_index.get_indexer(currency_pairs)
+        inflation_positions = self.inflation_index.get_indexer(currency_pairs)
+        spots = np.where(inflation_positions >= 0, self.inflation_spot[inflation_positions], np.nan)
+        spots = np.where(forward_positions >= 0, self.forward_spot[forward_positions], spots)
+        spots[np.asarray(currency_pairs == "usd_usd")] = 1.0
+        return spots
+
+    def compute_hedging_costs(self, currency_pairs, time_horizons):
+        """
+        Vectorized compute_hedging_cost over many currency pairs in one pass.
 
-        if not forward_rate_series.empty:
-            # Forward proxy data is available, compute hedging cost using forward proxy
-            forward_rate = forward_rate_series.iloc[0]
-            spot_rate_hedge = spot_hedge_series.iloc[0] # Use spot price from hedge file, not inflation proxy
-            if spot_rate_hedge is not None:
-                hedging_cost_forward_proxy = (forward_rate / spot_rate_hedge) ** (1 / time_horizon) - 1 # Corrected formula: forward_rate / spot_rate
-                return hedging_cost_forward_proxy
-            else:
-                raise ValueError(f"Spot data needed but not found in forward proxy file for currency pair: {currency_pair} to compute forward proxy based cost.")
+        :param currency_pairs: Sequence of currency pairs in the format 'usd_xxx'.
+        :param time_horizons: Time horizon(s) in years, a scalar or one per pair.
+        :return: DataFrame with columns currency_pair, time_horizon, hedging_cost and hedging_source
+                 ('forward_proxy', 'inflation_proxy', 'usd_usd' or None). Pairs without data get a
+                 NaN cost and a None source instead of raising.
+        """
+        if self.forward_index is None or self.inflation_index is None:
+            raise Exception("Data not loaded. Please check the CSV file paths.")
 
-        else:
-            # Forward proxy data is not available, use inflation proxy (LOG DIFFERENTIAL)
-            inflation_differential_series = self.inflation_proxy_data.loc[self.inflation_proxy_data['currency_pair'] == currency_pair, 'inflation_differential']
-            if not inflation_differential_series.empty:
-                inflation_differential = inflation_differential_series.iloc[0]
-                foreign_inflation_rate = inflation_differential + us_inflation_rate # Calculate foreign inflation
-                hedging_cost_inflation_proxy = np.log1p(foreign_inflation_rate / 100.0) - np.log1p(us_inflation_rate / 100.0) # Log differential
-                return hedging_cost_inflation_proxy
-            else:
-                raise ValueError(f"No hedging data (forward proxy or inflation proxy) found for currency pair: {currency_pair}")
+        currency_pairs = pd.Index(currency_pairs, dtype=object)
+        time_horizons = np.broadcast_to(np.asarray(time_horizons, dtype=np.float64), (len(currency_pairs),))
+        forward_positions = self.forward_index.get_indexer(currency_pairs)
+        inflation_positions = self.inflation_index.get_indexer(currency_pairs)
+        is_usd = np.asarray(currency_pairs == "usd_usd")
+        has_forward = (forward_positions >= 0) & ~is_usd
+        has_inflation = (inflation_positions >= 0) & ~has_forward & ~is_usd
+
+        costs = np.full(len(currency_pairs), np.nan)
+        costs[is_usd] = 0.0
+        forward = forward_positions[has_forward]
+        # float_power keeps results bit-identical to the scalar ** in compute_hedging_cost
+        costs[has_forward] = np.float_power(self.forward_price[forward] / self.forward_spot[forward], 1 / time_horizons[has_forward]) - 1
+        inflation = inflation_positions[has_inflation]
+        foreign_inflation_rate = self.inflation_differential[inflation] + self.us_inflation[inflation]
+        costs[has_inflation] = np.log1p(foreign_inflation_rate / 100.0) - np.log1p(self.us_inflation[inflation] / 100.0)
+
+        sources = np.full(len(currency_pairs), None, dtype=object)
+        sources[is_usd] = "usd_usd"
+        sources[has_forward] = "forward_proxy"
+        sources[has_inflation] = "inflation_proxy"
+        return pd.DataFrame({
+            "currency_pair": np.asarray(currency_pairs, dtype=object),
+            "time_horizon": time_horizons,
+            "hedging_cost": costs,
+            "hedging_source": pd.Series(sources, dtype=object),
+        })
 
 # Example usage (for testing)
 if __name__ == "__main__":
     # Paths to the CSV files
     forward_proxy_path = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/indicators/financial/forex/forward_proxy.csv" # Renamed to forward_proxy_path
-    inflation_proxy_path = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/indicators/financial/forex/inflation_proxy.csv" # Path to the inflation proxy file
+    inflation_proxy_path = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/indicators/financial/forex/inflation_proxy.parquet" # Path to the inflation proxy file
 
     # Initialize the calculator
     calculator = HedgingCostCalculator(inflation_proxy_path, forward_proxy_path) # verbose defaults to True
@@ -139,4 +244,8 @@ if __name__ == "__main__":
         hedging_cost_no_data
         print(f"Hedging cost for {currency_pair_no_data} over {time_horizon_no_data} year(s): {hedging_cost_no_data:.6f}")
     except Exception as e:
-        print(f"Error for {currency_pair_no_data}: {e}")
\ No newline at end of file
+        print(f"Error for {currency_pair_no_data}: {e}")
+
+    # Example 6: All pairs in one vectorized call (missing pairs get NaN instead of raising)
+    pairs = ["usd_jpy", "usd_syp", "usd_chf", "usd_usd", "usd_xxx"]
+    print(calculator.compute_hedging_costs(pairs, [1, 1, 6, 1, 1]))
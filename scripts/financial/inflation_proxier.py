@@ -1,68 +1,204 @@
 import pandas as pd
+import numpy as np
 import os
 
 # Define file paths based on user's provided paths
-base_dir = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/indicators/financial/forex/"
+base_dir = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/indicators/forex/"
+indicators_dir = "/home/luisvinatea/Dev/Repos/Aquaculture/data/datasets/financial/indicators/"
 spot_exchange_rates_file = os.path.join(base_dir, "all_spot_exchange_rates.csv")
 currency_tickers_file = os.path.join(base_dir, "currency_tickers.csv")
 inflation_rates_file = os.path.join(base_dir, "inflation_rates.csv")
-output_file = os.path.join(base_dir, "inflation_proxy.csv")
+output_file = os.path.join(base_dir, "inflation_proxy.parquet") # Read by HedgingCostCalculator and the arbitrage scripts
 
-# US inflation rate
-us_inflation_rate = 3.0
+# Inflation series the proxy can be built from: name -> (path, rate column)
+INFLATION_SOURCES = {
+    "headline": (inflation_rates_file, "inflation_rate"),
+    "core": (os.path.join(indicators_dir, "monetary/inflation/core_inflation_rate_countries.csv"), "last"),
+    "harmonised": (os.path.join(indicators_dir, "monetary/inflation/harmonised_inflation_rate_yoy_countries.csv"), "last"),
+}
 
-def compute_inflation_differentials(spot_exchange_rates_path, currency_tickers_path, inflation_rates_path, output_path, us_inflation):
+# The datasets spell some countries differently; map them to one key before joining
+COUNTRY_ALIASES = {
+    "usa": "united_states",
+    "united_states_of_america": "united_states",
+    "eurozone": "euro_area",
+}
+US_COUNTRY = "united_states"
+# Currencies shared by several countries use the currency area's rate when a source has one
+CURRENCY_AREAS = {"eur": "euro_area"}
+
+def _country_key(names):
+    keys = names.astype(str).str.strip().str.lower().str.replace(r"[^a-z0-9]+", "_", regex=True)
+    return keys.replace(COUNTRY_ALIASES)
+
+def load_inflation_rates(sources=None):
     """
-    Computes the inflation rate differential for countries in the spot exchange rates dataset.
+    Stack the inflation sources into one long table.
 
     Args:
-        spot_exchange_rates_path (str): Path to the CSV file with spot exchange rates.
-        currency_tickers_path (str): Path to the CSV file with currency tickers.
-        inflation_rates_path (str): Path to the CSV file with inflation rates.
-        output_path (str): Path to save the output CSV file.
-        us_inflation (float): US inflation rate.
+        sources (dict, optional): name -> (path, rate column); defaults to INFLATION_SOURCES.
+
+    Returns:
+        pd.DataFrame: Columns country (normalized key), source and inflation_rate. Missing files are skipped.
     """
+    frames = []
+    for name, (path, column) in (sources or INFLATION_SOURCES).items():
+        try:
+            df = pd.read_csv(path, usecols=["country", column])
+        except FileNotFoundError:
+            print(f"Inflation source '{name}' not found at {path}, skipping it.")
+            continue
+        frames.append(pd.DataFrame({
+            "country": _country_key(df["country"]),
+            "source": name,
+            "inflation_rate": pd.to_numeric(df[column], errors="coerce"),
+        }))
+    if not frames:
+        raise FileNotFoundError("Error: none of the inflation sources could be loaded.")
+    rates = pd.concat(frames, ignore_index=True).dropna(subset=["inflation_rate"])
+    # A country listed twice in one source keeps its first row
+    return rates.drop_duplicates(["source", "country"], keep="first")
+
+def build_inflation_proxy(spot_exchange_rates_path, currency_tickers_path, sources=None, order=None,
+                          fallback=False, us_inflation=None):
+    """
+    Inflation differential proxy for every currency pair in the spot rates, for all sources in one pass.
+
+    Each pair 'usd_xxx' is mapped to the countries using currency xxx; the country's rate is the
+    currency area's (CURRENCY_AREAS) when the source has it, else the first listed country with a rate.
+    The US rate is the source's own United States row, so each differential compares like with like.
+    A source without one borrows the US rate of the first other source that has it (sources in `order`
+    first), and us_source records whose US rate each row used.
+
+    Args:
+        spot_exchange_rates_path (str): CSV with currency_pair and spot_price.
+        currency_tickers_path (str): CSV with country and ticker.
+        sources (dict, optional): name -> (path, rate column); defaults to INFLATION_SOURCES.
+        order (list, optional): Source names in order of preference for inflation_differential;
+                                defaults to the order of `sources`.
+        fallback (bool): Fill pairs the preferred source lacks from the next sources in `order`.
+        us_inflation (float, optional): Override the US rate of every source.
+
+    Returns:
+        pd.DataFrame: One row per currency pair with spot_price, inflation_differential, source and
+                      country (of the differential used), us_inflation_rate and us_source (the US rate
+                      it was taken against), and differential_<source> for every source.
 
-    # Load the datasets
+    Raises:
+        ValueError: If no source has a United States rate (and us_inflation is not given).
+    """
+    sources = sources or INFLATION_SOURCES
+    order = list(order or sources)
     try:
         spot_rates_df = pd.read_csv(spot_exchange_rates_path)
         currency_tickers_df = pd.read_csv(currency_tickers_path)
-        inflation_df = pd.read_csv(inflation_rates_path)
     except FileNotFoundError as e:
         raise FileNotFoundError(f"Error: One or more input files not found. {e}")
+    # The other sources are loaded too, as they may supply the US rate of a source that lacks one
+    rates = load_inflation_rates({name: sources[name] for name in order + [name for name in sources if name not in order]})
+
+    spot_rates_df = spot_rates_df.drop_duplicates("currency_pair", keep="first")
+    pairs = pd.DataFrame({
+        "currency_pair": spot_rates_df["currency_pair"].astype(str).to_numpy(),
+        "spot_price": pd.to_numeric(spot_rates_df["spot_price"], errors="coerce").to_numpy(dtype=np.float64),
+    })
+    pairs["currency_ticker"] = pairs["currency_pair"].str.split("_").str[1]
+
+    tickers = pd.DataFrame({
+        "currency_ticker": currency_tickers_df["ticker"].astype(str).str.strip().str.lower(),
+        "country": _country_key(currency_tickers_df["country"]),
+    })
+    tickers["priority"] = np.arange(len(tickers)) # Listing order
+    areas = tickers["country"] == tickers["currency_ticker"].map(CURRENCY_AREAS)
+    tickers.loc[areas, "priority"] = -1 # Currency area first
 
-    # 1. Extract currency tickers from 'currency_pair' column in spot_rates_df
-    spot_rates_df['currency_ticker'] = spot_rates_df['currency_pair'].str.split('_').str[1]
+    # Every (ticker, country, source) with a rate; keep the best-priority country per (ticker, source)
+    candidates = tickers.merge(rates[rates["source"].isin(order)], on="country", how="inner")
+    candidates = candidates.sort_values("priority", kind="stable").drop_duplicates(["currency_ticker", "source"])
 
-    # 2. Merge spot_rates_df with currency_tickers_df to get country names
-    merged_df = pd.merge(spot_rates_df, currency_tickers_df, on='currency_ticker', how='left')
+    own_us_rates = rates[rates["country"] == US_COUNTRY].set_index("source")["inflation_rate"]
+    if us_inflation is not None:
+        us_rates = pd.Series(float(us_inflation), index=order)
+        us_sources = pd.Series("override", index=order)
+    else:
+        if own_us_rates.empty:
+            raise ValueError("None of the inflation sources has a United States rate; pass us_inflation.")
+        # Sources without their own US row borrow the first one available
+        lender = next(name for name in order + list(sources) if name in own_us_rates.index)
+        us_sources = pd.Series([name if name in own_us_rates.index else lender for name in order], index=order)
+        us_rates = us_sources.map(own_us_rates)
+        for name in order:
+            if us_sources[name] != name:
+                print(f"No United States rate in source '{name}'; using the '{us_sources[name]}' US rate.")
+    candidates["inflation_differential"] = candidates["inflation_rate"] - candidates["source"].map(us_rates)
+    candidates.loc[candidates["currency_ticker"] == "usd", "inflation_differential"] = 0.0
 
-    # 3. Merge with inflation_df to get inflation rates
-    merged_df = pd.merge(merged_df, inflation_df, on='country', how='left')
+    differentials = candidates.pivot(index="currency_ticker", columns="source", values="inflation_differential")
+    countries = candidates.pivot(index="currency_ticker", columns="source", values="country")
+    differentials = differentials.reindex(index=pairs["currency_ticker"], columns=order)
+    countries = countries.reindex(index=pairs["currency_ticker"], columns=order)
 
-    # 4. Calculate inflation differential
-    merged_df['inflation_differential'] = merged_df['inflation_rate'] - us_inflation
+    # Preferred source per pair: the first in `order` with a value (only the first one without fallback)
+    values = differentials.to_numpy(dtype=np.float64)
+    available = ~np.isnan(values)
+    if not fallback:
+        available[:, 1:] = False
+    chosen = np.where(available.any(axis=1), available.argmax(axis=1), -1)
+    rows = np.arange(len(pairs))
+    has_value = chosen >= 0
 
-    # 5. Select the desired columns and write to output_path
-    output_df = merged_df[['currency_pair', 'spot_price', 'inflation_differential']]
+    proxy = pairs[["currency_pair", "spot_price"]].copy()
+    proxy["inflation_differential"] = np.where(has_value, values[rows, np.maximum(chosen, 0)], np.nan)
+    proxy["source"] = pd.Categorical(np.where(has_value, np.array(order, dtype=object)[np.maximum(chosen, 0)], None),
+                                     categories=order)
+    proxy["country"] = pd.Series(np.where(has_value, countries.to_numpy(dtype=object)[rows, np.maximum(chosen, 0)], None),
+                                 dtype=object).astype("category")
+    chosen_sources = proxy["source"].astype(object)
+    proxy["us_inflation_rate"] = chosen_sources.map(us_rates).astype(np.float64)
+    proxy["us_source"] = chosen_sources.map(us_sources).astype("category")
+    for position, name in enumerate(order):
+        proxy[f"differential_{name}"] = values[:, position]
+    return proxy
 
+def write_inflation_proxy(proxy, output_path):
+    """Write the proxy as Parquet (or CSV for a .csv path) via a temp file, so readers never see a partial table"""
+    temp_path = output_path + ".tmp"
     try:
-        output_df.to_csv(output_path, index=False)
+        if output_path.endswith(".csv"):
+            proxy.to_csv(temp_path, index=False)
+        else:
+            proxy.to_parquet(temp_path, index=False)
+        os.replace(temp_path, output_path)
         print(f"Successfully created inflation differential proxy at: {output_path}")
     except Exception as e:
         raise Exception(f"Error writing to output file: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def compute_inflation_differentials(spot_exchange_rates_path, currency_tickers_path, inflation_rates_path, output_path, us_inflation=None):
+    """
+    Computes the inflation rate differential for countries in the spot exchange rates dataset.
+
+    Args:
+        spot_exchange_rates_path (str): Path to the CSV file with spot exchange rates.
+        currency_tickers_path (str): Path to the CSV file with currency tickers.
+        inflation_rates_path (str): Path to the CSV file with inflation rates.
+        output_path (str): Path to save the output (.parquet or .csv).
+        us_inflation (float, optional): US inflation rate; read from the inflation rates file if omitted.
+    """
+    sources = {"headline": (inflation_rates_path, "inflation_rate")}
+    proxy = build_inflation_proxy(spot_exchange_rates_path, currency_tickers_path, sources, us_inflation=us_inflation)
+    write_inflation_proxy(proxy, output_path)
+    return proxy
 
 
 if __name__ == "__main__":
     try:
-        compute_inflation_differentials(
-            spot_exchange_rates_file,
-            currency_tickers_file,
-            inflation_rates_file,
-            output_file,
-            us_inflation_rate
-        )
+        proxy = build_inflation_proxy(spot_exchange_rates_file, currency_tickers_file, fallback=True)
+        write_inflation_proxy(proxy, output_file)
+        print(proxy["source"].value_counts(dropna=False))
     except FileNotFoundError as e:
         print(f"File Error: {e}")
     except Exception as e:
-        print(f"An error occurred: {e}")
\ No newline at end of file
+        print(f"An error occurred: {e}")